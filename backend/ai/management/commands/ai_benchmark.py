@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+import httpx
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+CITIES = [
+    ('GA', 'Atlanta'), ('TX', 'Houston'), ('IL', 'Chicago'), ('CA', 'Oakland'), ('TN', 'Memphis'),
+    ('LA', 'New Orleans'), ('NY', 'Brooklyn'), ('MI', 'Detroit'), ('NC', 'Charlotte'), ('FL', 'Miami'),
+]
+
+
+def _stop(index, run_id):
+    """
+    Pick a location. Unless run_id is None, each request gets a city name of
+    its own so discovery misses the cache, this run and later ones alike.
+    """
+    state, city = CITIES[index % len(CITIES)]
+    if run_id is not None:
+        city = f"{city} {run_id}-{index}"
+    return {'state': state, 'city': city, 'radius': 25}
+
+
+SCENARIOS = {
+    'venue': lambda i, run_id: ('/api/ai/discover/', _stop(i, run_id)),
+    'networking': lambda i, run_id: ('/api/networking/opportunities-search/', _stop(i, run_id)),
+    'venue-stream': lambda i, run_id: ('/api/ai/discover/stream/', _stop(i, run_id)),
+    'email': lambda i, run_id: ('/api/email-generator/generate/', {'venue_name': f"Benchmark Venue {i}"}),
+}
+
+
+class Command(BaseCommand):
+    help = "Drive the AI-backed endpoints of a running server concurrently and report throughput and latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the running app")
+        parser.add_argument('--scenarios', default='venue,networking,email',
+                            help=f"Comma-separated scenarios: {', '.join(SCENARIOS)}")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per scenario (default 100)")
+        parser.add_argument('--concurrency', type=int, default=20, help="Requests in flight at once (default 20)")
+        parser.add_argument('--cached', action='store_true',
+                            help="Reuse a few locations so discovery is served from the cache")
+        parser.add_argument('--username', default='benchmark', help="User to authenticate as (created if missing)")
+        parser.add_argument('--timeout', type=float, default=120)
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+        user, _ = get_user_model().objects.get_or_create(
+            username=options['username'],
+            defaults={'email': f"{options['username']}@example.com"}
+        )
+        token = str(AccessToken.for_user(user))
+        # httpx logs every request at INFO
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+
+        for name in scenarios:
+            results, elapsed = asyncio.run(self._run(name, token, options))
+            self._report(name, results, elapsed, options['concurrency'])
+
+    async def _run(self, name, token, options):
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        run_id = None if options['cached'] else uuid.uuid4().hex[:6]
+        limits = httpx.Limits(max_connections=options['concurrency'], max_keepalive_connections=options['concurrency'])
+        async with httpx.AsyncClient(
+            base_url=options['url'],
+            headers={'Authorization': f"Bearer {token}"},
+            timeout=options['timeout'],
+            limits=limits,
+        ) as client:
+            async def one(index):
+                path, payload = SCENARIOS[name](index, run_id)
+                async with semaphore:
+                    start = time.monotonic()
+                    first_event = None
+                    try:
+                        async with client.stream('POST', path, json=payload) as response:
+                            async for chunk in response.aiter_bytes():
+                                if first_event is None and b'event: ' in chunk:
+                                    first_event = time.monotonic() - start
+                            status = response.status_code
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                    return status, time.monotonic() - start, first_event
+
+            start = time.monotonic()
+            results = await asyncio.gather(*[one(i) for i in range(options['requests'])])
+            return results, time.monotonic() - start
+
+    def _report(self, name, results, elapsed, concurrency):
+        statuses = defaultdict(int)
+        for status, _, _ in results:
+            statuses[status] += 1
+        ok = [latency for status, latency, _ in results if isinstance(status, int) and status < 400]
+        first_events = [first for status, _, first in results if first is not None]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {len(results)} requests, concurrency {concurrency}"))
+        self.stdout.write(f"  wall time     {elapsed:.2f}s")
+        self.stdout.write(f"  throughput    {len(ok) / elapsed:.1f} successful req/s")
+        self.stdout.write(f"  statuses      {dict(sorted(statuses.items(), key=lambda item: str(item[0])))}")
+        if ok:
+            p50, p95, p99 = np.percentile(np.array(ok) * 1000, [50, 95, 99])
+            self.stdout.write(f"  latency ms    p50 {p50:.0f}  p95 {p95:.0f}  p99 {p99:.0f}  max {max(ok) * 1000:.0f}")
+        if first_events:
+            p50, p95 = np.percentile(np.array(first_events) * 1000, [50, 95])
+            self.stdout.write(f"  first event   p50 {p50:.0f}  p95 {p95:.0f} ms")
@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand
+
+from ai.usage import usage_summary
+
+
+class Command(BaseCommand):
+    help = "Report AI call volume, tokens, estimated cost and latency percentiles by day and endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Days of history to include (default 7)")
+        parser.add_argument('--endpoint', help="Only report this endpoint")
+        parser.add_argument('--json', action='store_true', help="Print the raw summary as JSON")
+
+    def handle(self, *args, **options):
+        summary = usage_summary(days=options['days'], endpoint=options['endpoint'])
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        header = (
+            f"{'day':<10}  {'endpoint':<36} {'reqs':>6} {'calls':>6} {'hit%':>5} {'err':>4} "
+            f"{'tok in':>9} {'tok out':>9} {'cost $':>9} {'p50ms':>6} {'p95ms':>6} {'p99ms':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in summary['days']:
+            self.stdout.write(self._line(row['day'], row['endpoint'], row))
+        self.stdout.write('-' * len(header))
+        for row in summary['endpoints']:
+            self.stdout.write(self._line('all', row['endpoint'], row))
+        self.stdout.write(self.style.SUCCESS(self._line('all', 'TOTAL', summary['total'])))
+
+    def _line(self, day, endpoint, row):
+        hit_rate = '-' if row['cache_hit_rate'] is None else f"{row['cache_hit_rate'] * 100:.0f}"
+        latency = [('-' if row[key] is None else row[key]) for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+        return (
+            f"{day:<10}  {endpoint[:36]:<36} {row['requests']:>6} {row['upstream_calls']:>6} {hit_rate:>5} "
+            f"{row['errors']:>4} {row['prompt_tokens']:>9} {row['completion_tokens']:>9} "
+            f"{row['cost_usd']:>9.4f} {latency[0]:>6} {latency[1]:>6} {latency[2]:>6}"
+        )
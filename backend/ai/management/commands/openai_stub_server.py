@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from utils.ai.stub_server import StubConfig, make_stub_server
+
+
+class Command(BaseCommand):
+    help = "Run a local OpenAI-compatible chat completions server with canned responses for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--latency', type=float, default=0.5, help="Seconds before the first token (default 0.5)")
+        parser.add_argument('--tokens-per-second', type=float, default=0,
+                            help="Generation speed; 0 sends the whole answer at once (default 0)")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+        parser.add_argument('--error-status', type=int, default=500, help="Status of injected failures, e.g. 429 or 500")
+        parser.add_argument('--retry-after', type=float, default=1, help="Retry-After seconds sent with injected 429s")
+        parser.add_argument('--items', type=int, default=8, help="Results per discovery answer (default 8)")
+
+    def handle(self, *args, **options):
+        config = StubConfig(
+            latency=options['latency'],
+            tokens_per_second=options['tokens_per_second'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            retry_after=options['retry_after'],
+            items=options['items'],
+        )
+        server = make_stub_server(options['host'], options['port'], config)
+        base_url = f"http://{options['host']}:{server.server_address[1]}/v1"
+        self.stdout.write(self.style.SUCCESS(f"OpenAI stub listening on {base_url}"))
+        self.stdout.write(f"Start the app with OPENAI_BASE_URL={base_url} to use it")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {config.requests} completion request(s)")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai.models import VenueSearch
+
+
+class Command(BaseCommand):
+    help = "Blank raw model responses older than AI_RAW_RESPONSE_RETENTION_DAYS; parsed results are kept"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Keep this many days instead of AI_RAW_RESPONSE_RETENTION_DAYS")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the responses that would be blanked")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AI_RAW_RESPONSE_RETENTION_DAYS
+        if days <= 0:
+            self.stdout.write("Raw response retention is disabled")
+            return
+
+        cutoff = timezone.now() - timedelta(days=days)
+        # The lookup value is compressed like the column, so this skips rows already blanked
+        expired = VenueSearch.objects.filter(created_at__lt=cutoff).exclude(raw_response='')
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} raw responses older than {days} days would be blanked")
+            return
+
+        blanked = expired.update(raw_response='')
+        self.stdout.write(self.style.SUCCESS(f"Blanked {blanked} raw responses older than {days} days"))
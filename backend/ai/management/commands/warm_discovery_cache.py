@@ -0,0 +1,59 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ai.warming import warm_discovery_cache
+
+
+class Command(BaseCommand):
+    help = "Refresh cached discovery results for the most searched locations before they expire"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, help="Locations to keep warm (default AI_CACHE_WARM_TOP_N)")
+        parser.add_argument('--days', type=int, help="Days of search history to rank (default AI_CACHE_WARM_LOOKBACK_DAYS)")
+        parser.add_argument('--budget', type=int, help="Daily token budget (default AI_CACHE_WARM_DAILY_TOKENS)")
+        parser.add_argument('--refresh-within', type=int,
+                            help="Refresh entries expiring within this many seconds (default AI_CACHE_WARM_REFRESH_WITHIN)")
+        parser.add_argument('--dry-run', action='store_true', help="Show what would be refreshed without calling the model")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running, warming every AI_CACHE_WARM_INTERVAL seconds (or --interval)")
+        parser.add_argument('--interval', type=int, help="Seconds between runs with --loop")
+        parser.add_argument('--json', action='store_true', help="Print the raw result as JSON")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or settings.AI_CACHE_WARM_INTERVAL
+        while True:
+            close_old_connections()
+            summary = warm_discovery_cache(
+                limit=options['top'],
+                days=options['days'],
+                budget=options['budget'],
+                refresh_within=options['refresh_within'],
+                dry_run=options['dry_run'],
+            )
+            self._report(summary, options['json'])
+            if not options['loop']:
+                return
+            time.sleep(interval)
+
+    def _report(self, summary, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        header = f"{'type':<12} {'location':<40} {'radius':>6} {'searches':>8}  status"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in summary['locations']:
+            location = f"{row['city']}, {row['state']}"
+            status = row['status'] + (f" ({row['error']})" if row.get('error') else '')
+            self.stdout.write(
+                f"{row['search_type']:<12} {location[:40]:<40} {row['radius']:>6} {row['searches']:>8}  {status}"
+            )
+        warmed = sum(1 for row in summary['locations'] if row['status'] == 'warmed')
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed} of {len(summary['locations'])} locations; "
+            f"{summary['tokens_spent_today']} of {summary['budget']} tokens used today"
+        ))
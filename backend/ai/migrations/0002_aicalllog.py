@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICallLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('endpoint', models.CharField(max_length=100)),
+                ('model', models.CharField(blank=True, max_length=50)),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('cache_status', models.CharField(choices=[('none', 'Not cached'), ('miss', 'Cache miss'), ('refresh', 'Cache refresh'), ('hit', 'Cache hit'), ('coalesced', 'Shared in-flight call')], default='none', max_length=10)),
+                ('streamed', models.BooleanField(default=False)),
+                ('error', models.CharField(blank=True, max_length=100)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'endpoint'], name='ai_calllog_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:13
+
+from collections import defaultdict
+from django.db import migrations, models
+import utils.fields
+
+BATCH_SIZE = 500
+
+
+def compress_and_summarize(apps, schema_editor):
+    """Copy raw responses into the compressed column and fill in the summaries"""
+    from utils.ai.summary import TOP_NAMES, summarize_results
+    VenueSearch = apps.get_model('ai', 'VenueSearch')
+    VenueResult = apps.get_model('ai', 'VenueResult')
+
+    counts = dict(
+        VenueResult.objects.order_by().values_list('search_id').annotate(models.Count('id'))
+    )
+    first_results = defaultdict(list)
+    for search_id, data in (VenueResult.objects.filter(index__lt=TOP_NAMES)
+                            .order_by('search_id', 'index').values_list('search_id', 'data')):
+        first_results[search_id].append(data)
+
+    batch = []
+    for search in VenueSearch.objects.only('id', 'raw_response').iterator(chunk_size=BATCH_SIZE):
+        search.raw_response_compressed = search.raw_response or ''
+        search.result_count = counts.get(search.id, 0)
+        search.top_names = summarize_results(first_results.get(search.id, []))[1]
+        batch.append(search)
+        if len(batch) == BATCH_SIZE:
+            VenueSearch.objects.bulk_update(batch, ['raw_response_compressed', 'result_count', 'top_names'])
+            batch = []
+    VenueSearch.objects.bulk_update(batch, ['raw_response_compressed', 'result_count', 'top_names'])
+
+
+def decompress(apps, schema_editor):
+    VenueSearch = apps.get_model('ai', 'VenueSearch')
+    batch = []
+    for search in VenueSearch.objects.only('id', 'raw_response_compressed').iterator(chunk_size=BATCH_SIZE):
+        search.raw_response = search.raw_response_compressed
+        batch.append(search)
+        if len(batch) == BATCH_SIZE:
+            VenueSearch.objects.bulk_update(batch, ['raw_response'])
+            batch = []
+    VenueSearch.objects.bulk_update(batch, ['raw_response'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_aicalllog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venuesearch',
+            name='result_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='venuesearch',
+            name='top_names',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='venuesearch',
+            name='raw_response_compressed',
+            field=utils.fields.CompressedTextField(blank=True, default=''),
+        ),
+        migrations.RunPython(compress_and_summarize, decompress),
+        migrations.RemoveField(
+            model_name='venuesearch',
+            name='raw_response',
+        ),
+        migrations.RenameField(
+            model_name='venuesearch',
+            old_name='raw_response_compressed',
+            new_name='raw_response',
+        ),
+    ]
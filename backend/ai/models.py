@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from utils.fields import CompressedTextField
 
 class VenueSearch(models.Model):
     """Model to store venue search results"""
@@ -15,7 +16,11 @@ class VenueSearch(models.Model):
     city = models.CharField(max_length=100, blank=True)
     radius = models.IntegerField(default=10)
     created_at = models.DateTimeField(auto_now_add=True)
-    raw_response = models.TextField()
+    # Blanked after AI_RAW_RESPONSE_RETENTION_DAYS by `manage.py prune_ai_raw_responses`
+    raw_response = CompressedTextField()
+    # Summary for history lists; the results themselves are VenueResult rows
+    result_count = models.PositiveIntegerField(default=0)
+    top_names = models.JSONField(default=list, blank=True)
     search_type = models.CharField(max_length=20, choices=SEARCH_TYPES, default='venue')
     search_terms = models.TextField(blank=True)
     
@@ -52,4 +57,38 @@ class VenueResult(models.Model):
         if self.result_type == 'venue':
             return f"Venue result {self.index} for search {self.search.id}"
         else:
-            return f"Opportunity result {self.index} for search {self.search.id}" 
\ No newline at end of file
+            return f"Opportunity result {self.index} for search {self.search.id}" 
+
+class AICallLog(models.Model):
+    """
+    One AI completion, or one discovery request answered without calling the
+    model, recorded for usage and cost reporting
+    """
+    CACHE_STATUSES = [
+        ('none', 'Not cached'),
+        ('miss', 'Cache miss'),
+        ('refresh', 'Cache refresh'),
+        ('hit', 'Cache hit'),
+        ('coalesced', 'Shared in-flight call'),
+    ]
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    endpoint = models.CharField(max_length=100)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    model = models.CharField(max_length=50, blank=True)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(default=0)
+    retries = models.PositiveSmallIntegerField(default=0)
+    cache_status = models.CharField(max_length=10, choices=CACHE_STATUSES, default='none')
+    streamed = models.BooleanField(default=False)
+    error = models.CharField(max_length=100, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'endpoint'], name='ai_calllog_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.model or self.cache_status} ({self.created_at})"
@@ -10,5 +10,6 @@ class VenueResultSerializer(serializers.ModelSerializer):
 class VenueSearchSerializer(serializers.ModelSerializer):
     class Meta:
         model = VenueSearch
-        fields = ['id', 'user', 'state', 'city', 'radius', 'created_at', 'search_type', 'search_terms']
-        read_only_fields = ['id', 'user', 'created_at'] 
\ No newline at end of file
+        fields = ['id', 'user', 'state', 'city', 'radius', 'created_at', 'search_type', 'search_terms',
+                  'result_count', 'top_names']
+        read_only_fields = ['id', 'user', 'created_at', 'result_count', 'top_names']
@@ -0,0 +1,517 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from api.venues.models import AISearchQuery
+from ai.models import VenueSearch
+from ai.views import discover_venues
+from utils.ai import resilience, streaming
+from utils.ai.cache import acached_discovery, cached_discovery, discovery_cache_key, radius_bucket
+from utils.ai.ratelimit import TokenBucket
+from utils.ai.resilience import AIUnavailable, CircuitBreaker
+from utils.throttling import AIDiscoveryThrottle, RateLimited, ScopedUserThrottle
+from utils.ai.singleflight import async_single_flight, single_flight
+from utils.ai.openai_client import venue_discovery_messages
+
+
+def venue(name, genres='jazz'):
+    return {'name': name, 'description': f'{name} stage', 'genres': genres}
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+class GatedCompletion:
+    """Stands in for astream_completion: yields each venue, then waits on `release` before the last"""
+
+    def __init__(self, venues):
+        self.venues = venues
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self, messages, max_tokens=None):
+        self.calls += 1
+        yield '['
+        for index, item in enumerate(self.venues):
+            if index == len(self.venues) - 1:
+                await self.release.wait()
+            yield json.dumps(item) + (',' if index < len(self.venues) - 1 else '')
+        yield ']'
+
+
+class DiscoveryEventStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+        self.completion = GatedCompletion([venue('Blue Room'), venue('Hip Hop Hall', 'hip-hop'), venue('Late Bar')])
+        patcher = mock.patch.object(streaming, 'astream_completion', self.completion)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def persist(self, results):
+        return AISearchQuery.objects.create(user=self.user, state='TX', city='Austin', radius=25, results=results)
+
+    def events(self, rank=None):
+        return streaming.discovery_event_stream(
+            'venue', 'TX', 'Austin', 25, venue_discovery_messages, 'venue', self.persist, rank=rank,
+        )
+
+    async def test_first_result_is_sent_before_the_model_finishes(self):
+        stream = self.events()
+        first = await asyncio.wait_for(stream.__anext__(), 1)
+        self.assertEqual(parse_events([first]), [('venue', venue('Blue Room'))])
+        self.completion.release.set()
+        rest = parse_events([chunk async for chunk in stream])
+        self.assertEqual([event for event, _ in rest], ['venue', 'venue', 'done'])
+        self.assertEqual(rest[-1][1]['count'], 3)
+
+    async def test_identical_searches_share_one_call(self):
+        async def consume():
+            return parse_events([chunk async for chunk in self.events()])
+
+        first = asyncio.ensure_future(consume())
+        second = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        self.completion.release.set()
+        first, second = await asyncio.gather(first, second)
+
+        self.assertEqual(self.completion.calls, 1)
+        for events in (first, second):
+            self.assertEqual([data['name'] for event, data in events if event == 'venue'],
+                             ['Blue Room', 'Hip Hop Hall', 'Late Bar'])
+
+    async def test_ranks_saved_results_and_reports_order(self):
+        def rank(results):
+            return sorted(results, key=lambda item: item['name'] != 'Late Bar')
+
+        self.completion.release.set()
+        events = parse_events([chunk async for chunk in self.events(rank=rank)])
+        done = events[-1][1]
+        self.assertEqual(done['order'], [2, 0, 1])
+        record = await AISearchQuery.objects.aget(id=done['id'])
+        self.assertEqual([item['name'] for item in record.results], ['Late Bar', 'Blue Room', 'Hip Hop Hall'])
+        self.assertNotIn('_stream_index', record.results[0])
+
+    async def test_cache_hit_replays_ranked_results(self):
+        self.completion.release.set()
+        [chunk async for chunk in self.events()]
+
+        def rank(results):
+            return list(reversed(results))
+
+        events = parse_events([chunk async for chunk in self.events(rank=rank)])
+        self.assertEqual(self.completion.calls, 1)
+        self.assertEqual([data['name'] for event, data in events if event == 'venue'],
+                         ['Late Bar', 'Hip Hop Hall', 'Blue Room'])
+        self.assertTrue(events[-1][1]['cache_hit'])
+        self.assertNotIn('order', events[-1][1])
+
+
+class CloseOnDisconnectTests(SimpleTestCase):
+    async def test_passes_every_event_through(self):
+        async def events():
+            for index in range(3):
+                await asyncio.sleep(0)
+                yield index
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        self.assertEqual([event async for event in streaming.close_on_disconnect(events(), receive)], [0, 1, 2])
+
+
+class VenueDiscoveryStreamViewTests(TestCase):
+    def test_response_is_streamed_asynchronously(self):
+        # Under ASGI, Django 4.2 buffers synchronous iterators to the end
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(get_user_model().objects.create_user(username='artist', password='pw'))
+        with mock.patch.object(streaming, 'astream_completion', GatedCompletion([])):
+            response = client.post('/api/ai/discover/stream/', {'state': 'TX', 'city': 'Austin', 'radius': 25})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.is_async)
+
+
+class Clock:
+    """Stands in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ClockTestCase(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TokenBucketTests(ClockTestCase):
+    def test_waits_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0, 0, 0.5, 1.0])
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.reserve(2)
+        self.clock.now += 10
+        self.assertEqual(bucket.reserve(2), 0)
+        self.assertEqual(bucket.reserve(1), 0.5)
+
+    def test_takes_nothing_past_max_wait(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.reserve()
+        self.assertIsNone(bucket.reserve(5, max_wait=2))
+        self.assertEqual(bucket.reserve(), 1.0)
+
+    def test_refund_returns_tokens(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        bucket.reserve(3)
+        bucket.refund(2)
+        self.assertEqual(bucket.reserve(2), 0)
+        bucket.refund(10)
+        self.assertEqual(bucket.reserve(3), 0)
+
+
+@override_settings(OPENAI_LIMITER_MAX_WAIT=5)
+class ReserveTests(ClockTestCase):
+    def setUp(self):
+        super().setUp()
+        self.requests = TokenBucket(rate=1, capacity=2)
+        self.tokens = TokenBucket(rate=100, capacity=1000)
+        patcher = mock.patch.object(resilience, '_limiters', (self.requests, self.tokens))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refunds_request_when_tokens_refuse(self):
+        with self.assertRaises(AIUnavailable):
+            resilience._reserve(5000)
+        self.assertEqual(self.requests.reserve(2), 0)
+
+    def test_waits_for_slower_bucket(self):
+        self.assertEqual(resilience._reserve(1200), 2.0)
+
+
+class CircuitBreakerTests(ClockTestCase):
+    def setUp(self):
+        super().setUp()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def open_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(AIUnavailable) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.wait, 30)
+
+    def test_half_open_allows_one_trial(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.breaker.before_call()
+        with self.assertRaises(AIUnavailable):
+            self.breaker.before_call()
+        self.breaker.release_trial()
+        self.breaker.before_call()
+
+    def test_successful_trial_closes(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.breaker.before_call()
+
+    def test_failed_trial_reopens(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.clock.now += 29
+        with self.assertRaises(AIUnavailable):
+            self.breaker.before_call()
+
+
+class ThrottleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+        self.now = 600.0
+        patcher = mock.patch.object(ScopedUserThrottle, 'timer', lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        rates = override_settings(THROTTLE_RATES={'ai_discovery': {'default': '4/minute'}})
+        rates.enable()
+        self.addCleanup(rates.disable)
+
+    def request(self, method='POST', data=None):
+        return mock.Mock(method=method, user=self.user, data=data or {})
+
+    def allow(self, throttle_class=AIDiscoveryThrottle, **kwargs):
+        return throttle_class().allow_request(self.request(**kwargs), None)
+
+
+class ThrottleWindowTests(ThrottleTestCase):
+    def test_limits_within_window(self):
+        for _ in range(4):
+            self.assertTrue(self.allow())
+        with self.assertRaises(RateLimited) as raised:
+            self.allow()
+        # Until the full window has slid a quarter of the way out
+        self.assertEqual(raised.exception.wait, 75)
+        self.assertTrue(self.allow(method='GET'))
+
+    def test_previous_window_slides_out(self):
+        for _ in range(4):
+            self.allow()
+        # A quarter into the next window, three quarters of the last four still count
+        self.now += 75
+        self.assertTrue(self.allow())
+        with self.assertRaises(RateLimited) as raised:
+            self.allow()
+        self.assertEqual(raised.exception.wait, 15)
+        self.now += 15
+        self.assertTrue(self.allow())
+
+    def test_charges_cost_and_refunds_rejected_request(self):
+        per_stop = AIDiscoveryThrottle.costing(lambda request: len(request.data['stops']))
+        self.assertTrue(self.allow(per_stop, data={'stops': [1, 2, 3]}))
+        with self.assertRaises(RateLimited):
+            self.allow(per_stop, data={'stops': [1, 2]})
+        self.assertTrue(self.allow())
+        with self.assertRaises(RateLimited):
+            self.allow()
+
+    def test_cost_larger_than_rate_uses_whole_allowance(self):
+        self.assertTrue(self.allow(AIDiscoveryThrottle.costing(10)))
+        with self.assertRaises(RateLimited):
+            self.allow()
+
+
+class BatchDiscoveryThrottleTests(ThrottleTestCase):
+    def test_each_stop_is_charged_before_the_job_starts(self):
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(self.user)
+        stops = [{'state': 'TX', 'city': city, 'radius': 25} for city in ('Austin', 'Dallas', 'Houston')]
+        with mock.patch('api.venues.views.batch_views.run_in_background') as run_in_background:
+            response = client.post('/api/ai/discover/batch/', {'stops': stops}, format='json')
+            self.assertEqual(response.status_code, 202)
+            response = client.post('/api/ai/discover/batch/', {'stops': stops[:2]}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(run_in_background.call_count, 1)
+
+
+class CombinedDiscoveryThrottleTests(ThrottleTestCase):
+    def test_counts_as_two_requests(self):
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(self.user)
+        # The throttle is checked before the body, so invalid requests are charged too
+        statuses = [client.post('/api/ai/discover/combined/', {}, format='json').status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+    def test_saves_both_searches(self):
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(self.user)
+        opportunity = {'name': 'Open mic', 'type': 'event'}
+        with mock.patch('api.venues.views.combined_views.adiscover_venues',
+                        mock.AsyncMock(return_value=[venue('Blue Room')])), \
+                mock.patch('api.venues.views.combined_views.adiscover_networking',
+                           mock.AsyncMock(return_value=[opportunity])):
+            response = client.post('/api/ai/discover/combined/', {'state': 'GA', 'city': 'Atlanta', 'radius': 25},
+                                   format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['name'] for item in response.data['venues']['results']], ['Blue Room'])
+        self.assertEqual(response.data['networking']['results'], [opportunity])
+        self.assertTrue(AISearchQuery.objects.filter(user=self.user, city='Atlanta').exists())
+
+
+class DiscoveryCacheKeyTests(SimpleTestCase):
+    def test_rounds_radius_up_to_bucket(self):
+        self.assertEqual([radius_bucket(radius) for radius in (1, 20, 25, 26, 1000, 'far', None)],
+                         [5, 25, 25, 50, 250, 5, 5])
+
+    def test_equivalent_searches_share_a_key(self):
+        key = discovery_cache_key('venue', 'GA', 'Atlanta', 25)
+        self.assertEqual(discovery_cache_key('venue', 'Georgia', ' atlanta ', 20), key)
+        self.assertNotEqual(discovery_cache_key('venue', 'GA', 'Atlanta', 30), key)
+        self.assertNotEqual(discovery_cache_key('networking', 'GA', 'Atlanta', 25), key)
+        self.assertEqual(discovery_cache_key('venue', 'MO', 'St. Louis', 25),
+                         discovery_cache_key('venue', 'Missouri', 'Saint Louis', 25))
+
+
+# Telemetry would label calls with the last test client request's user
+@override_settings(AI_TELEMETRY_ENABLED=False)
+class CachedDiscoveryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.radii = []
+
+    def compute(self, radius):
+        self.radii.append(radius)
+        return [venue(f'Stage {len(self.radii)}')]
+
+    def test_miss_then_hit(self):
+        self.assertEqual(cached_discovery('venue', 'GA', 'Atlanta', 20, self.compute), ([venue('Stage 1')], False))
+        self.assertEqual(cached_discovery('venue', 'Georgia', 'atlanta', 25, self.compute), ([venue('Stage 1')], True))
+        self.assertEqual(self.radii, [25])
+
+    def test_refresh_overwrites_entry(self):
+        cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute)
+        self.assertEqual(cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute, refresh=True),
+                         ([venue('Stage 2')], False))
+        self.assertEqual(cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute), ([venue('Stage 2')], True))
+
+    def test_empty_results_are_not_cached(self):
+        self.assertEqual(cached_discovery('venue', 'GA', 'Atlanta', 25, lambda radius: []), ([], False))
+        self.assertEqual(cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute)[1], False)
+
+    @override_settings(AI_DISCOVERY_CACHE_MAX_ENTRIES=2)
+    def test_evicts_least_recently_used(self):
+        for city in ('Atlanta', 'Macon', 'Athens'):
+            if city == 'Athens':
+                # Reading Atlanta makes Macon the oldest entry
+                cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute)
+            cached_discovery('venue', 'GA', city, 25, self.compute)
+        self.assertTrue(cached_discovery('venue', 'GA', 'Atlanta', 25, self.compute)[1])
+        self.assertFalse(cached_discovery('venue', 'GA', 'Macon', 25, self.compute)[1])
+
+
+class DiscoverVenuesViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+
+    def post(self, data):
+        # /api/ai/discover/ is routed to the api.venues view first, so call this one directly
+        request = APIRequestFactory().post('/api/ai/discover/', data, format='json')
+        force_authenticate(request, self.user)
+        return discover_venues(request)
+
+    def test_hit_reuses_listing_without_raw_response(self):
+        content = json.dumps([venue('Blue Room')])
+        completion = mock.Mock(choices=[mock.Mock(message=mock.Mock(content=content))])
+        with mock.patch('ai.views.create_chat_completion', return_value=completion) as create:
+            first = self.post({'state': 'GA', 'city': 'Atlanta', 'radius': 20})
+            second = self.post({'state': 'GA', 'city': 'Atlanta', 'radius': 25})
+        self.assertEqual(create.call_count, 1)
+        # The call is made for the whole radius bucket the cache entry covers
+        self.assertIn('within 25 miles of Atlanta, GA', create.call_args.kwargs['messages'][1]['content'])
+        self.assertEqual((first.data['cache_hit'], second.data['cache_hit']), (False, True))
+        self.assertEqual(VenueSearch.objects.get(id=first.data['id']).raw_response, content)
+        self.assertEqual(VenueSearch.objects.get(id=second.data['id']).raw_response, '')
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_call(self):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(True)
+            release.wait(5)
+            return [venue('Blue Room')]
+
+        results = []
+        waiting = threading.Semaphore(0)
+        threads = [threading.Thread(target=lambda: results.append(single_flight('ai:test', compute))) for _ in range(3)]
+        # Waiters log before blocking; release the leader once both have joined
+        with mock.patch('utils.ai.singleflight.logger.info', side_effect=lambda message: waiting.release()):
+            for thread in threads:
+                thread.start()
+            for _ in range(2):
+                self.assertTrue(waiting.acquire(timeout=5))
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(results, [[venue('Blue Room')]] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_leader_in_another_worker(self):
+        cache.add('ai:test:lock', 'other-worker', 60)
+        cache.set('ai:test:result', {'token': 'other-worker', 'result': [venue('Blue Room')]}, 60)
+        compute = mock.Mock()
+        self.assertEqual(single_flight('ai:test', compute), [venue('Blue Room')])
+        compute.assert_not_called()
+
+    def test_finished_flight_is_not_reused(self):
+        self.assertEqual([single_flight('ai:test', lambda: index) for index in range(2)], [0, 1])
+
+
+# Telemetry would label calls with the last test client request's user
+@override_settings(AI_TELEMETRY_ENABLED=False)
+class AsyncSingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def compute(self, radius=None):
+        self.calls += 1
+        await self.release.wait()
+        return [venue('Blue Room')]
+
+    async def gather(self, *calls):
+        tasks = [asyncio.create_task(call) for call in calls]
+        await asyncio.sleep(0.01)
+        self.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def test_concurrent_callers_share_one_call(self):
+        results = await self.gather(*(async_single_flight('ai:test', self.compute) for _ in range(3)))
+        self.assertEqual(results, [[venue('Blue Room')]] * 3)
+        self.assertEqual(self.calls, 1)
+
+    async def test_waiters_see_the_leaders_error(self):
+        async def failing():
+            await self.release.wait()
+            raise ValueError("bad response")
+
+        results = await self.gather(*(async_single_flight('ai:test', failing) for _ in range(2)))
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_cancelled_leader_hands_over_to_a_waiter(self):
+        leader = asyncio.create_task(async_single_flight('ai:test', self.compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(async_single_flight('ai:test', self.compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        self.release.set()
+        self.assertEqual(await asyncio.wait_for(waiter, 1), [venue('Blue Room')])
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(self.calls, 2)
+
+    async def test_identical_discoveries_coalesce_then_hit_cache(self):
+        results = await self.gather(
+            acached_discovery('venue', 'GA', 'Atlanta', 20, self.compute),
+            acached_discovery('venue', 'Georgia', 'atlanta', 25, self.compute),
+        )
+        self.assertEqual(results, [([venue('Blue Room')], False)] * 2)
+        self.assertEqual(await acached_discovery('venue', 'GA', 'Atlanta', 25, self.compute),
+                         ([venue('Blue Room')], True))
+        self.assertEqual(self.calls, 1)
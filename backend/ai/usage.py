@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AICallLog
+
+# Rows that were answered without calling the model
+CACHE_ANSWERS = ('hit', 'coalesced')
+
+
+def model_price(model):
+    """
+    Return the (prompt, completion) USD price per million tokens for a model.
+
+    Dated model names such as "gpt-3.5-turbo-0125" use the price of the
+    longest configured name they start with.
+    """
+    pricing = settings.AI_MODEL_PRICING
+    matches = [name for name in pricing if model.startswith(name)]
+    if not matches:
+        return None
+    return pricing[max(matches, key=len)]
+
+
+def _summarize(rows):
+    """Aggregate a list of AICallLog value rows into one summary dict"""
+    upstream = [row for row in rows if row['cache_status'] not in CACHE_ANSWERS]
+    cache_answers = len(rows) - len(upstream)
+    cacheable = [row for row in rows if row['cache_status'] != 'none']
+    latencies = np.array([row['latency_ms'] for row in upstream if not row['error']], dtype=float)
+
+    prompt_tokens = sum(row['prompt_tokens'] or 0 for row in upstream)
+    completion_tokens = sum(row['completion_tokens'] or 0 for row in upstream)
+    cost = 0.0
+    unpriced = 0
+    for row in upstream:
+        price = model_price(row['model'])
+        if price is None:
+            unpriced += 1
+            continue
+        cost += ((row['prompt_tokens'] or 0) * price[0] + (row['completion_tokens'] or 0) * price[1]) / 1_000_000
+
+    if latencies.size:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        latency = {'p50_ms': int(p50), 'p95_ms': int(p95), 'p99_ms': int(p99), 'max_ms': int(latencies.max())}
+    else:
+        latency = {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    return {
+        'requests': len(rows),
+        'upstream_calls': len(upstream),
+        'cache_answers': cache_answers,
+        'cache_hit_rate': round(cache_answers / len(cacheable), 3) if cacheable else None,
+        'errors': sum(1 for row in upstream if row['error']),
+        'retries': sum(row['retries'] for row in upstream),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'cost_usd': round(cost, 4),
+        'unpriced_calls': unpriced,
+        **latency,
+    }
+
+
+def usage_summary(days=7, endpoint=None):
+    """
+    Summarize recorded AI calls by day and endpoint.
+
+    Args:
+        days (int): How many days back to include, counting today
+        endpoint (str): Restrict the report to one endpoint
+
+    Returns:
+        dict: {"days": [...per day and endpoint], "endpoints": [...per endpoint], "total": {...}}
+    """
+    since = timezone.now() - timedelta(days=days)
+    logs = AICallLog.objects.filter(created_at__gte=since)
+    if endpoint:
+        logs = logs.filter(endpoint=endpoint)
+    rows = list(
+        logs.annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values('day', 'endpoint', 'model', 'prompt_tokens', 'completion_tokens',
+                'latency_ms', 'retries', 'cache_status', 'error')
+    )
+
+    # Newest day first, endpoints alphabetical within a day
+    rows.sort(key=lambda row: row['endpoint'])
+    rows.sort(key=lambda row: row['day'], reverse=True)
+
+    by_day = defaultdict(list)
+    by_endpoint = defaultdict(list)
+    for row in rows:
+        by_day[(row['day'], row['endpoint'])].append(row)
+        by_endpoint[row['endpoint']].append(row)
+
+    return {
+        'days': [
+            {'day': day.isoformat(), 'endpoint': name, **_summarize(group)}
+            for (day, name), group in by_day.items()
+        ],
+        'endpoints': [
+            {'endpoint': name, **_summarize(group)}
+            for name, group in sorted(by_endpoint.items())
+        ],
+        'total': _summarize(rows),
+    }
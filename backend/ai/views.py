@@ -1,15 +1,24 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .models import VenueSearch, VenueResult
 from .serializers import VenueSearchSerializer, VenueResultSerializer
-from openai import OpenAI
+from .usage import usage_summary
+from utils.ai.client import get_connection_stats
+from utils.ai.telemetry import create_chat_completion
+from utils.ai.cache import cached_discovery, wants_refresh
+from utils.ai.resilience import AIUnavailable, get_circuit_breaker
+from utils.ai.summary import summarize_results
+from utils.throttling import AIDiscoveryThrottle, throttle_stats
+from api.venues.ranking import rank_for_user
 import os
 import json
 import uuid
 from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.conf import settings
 from rest_framework.views import APIView
 # Comment out the problematic import for now
@@ -18,20 +27,82 @@ from rest_framework.views import APIView
 # Configure OpenAI API
 def generate_ai_response(prompt, max_tokens=500):
     try:
-        # Use the helper function to get a properly initialized client
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        # Use the shared, connection-pooled client
+        response = create_chat_completion(
             model=settings.OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
         )
         return response.choices[0].message.content
+    except AIUnavailable:
+        raise
     except Exception as e:
         print(f"Error generating AI response: {e}")
         return "Error generating response. Please try again later."
 
+def generate_venue_listing(state, city, radius):
+    """
+    Ask the model for a list of hip-hop and R&B friendly venues in a city.
+
+    Args:
+        state (str): State to search in
+        city (str): City to search in
+        radius (int): Search radius in miles
+
+    Returns:
+        dict: {"results": [...venues], "raw_response": str}, or None if the
+        response contained no JSON array
+    """
+    # Create a prompt for the OpenAI API
+    prompt = f"""
+    You are a music venue database. Create a list of 5 fictional hip-hop and R&B friendly music venues within {radius} miles of {city}, {state} with the following details for each:
+    1. Name
+    2. Description (include what makes it good for hip-hop and R&B)
+    3. Address (create a realistic address in {city})
+    4. City (should be {city})
+    5. State (should be {state})
+    6. Zipcode (create a realistic zipcode)
+    7. Phone (format: XXX-XXX-XXXX)
+    8. Email (should be related to venue name)
+    9. Website (should be related to venue name)
+    10. Capacity (a realistic number)
+    11. Genres (list hip-hop, R&B, and other genres they support)
+    
+    Format as JSON array with these exact fields: name, description, address, city, state, zipcode, phone, email, website, capacity, genres.
+    Make each venue unique and distinctive. Include a range of sizes and styles.
+    """
+    
+    # Call OpenAI API through the shared, connection-pooled client
+    response = create_chat_completion(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You create realistic fictional music venue data in JSON format."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=2000
+    )
+    
+    # Process the response - updated for OpenAI 1.0+
+    content = response.choices[0].message.content
+    
+    # Extract JSON data
+    # Find the first opening bracket and the last closing bracket
+    start_idx = content.find('[')
+    end_idx = content.rfind(']') + 1
+    
+    if start_idx == -1 or end_idx == 0:
+        return None
+        
+    json_str = content[start_idx:end_idx]
+    return {
+        "results": json.loads(json_str),
+        "raw_response": content
+    }
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIDiscoveryThrottle])
 def discover_venues(request):
     # Get request data
     state = request.data.get('state', '')
@@ -42,85 +113,63 @@ def discover_venues(request):
         return Response({"error": "State and city are required"}, status=status.HTTP_400_BAD_REQUEST)
         
     try:
-        # Create a prompt for the OpenAI API
-        prompt = f"""
-        You are a music venue database. Create a list of 5 fictional hip-hop and R&B friendly music venues in {city}, {state} with the following details for each:
-        1. Name
-        2. Description (include what makes it good for hip-hop and R&B)
-        3. Address (create a realistic address in {city})
-        4. City (should be {city})
-        5. State (should be {state})
-        6. Zipcode (create a realistic zipcode)
-        7. Phone (format: XXX-XXX-XXXX)
-        8. Email (should be related to venue name)
-        9. Website (should be related to venue name)
-        10. Capacity (a realistic number)
-        11. Genres (list hip-hop, R&B, and other genres they support)
-        
-        Format as JSON array with these exact fields: name, description, address, city, state, zipcode, phone, email, website, capacity, genres.
-        Make each venue unique and distinctive. Include a range of sizes and styles.
-        """
-        
-        # Initialize OpenAI client using the helper function
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Call OpenAI API - updated for OpenAI 1.0+
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You create realistic fictional music venue data in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
+        # Reuse a recent listing for the same area when there is one
+        computed = []
+
+        def compute(bucket_radius):
+            computed.append(True)
+            return generate_venue_listing(state, city, bucket_radius)
+
+        listing, cache_hit = cached_discovery(
+            'venue_search', state, city, radius, compute,
+            refresh=wants_refresh(request.data.get('refresh'))
         )
         
-        # Process the response - updated for OpenAI 1.0+
-        content = response.choices[0].message.content
-        
-        # Extract JSON data
-        # Find the first opening bracket and the last closing bracket
-        start_idx = content.find('[')
-        end_idx = content.rfind(']') + 1
-        
-        if start_idx == -1 or end_idx == 0:
+        if not listing:
             # If no JSON array found, return error
             return Response({"error": "Failed to generate venue data"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-        json_str = content[start_idx:end_idx]
-        venues = json.loads(json_str)
+        # Best matches for this artist first
+        venues = rank_for_user(listing["results"], request.user)
         
         # Create a search record
         search_id = str(uuid.uuid4())
+        result_count, top_names = summarize_results(venues)
         search = VenueSearch.objects.create(
             id=search_id,
             user=request.user,
             state=state,
             city=city,
             radius=radius,
-            raw_response=content
+            # Only the search that made the call keeps its raw response
+            raw_response=listing["raw_response"] if computed else '',
+            result_count=result_count,
+            top_names=top_names
         )
         
         # Create venue results
-        for i, venue_data in enumerate(venues):
-            VenueResult.objects.create(
-                search=search,
-                index=i,
-                data=venue_data
-            )
+        VenueResult.objects.bulk_create([
+            VenueResult(search=search, index=i, data=venue_data)
+            for i, venue_data in enumerate(venues)
+        ])
         
         # Return the venues and search ID
         return Response({
             "id": search_id,
-            "results": venues
+            "results": venues,
+            "cache_hit": cache_hit
         })
         
+    except AIUnavailable:
+        # 503 with Retry-After
+        raise
     except Exception as e:
         print(f"Error in discover_venues: {str(e)}")
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIDiscoveryThrottle])
 def discover_opportunities(request):
     # Get request data
     state = request.data.get('state', '')
@@ -149,11 +198,8 @@ def discover_opportunities(request):
         Make each opportunity unique and realistic. Include a range of opportunity types.
         """
         
-        # Initialize OpenAI client using the helper function
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        
-        # Call OpenAI API - updated for OpenAI 1.0+
-        response = client.chat.completions.create(
+        # Call OpenAI API through the shared, connection-pooled client
+        response = create_chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You create realistic fictional networking opportunities data in JSON format."},
@@ -180,6 +226,7 @@ def discover_opportunities(request):
         
         # Create a search record
         search_id = str(uuid.uuid4())
+        result_count, top_names = summarize_results(opportunities)
         search = VenueSearch.objects.create(
             id=search_id,
             user=request.user,
@@ -188,17 +235,16 @@ def discover_opportunities(request):
             radius=0,  # No radius for opportunities search
             raw_response=content,
             search_type="opportunity",
-            search_terms=search_terms
+            search_terms=search_terms,
+            result_count=result_count,
+            top_names=top_names
         )
         
         # Create opportunity results
-        for i, opportunity_data in enumerate(opportunities):
-            VenueResult.objects.create(
-                search=search,
-                index=i,
-                data=opportunity_data,
-                result_type="opportunity"
-            )
+        VenueResult.objects.bulk_create([
+            VenueResult(search=search, index=i, data=opportunity_data, result_type="opportunity")
+            for i, opportunity_data in enumerate(opportunities)
+        ])
         
         # Return the opportunities and search ID
         return Response({
@@ -206,6 +252,9 @@ def discover_opportunities(request):
             "results": opportunities
         })
         
+    except AIUnavailable:
+        # 503 with Retry-After
+        raise
     except Exception as e:
         print(f"Error in discover_opportunities: {str(e)}")
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -213,7 +262,8 @@ def discover_opportunities(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_search_history(request):
-    searches = VenueSearch.objects.filter(user=request.user).order_by('-created_at')
+    # The summary fields stand in for the results; the raw text is never listed
+    searches = VenueSearch.objects.filter(user=request.user).defer('raw_response').order_by('-created_at')
     serializer = VenueSearchSerializer(searches, many=True)
     return Response(serializer.data)
 
@@ -221,7 +271,7 @@ def get_search_history(request):
 @permission_classes([IsAuthenticated])
 def get_search_results(request, search_id):
     try:
-        search = VenueSearch.objects.get(id=search_id, user=request.user)
+        search = VenueSearch.objects.defer('raw_response').get(id=search_id, user=request.user)
         results = VenueResult.objects.filter(search=search).order_by('index')
         
         # Get serialized search
@@ -242,6 +292,17 @@ def get_search_results(request, search_id):
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _index(value):
+    """A selected result index as an int, or None if it isn't one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _indices(values):
+    """The valid indices among a list of selected result indices"""
+    return {index for index in map(_index, values) if index is not None}
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def import_venues(request, search_id):
@@ -253,35 +314,34 @@ def import_venues(request, search_id):
             return Response({"error": "No venues selected for import"}, status=status.HTTP_400_BAD_REQUEST)
             
         # Get the search and results
-        search = VenueSearch.objects.get(id=search_id, user=request.user)
+        search = VenueSearch.objects.defer('raw_response').get(id=search_id, user=request.user)
+        
+        # One query for all selected results
+        results = {result.index: result for result in VenueResult.objects.filter(search=search, index__in=_indices(venue_indices))}
         
         # Track successfully imported and errors
-        imported_count = 0
+        imported = []
         errors = []
         
-        # Import each venue
         for idx in venue_indices:
-            try:
-                # Get the result
-                result = VenueResult.objects.get(search=search, index=idx)
-                
-                # Check if already imported
-                if result.imported:
-                    errors.append(f"Venue at index {idx} already imported")
-                    continue
-                
-                # Simplified version without actual Venue creation
-                # Mark as imported anyway for now
-                result.imported = True
-                result.imported_at = timezone.now()
-                result.save()
-                
-                imported_count += 1
-                
-            except VenueResult.DoesNotExist:
+            result = results.get(_index(idx))
+            if result is None:
                 errors.append(f"Venue result at index {idx} not found")
-            except Exception as e:
-                errors.append(f"Error importing venue at index {idx}: {str(e)}")
+                continue
+            
+            # Check if already imported (or selected twice)
+            if result.imported:
+                errors.append(f"Venue at index {idx} already imported")
+                continue
+            
+            # Simplified version without actual Venue creation
+            # Mark as imported anyway for now
+            result.imported = True
+            result.imported_at = timezone.now()
+            imported.append(result)
+        
+        VenueResult.objects.bulk_update(imported, ['imported', 'imported_at'])
+        imported_count = len(imported)
         
         return Response({
             "total_imported": imported_count,
@@ -304,57 +364,63 @@ def import_opportunities(request, search_id):
             return Response({"error": "No opportunities selected for import"}, status=status.HTTP_400_BAD_REQUEST)
             
         # Get the search and results
-        search = VenueSearch.objects.get(id=search_id, user=request.user)
+        search = VenueSearch.objects.defer('raw_response').get(id=search_id, user=request.user)
         
         # Validate this is an opportunity search
         if search.search_type != "opportunity":
             return Response({"error": "Invalid search type for opportunity import"}, status=status.HTTP_400_BAD_REQUEST)
         
+        from networking.models import Opportunity
+        
+        # One query for all selected results
+        results = {result.index: result for result in VenueResult.objects.filter(search=search, index__in=_indices(opportunity_indices))}
+        
         # Track successfully imported and errors
-        imported_count = 0
+        imported = []
+        opportunities = []
         errors = []
         
-        # Import each opportunity
         for idx in opportunity_indices:
-            try:
-                # Get the result
-                result = VenueResult.objects.get(search=search, index=idx)
-                
-                # Check if already imported
-                if result.imported:
-                    errors.append(f"Opportunity at index {idx} already imported")
-                    continue
-                
-                # Actually create the Opportunity object
-                from networking.models import Opportunity
-                
-                opportunity_data = result.data
-                
-                # Create the Opportunity
-                opportunity = Opportunity.objects.create(
-                    user=request.user,
-                    title=opportunity_data.get('title', ''),
-                    organization=opportunity_data.get('organization', ''),
-                    description=opportunity_data.get('description', ''),
-                    opportunity_type=opportunity_data.get('opportunity_type', 'other'),
-                    status='active',  # Default status
-                    location=opportunity_data.get('location', ''),
-                    deadline=opportunity_data.get('deadline'),
-                    application_url=opportunity_data.get('website', ''),
-                    compensation=opportunity_data.get('compensation', '')
-                )
-                
-                # Mark as imported
-                result.imported = True
-                result.imported_at = timezone.now()
-                result.save()
-                
-                imported_count += 1
-                
-            except VenueResult.DoesNotExist:
+            result = results.get(_index(idx))
+            if result is None:
                 errors.append(f"Opportunity result at index {idx} not found")
-            except Exception as e:
-                errors.append(f"Error importing opportunity at index {idx}: {str(e)}")
+                continue
+            
+            # Check if already imported (or selected twice)
+            if result.imported:
+                errors.append(f"Opportunity at index {idx} already imported")
+                continue
+            
+            opportunity_data = result.data
+            opportunity = Opportunity(
+                user=request.user,
+                title=opportunity_data.get('title', ''),
+                organization=opportunity_data.get('organization', ''),
+                description=opportunity_data.get('description', ''),
+                opportunity_type=opportunity_data.get('opportunity_type', 'other'),
+                status='active',  # Default status
+                location=opportunity_data.get('location', ''),
+                deadline=opportunity_data.get('deadline'),
+                application_url=opportunity_data.get('website', ''),
+                compensation=opportunity_data.get('compensation', '')
+            )
+            try:
+                # The prompt asks for more types than the model's choices, so those aren't checked
+                opportunity.clean_fields(exclude=['user', 'opportunity_type'])
+            except ValidationError as e:
+                errors.append(f"Error importing opportunity at index {idx}: {'; '.join(e.messages)}")
+                continue
+            
+            result.imported = True
+            result.imported_at = timezone.now()
+            imported.append(result)
+            opportunities.append(opportunity)
+        
+        # Create the opportunities and mark their results imported together
+        with transaction.atomic():
+            Opportunity.objects.bulk_create(opportunities)
+            VenueResult.objects.bulk_update(imported, ['imported', 'imported_at'])
+        imported_count = len(imported)
         
         return Response({
             "total_imported": imported_count,
@@ -364,4 +430,30 @@ def import_opportunities(request, search_id):
     except VenueSearch.DoesNotExist:
         return Response({"error": "Search not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_client_stats(request):
+    """Connection reuse counters and circuit breaker state for the shared OpenAI client"""
+    return Response({**get_connection_stats(), 'circuit_state': get_circuit_breaker().state})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_usage_summary(request):
+    """AI call counts, tokens, estimated cost and latency percentiles by day and endpoint"""
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return Response({"error": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(usage_summary(days=days, endpoint=request.query_params.get('endpoint')))
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_throttle_stats(request):
+    """Allowed and throttled requests by day, scope and tier"""
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return Response({"error": "days must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'rates': settings.THROTTLE_RATES, 'days': throttle_stats(days=days)})
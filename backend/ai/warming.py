@@ -0,0 +1,166 @@
+"""
+Keep the discovery cache warm for the most searched locations.
+
+Most discovery traffic is for the same few dozen metro areas. The warmer
+ranks locations by how often they were searched recently, across venue
+searches (AISearchQuery), networking searches (NetworkingSearchQuery) and the
+ai app's venue listings (VenueSearch). Locations are grouped by discovery
+cache key, so "St. Louis, Missouri, 20" and "Saint Louis, MO, 25" count
+together. Entries of the top locations that are missing or close to expiry
+are refreshed, so the first request of the day finds them in the cache.
+
+Refreshes are logged as `cache-warming` in the usage telemetry, and those
+logs are what the daily token budget is checked against.
+"""
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from utils.ai.cache import acached_discovery, discovery_cache_expiry, discovery_cache_key
+from utils.ai.openai_client import adiscover_networking, adiscover_venues, venue_discovery_messages
+from utils.ai.resilience import AIUnavailable, estimate_tokens
+from utils.ai.telemetry import ai_call_context
+
+from api.venues.models import AISearchQuery
+from networking.models import NetworkingSearchQuery
+from .models import AICallLog, VenueSearch
+from .views import generate_venue_listing
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT = 'cache-warming'
+
+# How each search type is recomputed, matching the views that fill the cache
+COMPUTE = {
+    'venue': lambda state, city: lambda radius: adiscover_venues(state, city, radius),
+    'networking': lambda state, city: lambda radius: adiscover_networking(state, city, radius),
+    'venue_search': lambda state, city: lambda radius: sync_to_async(generate_venue_listing)(state, city, radius),
+}
+
+
+def popular_locations(days=None, limit=None):
+    """
+    Rank recently searched locations by number of searches.
+
+    Args:
+        days (int): Lookback window, default AI_CACHE_WARM_LOOKBACK_DAYS
+        limit (int): Locations to return, default AI_CACHE_WARM_TOP_N
+
+    Returns:
+        list: Dicts with search_type, state, city, radius, key and searches,
+        most searched first. The location fields come from the latest search.
+    """
+    days = days or settings.AI_CACHE_WARM_LOOKBACK_DAYS
+    limit = limit or settings.AI_CACHE_WARM_TOP_N
+    since = timezone.now() - timedelta(days=days)
+
+    sources = [
+        ('venue', AISearchQuery.objects.all()),
+        ('networking', NetworkingSearchQuery.objects.all()),
+        ('venue_search', VenueSearch.objects.filter(search_type='venue')),
+    ]
+    counts = Counter()
+    latest = {}
+    for search_type, queryset in sources:
+        rows = (queryset.filter(created_at__gte=since)
+                .order_by('created_at')
+                .values_list('state', 'city', 'radius'))
+        for state, city, radius in rows.iterator():
+            if not state or not city:
+                continue
+            key = discovery_cache_key(search_type, state, city, radius)
+            counts[key] += 1
+            # Rows are oldest first, so the latest spelling wins
+            latest[key] = {'search_type': search_type, 'state': state, 'city': city, 'radius': radius}
+
+    return [
+        {**latest[key], 'key': key, 'searches': searches}
+        for key, searches in counts.most_common(limit)
+    ]
+
+
+def tokens_spent_today():
+    """Tokens used by cache warming since midnight, from the usage telemetry"""
+    midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    totals = AICallLog.objects.filter(endpoint=ENDPOINT, created_at__gte=midnight).aggregate(
+        prompt=Sum('prompt_tokens'), completion=Sum('completion_tokens')
+    )
+    return (totals['prompt'] or 0) + (totals['completion'] or 0)
+
+
+async def _warm(locations, budget, refresh_within, dry_run):
+    results = []
+    spent = await sync_to_async(tokens_spent_today)()
+    # Without telemetry nothing is logged, so count estimates instead
+    measured = settings.AI_TELEMETRY_ENABLED
+    now = time.time()
+
+    for index, location in enumerate(locations):
+        state, city, radius = location['state'], location['city'], location['radius']
+        result = {**location}
+        results.append(result)
+
+        expires = await sync_to_async(discovery_cache_expiry)(location['key'])
+        if expires is not None and expires - now > refresh_within:
+            result['status'] = 'fresh'
+            continue
+
+        estimate = estimate_tokens({'messages': venue_discovery_messages(state, city, radius)})
+        if spent + estimate > budget:
+            logger.info(f"Cache warming budget reached ({spent} of {budget} tokens used today)")
+            result['status'] = 'over-budget'
+            continue
+        if dry_run:
+            result['status'] = 'would-warm'
+            continue
+
+        compute = COMPUTE[location['search_type']](state, city)
+        try:
+            value, _ = await acached_discovery(location['search_type'], state, city, radius, compute, refresh=True)
+        except AIUnavailable as e:
+            # Upstream is unhealthy; leave the rest for the next run
+            logger.warning(f"Stopping cache warming: {str(e)}")
+            result['status'] = 'failed'
+            result['error'] = str(e)
+            for remaining in locations[index + 1:]:
+                results.append({**remaining, 'status': 'skipped'})
+            break
+        except Exception as e:
+            logger.exception(f"Could not warm {location['search_type']} cache for {city}, {state}")
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        else:
+            result['status'] = 'warmed' if value else 'empty'
+
+        spent = await sync_to_async(tokens_spent_today)() if measured else spent + estimate
+
+    return results, spent
+
+
+def warm_discovery_cache(limit=None, days=None, budget=None, refresh_within=None, dry_run=False):
+    """
+    Refresh the cached discovery results of the most searched locations.
+
+    Args:
+        limit (int): Locations to keep warm, default AI_CACHE_WARM_TOP_N
+        days (int): Lookback window for ranking, default AI_CACHE_WARM_LOOKBACK_DAYS
+        budget (int): Tokens cache warming may use per day, default AI_CACHE_WARM_DAILY_TOKENS
+        refresh_within (int): Refresh entries expiring within this many seconds,
+            default AI_CACHE_WARM_REFRESH_WITHIN
+        dry_run (bool): Report what would be refreshed without calling the model
+
+    Returns:
+        dict: {"locations": [...with a status each], "tokens_spent_today": int, "budget": int}
+    """
+    budget = settings.AI_CACHE_WARM_DAILY_TOKENS if budget is None else budget
+    refresh_within = settings.AI_CACHE_WARM_REFRESH_WITHIN if refresh_within is None else refresh_within
+    locations = popular_locations(days=days, limit=limit)
+
+    with ai_call_context(ENDPOINT):
+        results, spent = async_to_sync(_warm)(locations, budget, refresh_within, dry_run)
+
+    return {'locations': results, 'tokens_spent_today': spent, 'budget': budget}
@@ -0,0 +1,293 @@
+from collections import defaultdict
+from pydub import AudioSegment
+from django.db import transaction
+from django.db.models import Count
+import numpy as np
+import logging
+
+from .models import AudioFile, AudioFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Audio is resampled to a low mono rate before analysis; the peaks we care
+# about all sit well below 5 kHz, and the smaller FFT keeps ingest cheap.
+FINGERPRINT_SAMPLE_RATE = 11025
+FFT_WINDOW = 1024
+FFT_HOP = 512
+
+# Frequency bands (in FFT bins) from which one peak per frame is picked
+PEAK_BANDS = [(10, 20), (20, 40), (40, 80), (80, 160), (160, 320), (320, 512)]
+
+# Each anchor peak is paired with up to FAN_OUT later peaks inside the target zone
+FAN_OUT = 5
+MAX_DELTA_FRAMES = 63
+
+# A candidate is reported as a likely duplicate once this share of the
+# shorter file's hashes line up at a single offset
+DUPLICATE_MIN_SCORE = 0.05
+DUPLICATE_MIN_MATCHES = 25
+
+# Hashes this common carry almost no signal, and every library row of one is
+# paired with every probe offset of it, so they are left out of the lookup
+MAX_HASH_FILES = 50
+MAX_HASH_PROBE_OFFSETS = 8
+
+
+def load_samples(audio_path):
+    """
+    Decode an audio file into normalized mono samples at the fingerprint rate
+
+    Args:
+        audio_path (str): Path to the audio file
+
+    Returns:
+        numpy.ndarray: Float samples in the range [-1, 1]
+    """
+    audio = AudioSegment.from_file(audio_path)
+    audio = audio.set_channels(1).set_frame_rate(FINGERPRINT_SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    peak = np.max(np.abs(samples)) if samples.size else 0
+    if peak == 0:
+        return np.zeros_like(samples)
+    return samples / peak
+
+
+def spectrogram(samples):
+    """Return the log-magnitude spectrogram of the samples as (frames, bins)"""
+    if samples.size < FFT_WINDOW:
+        return np.zeros((0, FFT_WINDOW // 2), dtype=np.float32)
+
+    frame_count = 1 + (samples.size - FFT_WINDOW) // FFT_HOP
+    frames = np.lib.stride_tricks.as_strided(
+        samples,
+        shape=(frame_count, FFT_WINDOW),
+        strides=(samples.strides[0] * FFT_HOP, samples.strides[0]),
+    )
+    window = np.hanning(FFT_WINDOW).astype(np.float32)
+    magnitudes = np.abs(np.fft.rfft(frames * window, axis=1))[:, :FFT_WINDOW // 2]
+    return np.log1p(magnitudes)
+
+
+def find_peaks(spec):
+    """
+    Pick the strongest bin of each band per frame, keeping only peaks that
+    stand out from the frame's average energy.
+
+    Returns:
+        list: (frame, bin) tuples ordered by frame
+    """
+    if spec.shape[0] == 0:
+        return []
+
+    band_peaks = []
+    for low, high in PEAK_BANDS:
+        band = spec[:, low:high]
+        bins = np.argmax(band, axis=1)
+        band_peaks.append((bins + low, band[np.arange(band.shape[0]), bins]))
+
+    peak_bins = np.stack([bins for bins, _ in band_peaks], axis=1)
+    peak_values = np.stack([values for _, values in band_peaks], axis=1)
+    threshold = peak_values.mean(axis=1, keepdims=True)
+    frames, columns = np.nonzero(peak_values > threshold)
+    return list(zip(frames.tolist(), peak_bins[frames, columns].tolist()))
+
+
+def hash_peaks(peaks):
+    """
+    Combine anchor peaks with nearby target peaks into landmark hashes.
+
+    Each hash packs the anchor bin, target bin and frame delta into a 24-bit
+    integer, so it is independent of where in the file the pair occurs. An
+    anchor's targets are the first FAN_OUT peaks in later frames, at most
+    MAX_DELTA_FRAMES away; peaks are ordered by frame, so those are the
+    FAN_OUT peaks after the anchor's frame, found for every anchor at once.
+
+    Returns:
+        list: (hash, anchor_frame) tuples
+    """
+    if not peaks:
+        return []
+
+    frames, bins = np.array(peaks, dtype=np.int64).T
+    # Index of the first peak in a later frame than each anchor
+    first_target = np.searchsorted(frames, frames, side='right')
+    targets = first_target[:, None] + np.arange(FAN_OUT)
+    in_range = targets < len(peaks)
+    targets = np.minimum(targets, len(peaks) - 1)
+    deltas = frames[targets] - frames[:, None]
+    valid = in_range & (deltas <= MAX_DELTA_FRAMES)
+
+    # Row-major order keeps each anchor's hashes together, nearest target first
+    anchors, columns = np.nonzero(valid)
+    values = (bins[anchors] << 15) | (bins[targets[anchors, columns]] << 6) | deltas[anchors, columns]
+    return list(zip(values.tolist(), frames[anchors].tolist()))
+
+
+def compute_fingerprint(audio_path):
+    """
+    Compute the spectral-peak fingerprint of an audio file
+
+    Args:
+        audio_path (str): Path to the audio file
+
+    Returns:
+        list: (hash, offset) tuples, or None if the file could not be analysed
+    """
+    try:
+        samples = load_samples(audio_path)
+        return hash_peaks(find_peaks(spectrogram(samples)))
+    except Exception as e:
+        logger.error(f"Error computing fingerprint for {audio_path}: {e}", exc_info=True)
+        return None
+
+
+def store_fingerprint(audio_file):
+    """
+    Compute and (re)store the fingerprint rows for an AudioFile
+
+    Args:
+        audio_file (AudioFile): The audio file to fingerprint
+
+    Returns:
+        int: Number of hashes stored, or None if fingerprinting failed
+    """
+    file_name = audio_file.file.name
+    hashes = compute_fingerprint(audio_file.file.path)
+    if hashes is None:
+        return None
+
+    with transaction.atomic():
+        # An edit may have replaced the file while it was being analysed; the
+        # fingerprint run the edit queued stores the new audio's hashes
+        if not AudioFile.objects.select_for_update().filter(id=audio_file.id, file=file_name).exists():
+            logger.info(f"AudioFile ID: {audio_file.id} changed while fingerprinting; discarding hashes")
+            return None
+        AudioFingerprint.objects.filter(audio_file=audio_file).delete()
+        AudioFingerprint.objects.bulk_create(
+            [AudioFingerprint(audio_file=audio_file, hash=h, offset=offset) for h, offset in hashes],
+            batch_size=2000,
+        )
+    logger.info(f"Stored {len(hashes)} fingerprint hashes for AudioFile ID: {audio_file.id}")
+    return len(hashes)
+
+
+def fingerprint_audio_file(audio_file_id):
+    """
+    Fingerprint an audio file by ID, for the background pool.
+
+    A missing fingerprint only disables duplicate lookup, so failures are
+    logged rather than raised.
+
+    Args:
+        audio_file_id (int): ID of the AudioFile to fingerprint
+
+    Returns:
+        int: Number of hashes stored, or None if fingerprinting failed
+    """
+    try:
+        audio_file = AudioFile.objects.get(id=audio_file_id)
+    except AudioFile.DoesNotExist:
+        logger.warning(f"AudioFile ID: {audio_file_id} disappeared before fingerprinting")
+        return None
+
+    stored = store_fingerprint(audio_file)
+    if stored is None:
+        logger.warning(f"Could not fingerprint AudioFile ID: {audio_file_id}")
+    return stored
+
+
+def find_duplicates(audio_file, limit=10):
+    """
+    Find audio files that contain a large, time-aligned part of this file.
+
+    Candidate rows are fetched through the hash index for the probe's own
+    hashes only, so the cost depends on the probe file rather than on the
+    size of the library. Hashes shared by very many files, or repeated many
+    times within the probe, are skipped. A candidate scores by the largest
+    group of matches sharing the same offset difference, which is what
+    separates a re-encode or trim of the same recording from files that
+    merely share some hashes.
+
+    Args:
+        audio_file (AudioFile): The file to look up
+        limit (int): Maximum number of candidates to return
+
+    Returns:
+        list: Dicts with the candidate AudioFile, aligned match count and score
+    """
+    probe_rows = np.array(
+        list(AudioFingerprint.objects.filter(audio_file=audio_file).values_list('hash', 'offset')),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    if not probe_rows.size:
+        return []
+    probe_count = len(probe_rows)
+
+    # Sort the probe by hash so each library row finds its probe offsets with a binary search
+    probe_rows = probe_rows[np.lexsort((probe_rows[:, 1], probe_rows[:, 0]))]
+    probe_hashes, probe_offsets = probe_rows[:, 0], probe_rows[:, 1]
+    hash_values, first, repeats = np.unique(probe_hashes, return_index=True, return_counts=True)
+    repeated = hash_values[repeats > MAX_HASH_PROBE_OFFSETS].tolist()
+
+    probe_hash_query = AudioFingerprint.objects.filter(audio_file=audio_file).values('hash')
+    common_hashes = (
+        AudioFingerprint.objects
+        .filter(hash__in=probe_hash_query)
+        .values('hash')
+        .annotate(files=Count('audio_file', distinct=True))
+        .filter(files__gt=MAX_HASH_FILES)
+        .values('hash')
+    )
+    matched_rows = (
+        AudioFingerprint.objects
+        .filter(hash__in=probe_hash_query)
+        .exclude(audio_file=audio_file)
+        .exclude(hash__in=common_hashes)
+        .exclude(hash__in=repeated)
+        .values_list('audio_file_id', 'hash', 'offset')
+    )
+    matched = np.array(list(matched_rows.iterator(chunk_size=5000)), dtype=np.int64).reshape(-1, 3)
+    if not matched.size:
+        return []
+
+    # Pair every matched row with each probe offset of its hash
+    positions = np.searchsorted(hash_values, matched[:, 1])
+    starts, counts = first[positions], repeats[positions]
+    row_index = np.repeat(np.arange(len(matched)), counts)
+    probe_index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    pairs = np.column_stack((matched[row_index, 0], matched[row_index, 2] - probe_offsets[probe_index]))
+
+    # Count matches per (file, offset difference) and keep each file's best alignment
+    unique_pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+    best_aligned = defaultdict(int)
+    for (file_id, _), count in zip(unique_pairs.tolist(), counts.tolist()):
+        best_aligned[file_id] = max(best_aligned[file_id], count)
+
+    candidate_ids = [file_id for file_id, count in best_aligned.items() if count >= DUPLICATE_MIN_MATCHES]
+    hash_counts = dict(
+        AudioFingerprint.objects
+        .filter(audio_file_id__in=candidate_ids)
+        .values('audio_file')
+        .annotate(total=Count('id'))
+        .values_list('audio_file', 'total')
+    )
+
+    scored = []
+    for file_id in candidate_ids:
+        # Score against the shorter file so a trimmed excerpt still matches its source
+        score = best_aligned[file_id] / min(probe_count, hash_counts.get(file_id, probe_count))
+        if score >= DUPLICATE_MIN_SCORE:
+            scored.append((file_id, best_aligned[file_id], min(score, 1.0)))
+    scored.sort(key=lambda item: item[2], reverse=True)
+    scored = scored[:limit]
+
+    files = AudioFile.objects.select_related('user').in_bulk([file_id for file_id, _, _ in scored])
+    return [
+        {
+            'audio_file': files[file_id],
+            'matches': matches,
+            'score': round(score, 3),
+        }
+        for file_id, matches, score in scored
+        if file_id in files
+    ]
@@ -0,0 +1,313 @@
+from pydub import AudioSegment
+from django.conf import settings
+from django.core.files.storage import default_storage
+import hashlib
+import json
+import logging
+import math
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+
+from .models import AudioFile
+
+logger = logging.getLogger(__name__)
+
+HLS_ROOT = 'hls'
+MANIFEST_NAME = 'segments.json'
+MASTER_PLAYLIST = 'master.m3u8'
+VARIANT_PLAYLIST = 'index.m3u8'
+
+# PCM format the audio is decoded to for hashing and fed to the segmenter in
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BYTES_PER_SAMPLE = 2
+
+# Segments are served straight from MEDIA_ROOT; make sure they get HLS content types
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+
+def hls_directory(audio_file):
+    """Return the media-relative directory holding an audio file's HLS package"""
+    return os.path.join(HLS_ROOT, str(audio_file.id))
+
+
+def master_playlist_url(audio_file):
+    """Return the public URL of the master playlist, served from MEDIA_ROOT"""
+    return default_storage.url(f"{HLS_ROOT}/{audio_file.id}/{MASTER_PLAYLIST}")
+
+
+def _write_atomic(path, content):
+    """Write a text file so players never read a half-written playlist"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as handle:
+        handle.write(content)
+    os.replace(temp_path, path)
+
+
+def _variant_playlist(segments, segment_seconds, complete):
+    """
+    Build a variant playlist for the segments written so far.
+
+    While packaging is still running the playlist is an EVENT playlist
+    without an end tag, so players can start on the first segment and pick
+    up later ones as they appear.
+    """
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        f'#EXT-X-TARGETDURATION:{math.ceil(segment_seconds)}',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+        f"#EXT-X-PLAYLIST-TYPE:{'VOD' if complete else 'EVENT'}",
+    ]
+    for segment in segments:
+        lines.append(f"#EXTINF:{segment['duration']:.3f},")
+        lines.append(segment['filename'])
+    if complete:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def _master_playlist(bitrates):
+    """Build the master playlist listing one variant per bitrate"""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for bitrate in bitrates:
+        bandwidth = int(bitrate.rstrip('k')) * 1000
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},CODECS="mp4a.40.2"')
+        lines.append(f'{bitrate}/{VARIANT_PLAYLIST}')
+    return '\n'.join(lines) + '\n'
+
+
+def _load_manifest(directory):
+    """Load the segment hashes and files recorded by the previous packaging run"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) and 'digests' in manifest else {}
+
+
+def _reusable_prefix(manifest, directory, segment_seconds, bitrates):
+    """
+    Digests of the leading segments of the previous run that can be kept:
+    same segment length and bitrates, and every bitrate's file still on disk
+    """
+    if manifest.get('segment_seconds') != segment_seconds or list(manifest.get('playlists', {})) != bitrates:
+        return []
+    digests = []
+    for index, digest in enumerate(manifest['digests']):
+        if not all(
+            index < len(manifest['playlists'][bitrate])
+            and os.path.exists(os.path.join(directory, bitrate, manifest['playlists'][bitrate][index]['filename']))
+            for bitrate in bitrates
+        ):
+            break
+        digests.append(digest)
+    return digests
+
+
+def _pcm_chunks(path, chunk_bytes):
+    """
+    Decode an audio file with ffmpeg and yield its PCM one chunk at a time,
+    so memory use doesn't grow with the length of the recording
+    """
+    with tempfile.TemporaryFile() as errors:
+        decoder = subprocess.Popen(
+            [AudioSegment.converter, '-v', 'error', '-nostdin', '-i', path, '-vn',
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', str(CHANNELS), '-ar', str(SAMPLE_RATE), 'pipe:1'],
+            stdout=subprocess.PIPE, stderr=errors,
+        )
+        try:
+            while True:
+                chunk = decoder.stdout.read(chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+        except BaseException:
+            # Stopped early; don't leave ffmpeg blocked on a full pipe
+            decoder.kill()
+            raise
+        finally:
+            decoder.stdout.close()
+            decoder.wait()
+        if decoder.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(f"ffmpeg could not decode {path}: {errors.read().decode(errors='replace')[-500:]}")
+
+
+def _start_segmenter(directory, bitrates, first_index, segment_seconds, token, errors):
+    """
+    Start one ffmpeg encoding PCM from stdin into HLS segments at every bitrate.
+
+    Segments are numbered on from the ones already in each variant playlist
+    (append_list), and timestamps start where `first_index` sits in the audio.
+    ffmpeg rewrites the playlists after every segment.
+    """
+    command = [
+        AudioSegment.converter, '-v', 'error', '-nostdin',
+        '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', str(CHANNELS), '-i', 'pipe:0',
+    ]
+    for bitrate in bitrates:
+        command += [
+            '-map', '0:a', '-c:a', 'aac', '-b:a', bitrate,
+            # Keep timestamps continuous with the segments kept from the previous run
+            '-output_ts_offset', f"{first_index * segment_seconds:.3f}",
+            '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'event',
+            '-hls_flags', 'append_list+temp_file',
+            '-hls_segment_filename', os.path.join(directory, bitrate, f"seg_{token}_%05d.ts"),
+            os.path.join(directory, bitrate, VARIANT_PLAYLIST),
+        ]
+    return subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors)
+
+
+def _read_playlist(path):
+    """The (filename, duration) segments listed in a variant playlist"""
+    segments = []
+    duration = None
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            elif line and not line.startswith('#'):
+                segments.append({'filename': line, 'duration': duration})
+    return segments
+
+
+def _package(audio_file):
+    """
+    Write the HLS package for the audio file's current contents.
+
+    The audio is decoded once, through a pipe, and hashed one segment-length
+    chunk at a time. Leading chunks whose hash matches the previous run keep
+    their segments; from the first changed chunk on, the PCM is piped into
+    ffmpeg's HLS segmenter, which encodes every bitrate in one pass. Trimming
+    the end or touching up a late section therefore re-encodes only the tail.
+
+    Returns:
+        tuple: (segment count, segments reused per bitrate)
+    """
+    segment_seconds = settings.AUDIO_HLS_SEGMENT_SECONDS
+    bitrates = settings.AUDIO_HLS_BITRATES
+    directory = os.path.join(settings.MEDIA_ROOT, hls_directory(audio_file))
+    previous = _load_manifest(directory)
+    reusable = _reusable_prefix(previous, directory, segment_seconds, bitrates)
+
+    for bitrate in bitrates:
+        os.makedirs(os.path.join(directory, bitrate), exist_ok=True)
+    _write_atomic(os.path.join(directory, MASTER_PLAYLIST), _master_playlist(bitrates))
+
+    chunk_bytes = int(segment_seconds * SAMPLE_RATE) * CHANNELS * BYTES_PER_SAMPLE
+    token = uuid.uuid4().hex[:8]
+    digests = []
+    kept = 0
+    segmenter = None
+    with tempfile.TemporaryFile() as errors:
+        try:
+            for index, chunk in enumerate(_pcm_chunks(audio_file.file.path, chunk_bytes)):
+                digest = hashlib.sha1(chunk).hexdigest()[:12]
+                digests.append(digest)
+                if segmenter is None and index < len(reusable) and reusable[index] == digest:
+                    kept = index + 1
+                    continue
+                if segmenter is None:
+                    # Players can start on the kept segments while the rest are encoded
+                    for bitrate in bitrates:
+                        _write_atomic(
+                            os.path.join(directory, bitrate, VARIANT_PLAYLIST),
+                            _variant_playlist(previous['playlists'][bitrate][:kept] if kept else [],
+                                              segment_seconds, complete=False),
+                        )
+                    segmenter = _start_segmenter(directory, bitrates, index, segment_seconds, token, errors)
+                try:
+                    segmenter.stdin.write(chunk)
+                except BrokenPipeError:
+                    # The segmenter exited; its error is reported below
+                    break
+        finally:
+            if segmenter is not None:
+                try:
+                    segmenter.stdin.close()
+                except BrokenPipeError:
+                    pass
+                segmenter.wait()
+        if segmenter is not None and segmenter.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(f"ffmpeg HLS segmenter failed: {errors.read().decode(errors='replace')[-500:]}")
+
+    if not digests:
+        raise ValueError("The audio file has no samples")
+
+    playlists = {}
+    for bitrate in bitrates:
+        segments = previous['playlists'][bitrate][:kept] if kept else []
+        if segmenter is not None:
+            segments += _read_playlist(os.path.join(directory, bitrate, VARIANT_PLAYLIST))[kept:]
+        playlists[bitrate] = segments
+        _write_atomic(
+            os.path.join(directory, bitrate, VARIANT_PLAYLIST),
+            _variant_playlist(segments, segment_seconds, complete=True),
+        )
+        # Drop segments left over from the previous version of the audio
+        current = {segment['filename'] for segment in segments}
+        for name in os.listdir(os.path.join(directory, bitrate)):
+            if name.endswith('.ts') and name not in current:
+                os.remove(os.path.join(directory, bitrate, name))
+
+    _write_atomic(
+        os.path.join(directory, MANIFEST_NAME),
+        json.dumps({'segment_seconds': segment_seconds, 'digests': digests, 'playlists': playlists}),
+    )
+    return len(digests), kept
+
+
+def package_hls(audio_file_id):
+    """
+    Package an audio file into AAC segments with HLS playlists.
+
+    Only one run per file is active at a time (see AudioFileViewSet._schedule_hls).
+    An edit made while a run is going resets the status to pending, and the
+    run then packages the file again instead of marking it ready.
+
+    Args:
+        audio_file_id (int): ID of the AudioFile to package
+
+    Returns:
+        bool: True if the package was written
+    """
+    while True:
+        try:
+            audio_file = AudioFile.objects.get(id=audio_file_id)
+        except AudioFile.DoesNotExist:
+            logger.warning(f"AudioFile ID: {audio_file_id} disappeared before HLS packaging")
+            # Drop anything written after the file was deleted
+            shutil.rmtree(os.path.join(settings.MEDIA_ROOT, HLS_ROOT, str(audio_file_id)), ignore_errors=True)
+            return False
+
+        AudioFile.objects.filter(id=audio_file.id).update(hls_status='processing')
+        try:
+            segment_count, reused = _package(audio_file)
+        except Exception as e:
+            logger.error(f"Error packaging HLS for AudioFile ID: {audio_file.id}: {e}", exc_info=True)
+            if AudioFile.objects.filter(id=audio_file.id, hls_status='processing').update(hls_status='failed'):
+                return False
+            # Edited mid-run, which can pull the old file out from under ffmpeg
+            continue
+
+        if AudioFile.objects.filter(id=audio_file.id, hls_status='processing').update(hls_status='ready'):
+            logger.info(
+                f"Packaged AudioFile ID: {audio_file.id} as HLS "
+                f"({segment_count} segments x {len(settings.AUDIO_HLS_BITRATES)} bitrates, {reused} reused)"
+            )
+            return True
+        logger.info(f"AudioFile ID: {audio_file.id} was edited while packaging; packaging it again")
+
+
+def remove_hls(audio_file):
+    """Delete an audio file's HLS package from disk"""
+    shutil.rmtree(os.path.join(settings.MEDIA_ROOT, hls_directory(audio_file)), ignore_errors=True)
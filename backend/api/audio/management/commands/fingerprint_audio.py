@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.audio.models import AudioFile
+from api.audio.fingerprint import store_fingerprint
+
+
+class Command(BaseCommand):
+    help = "Compute fingerprints for audio files uploaded before fingerprinting existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-fingerprint files that already have one")
+
+    def handle(self, *args, **options):
+        audio_files = AudioFile.objects.all()
+        if not options['all']:
+            audio_files = audio_files.filter(fingerprints__isnull=True)
+
+        done = failed = 0
+        for audio_file in audio_files.distinct().iterator():
+            if store_fingerprint(audio_file) is None:
+                failed += 1
+                self.stderr.write(f"Failed to fingerprint AudioFile {audio_file.id} ({audio_file.title})")
+            else:
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Fingerprinted {done} file(s), {failed} failure(s)"))
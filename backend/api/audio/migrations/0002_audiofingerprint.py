@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.IntegerField()),
+                ('offset', models.IntegerField()),
+                ('audio_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='audio.audiofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hash', 'audio_file'], name='audio_fprint_hash_idx')],
+            },
+        ),
+    ]
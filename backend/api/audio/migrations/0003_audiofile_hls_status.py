@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audio', '0002_audiofingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiofile',
+            name='hls_status',
+            field=models.CharField(choices=[('none', 'Not packaged'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=20),
+        ),
+    ]
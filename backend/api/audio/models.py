@@ -14,6 +14,14 @@ def audio_file_path(instance, filename):
 
 class AudioFile(models.Model):
     """Model representing an audio file"""
+    HLS_STATUS_CHOICES = [
+        ('none', 'Not packaged'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     title = models.CharField(max_length=255)
     file = models.FileField(
         upload_to=audio_file_path,
@@ -22,6 +30,7 @@ class AudioFile(models.Model):
     file_type = models.CharField(max_length=10)
     duration = models.FloatField(null=True, blank=True)
     waveform_data = models.JSONField(null=True, blank=True)
+    hls_status = models.CharField(max_length=20, choices=HLS_STATUS_CHOICES, default='none')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='audio_files')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -51,4 +60,18 @@ class AudioEdit(models.Model):
         ordering = ['created_at']
 
     def __str__(self):
-        return f"{self.edit_type} edit on {self.audio_file.title}" 
\ No newline at end of file
+        return f"{self.edit_type} edit on {self.audio_file.title}"
+
+class AudioFingerprint(models.Model):
+    """Spectral-peak landmark hash of an audio file, used for near-duplicate lookup"""
+    audio_file = models.ForeignKey(AudioFile, on_delete=models.CASCADE, related_name='fingerprints')
+    hash = models.IntegerField()
+    offset = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['hash', 'audio_file'], name='audio_fprint_hash_idx'),
+        ]
+
+    def __str__(self):
+        return f"Fingerprint {self.hash} at {self.offset} for {self.audio_file_id}"
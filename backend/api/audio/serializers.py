@@ -19,10 +19,10 @@ class AudioFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = AudioFile
         fields = [
-            'id', 'title', 'file', 'file_type', 'duration', 'waveform_data',
+            'id', 'title', 'file', 'file_type', 'duration', 'waveform_data', 'hls_status',
             'created_at', 'updated_at', 'user_id', 'user', 'username'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user_id', 'username']
+        read_only_fields = ['id', 'hls_status', 'created_at', 'updated_at', 'user_id', 'username']
     
     def get_username(self, obj):
         """Get the username of the user who uploaded the file"""
@@ -42,4 +42,10 @@ class AudioFileDetailSerializer(AudioFileSerializer):
     edits = AudioEditSerializer(many=True, read_only=True)
     
     class Meta(AudioFileSerializer.Meta):
-        fields = AudioFileSerializer.Meta.fields + ['edits'] 
\ No newline at end of file
+        fields = AudioFileSerializer.Meta.fields + ['edits'] 
+
+class AudioDuplicateSerializer(serializers.Serializer):
+    """Serializer for a near-duplicate candidate found by fingerprint lookup"""
+    audio_file = AudioFileSerializer(read_only=True)
+    matches = serializers.IntegerField(read_only=True)
+    score = serializers.FloatField(read_only=True)
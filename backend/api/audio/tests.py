@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+import time
+import wave
+from unittest import mock, skipUnless
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import hls
+from .fingerprint import (
+    FAN_OUT, MAX_DELTA_FRAMES, MAX_HASH_PROBE_OFFSETS, find_duplicates, hash_peaks, store_fingerprint,
+)
+from .models import AudioFile, AudioFingerprint
+from .views.audio_views import AudioFileViewSet
+
+SAMPLE_RATE = 22050
+
+
+def tone_track(seed, seconds):
+    """A sequence of random chords, a stand-in for music"""
+    rng = np.random.default_rng(seed)
+    note_samples = SAMPLE_RATE // 4
+    t = np.arange(note_samples) / SAMPLE_RATE
+    notes = []
+    for _ in range(int(seconds * 4)):
+        freqs = rng.uniform(100, 4000, size=3)
+        notes.append(sum(np.sin(2 * np.pi * f * t) for f in freqs))
+    return np.concatenate(notes) / 3
+
+
+def wav_bytes(samples):
+    handle = tempfile.SpooledTemporaryFile()
+    with wave.open(handle, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+    handle.seek(0)
+    return handle.read()
+
+
+def reference_hashes(peaks):
+    """The pairing rule spelled out one anchor at a time"""
+    hashes = []
+    for i, (anchor_frame, anchor_bin) in enumerate(peaks):
+        targets = [(frame, bin) for frame, bin in peaks[i + 1:] if frame > anchor_frame][:FAN_OUT]
+        for frame, bin in targets:
+            if frame - anchor_frame <= MAX_DELTA_FRAMES:
+                hashes.append(((anchor_bin << 15) | (bin << 6) | (frame - anchor_frame), anchor_frame))
+    return hashes
+
+
+class HashPeaksTests(SimpleTestCase):
+    def test_matches_pairing_rule(self):
+        rng = np.random.default_rng(1)
+        for _ in range(50):
+            frames = np.sort(rng.integers(0, 400, size=rng.integers(0, 200)))
+            peaks = [(int(frame), int(rng.integers(10, 512))) for frame in frames]
+            self.assertEqual(hash_peaks(peaks), reference_hashes(peaks))
+
+    def test_skips_targets_in_same_frame_and_far_away(self):
+        peaks = [(0, 10), (0, 20), (1, 30), (100, 40)]
+        self.assertEqual(
+            hash_peaks(peaks),
+            [((10 << 15) | (30 << 6) | 1, 0), ((20 << 15) | (30 << 6) | 1, 0)],
+        )
+
+    def test_long_track_is_linear(self):
+        # Three hours of peaks at the real frame rate; pairwise slicing took minutes
+        frames = np.repeat(np.arange(3 * 60 * 60 * 22), 3)
+        peaks = [(int(frame), 100) for frame in frames]
+        started = time.monotonic()
+        hashes = hash_peaks(peaks)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(len(hashes), (len(peaks) - 3) * FAN_OUT - 3 * 2)
+
+
+class AudioTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+
+    def save_audio(self, title, samples):
+        audio_file = AudioFile(title=title, file_type='wav', user=self.user)
+        audio_file.file.save(f'{title}.wav', ContentFile(wav_bytes(samples)), save=True)
+        return audio_file
+
+
+class FindDuplicatesTests(AudioTestCase):
+    def upload(self, title, samples):
+        audio_file = self.save_audio(title, samples)
+        self.assertTrue(store_fingerprint(audio_file))
+        return audio_file
+
+    def test_finds_trimmed_noisy_copy_only(self):
+        track = tone_track(seed=1, seconds=30)
+        original = self.upload('original', track)
+        noise = np.random.default_rng(2).normal(0, 0.02, size=track.size)
+        excerpt = self.upload('excerpt', (track + noise)[5 * SAMPLE_RATE:20 * SAMPLE_RATE])
+        self.upload('other', tone_track(seed=3, seconds=30))
+
+        matches = find_duplicates(original)
+        self.assertEqual([match['audio_file'] for match in matches], [excerpt])
+        self.assertGreater(matches[0]['score'], 0.2)
+
+    def fingerprinted(self, title, rows):
+        audio_file = AudioFile.objects.create(title=title, file=f'{title}.wav', file_type='wav', user=self.user)
+        AudioFingerprint.objects.bulk_create(
+            AudioFingerprint(audio_file=audio_file, hash=hash_value, offset=offset) for hash_value, offset in rows
+        )
+        return audio_file
+
+    def test_aligns_hashes_repeated_within_probe(self):
+        probe = self.fingerprinted(
+            'probe', [(hash_value, offset) for hash_value in range(30) for offset in (hash_value, hash_value + 1000)]
+        )
+        copy = self.fingerprinted('copy', [(hash_value, hash_value + 7) for hash_value in range(30)])
+        self.assertEqual([(match['audio_file'], match['matches']) for match in find_duplicates(probe)], [(copy, 30)])
+
+    def test_skips_hashes_repeated_many_times_in_probe(self):
+        offsets = range(MAX_HASH_PROBE_OFFSETS * 10)
+        probe = self.fingerprinted('probe', [(7, offset) for offset in offsets])
+        self.fingerprinted('copy', [(7, offset) for offset in offsets])
+        self.assertEqual(find_duplicates(probe), [])
+
+    def test_skips_hashes_shared_by_many_files(self):
+        track = tone_track(seed=1, seconds=30)
+        original = self.upload('original', track)
+        self.upload('copy', track)
+        self.assertEqual(len(find_duplicates(original)), 1)
+        with mock.patch('api.audio.fingerprint.MAX_HASH_FILES', 1):
+            self.assertEqual(find_duplicates(original), [])
+
+    def test_discards_hashes_of_replaced_file(self):
+        audio_file = self.upload('original', tone_track(seed=1, seconds=5))
+        stale = AudioFile.objects.get(id=audio_file.id)
+        audio_file.file.save('edited.wav', ContentFile(wav_bytes(tone_track(seed=4, seconds=5))), save=True)
+        self.assertIsNone(store_fingerprint(stale))
+
+
+class ScheduleHlsTests(AudioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.audio_file = self.save_audio('set', tone_track(seed=1, seconds=1))
+        patcher = mock.patch('api.audio.views.audio_views.run_in_background')
+        self.run_in_background = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_status(self, status):
+        AudioFile.objects.filter(id=self.audio_file.id).update(hls_status=status)
+        self.audio_file.refresh_from_db()
+
+    def test_starts_one_run(self):
+        AudioFileViewSet()._schedule_hls(self.audio_file)
+        AudioFileViewSet()._schedule_hls(self.audio_file)
+        self.run_in_background.assert_called_once_with(hls.package_hls, self.audio_file.id)
+        self.assertEqual(self.audio_file.hls_status, 'pending')
+
+    def test_edit_during_packaging_requeues_running_job(self):
+        self.set_status('processing')
+        AudioFileViewSet()._schedule_hls(self.audio_file, changed=True)
+        self.run_in_background.assert_not_called()
+        self.assertEqual(AudioFile.objects.get(id=self.audio_file.id).hls_status, 'pending')
+
+    def test_request_during_packaging_leaves_job_alone(self):
+        self.set_status('processing')
+        AudioFileViewSet()._schedule_hls(self.audio_file)
+        self.run_in_background.assert_not_called()
+        self.assertEqual(self.audio_file.hls_status, 'processing')
+
+    def test_package_runs_again_after_edit(self):
+        calls = []
+
+        def package(audio_file):
+            calls.append(audio_file.id)
+            if len(calls) == 1:
+                AudioFileViewSet()._schedule_hls(audio_file, changed=True)
+            return 1, 0
+
+        with mock.patch.object(hls, '_package', side_effect=package):
+            self.assertTrue(hls.package_hls(self.audio_file.id))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(AudioFile.objects.get(id=self.audio_file.id).hls_status, 'ready')
+
+
+@skipUnless(shutil.which('ffmpeg'), "ffmpeg is not installed")
+@override_settings(AUDIO_HLS_SEGMENT_SECONDS=2.0, AUDIO_HLS_BITRATES=['64k'])
+class PackageHlsTests(AudioTestCase):
+    def segments(self, audio_file):
+        directory = os.path.join(self.media_root, hls.hls_directory(audio_file), '64k')
+        return [segment['filename'] for segment in hls._read_playlist(os.path.join(directory, hls.VARIANT_PLAYLIST))]
+
+    def test_edit_reencodes_from_first_changed_segment(self):
+        track = tone_track(seed=1, seconds=10)
+        audio_file = self.save_audio('set', track)
+        self.assertTrue(hls.package_hls(audio_file.id))
+        first = self.segments(audio_file)
+        self.assertGreaterEqual(len(first), 5)
+
+        edited = track.copy()
+        edited[7 * SAMPLE_RATE:] *= 0.5
+        audio_file.file.save('edited.wav', ContentFile(wav_bytes(edited)), save=True)
+        self.assertTrue(hls.package_hls(audio_file.id))
+        second = self.segments(audio_file)
+        self.assertEqual(second[:3], first[:3])
+        self.assertTrue(set(second[3:]).isdisjoint(first))
+        self.assertEqual(AudioFile.objects.get(id=audio_file.id).hls_status, 'ready')
@@ -8,8 +8,12 @@ from django.http import FileResponse
 import os
 from django.conf import settings
 from ..models import AudioFile, AudioEdit
-from ..serializers import AudioFileSerializer, AudioFileDetailSerializer, AudioEditSerializer
+from ..serializers import AudioFileSerializer, AudioFileDetailSerializer, AudioEditSerializer, AudioDuplicateSerializer
 from ..processing import process_audio, generate_waveform_data
+from ..fingerprint import fingerprint_audio_file, find_duplicates
+from ..hls import package_hls, remove_hls, master_playlist_url
+from utils.background import run_in_background
+from utils.throttling import AudioEditThrottle, AudioUploadThrottle
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,6 +40,14 @@ class AudioFileViewSet(viewsets.ModelViewSet):
         # Return all audio files instead of filtering by user
         return AudioFile.objects.all()
     
+    def get_throttles(self):
+        # Uploads and edits run ffmpeg; the rest of the viewset is cheap
+        if self.action == 'create':
+            return [AudioUploadThrottle()]
+        if self.action == 'edit':
+            return [AudioEditThrottle()]
+        return super().get_throttles()
+    
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return AudioFileDetailSerializer
@@ -86,6 +98,9 @@ class AudioFileViewSet(viewsets.ModelViewSet):
                 audio_file.save()
                 logger.info(f"Successfully updated AudioFile ID: {audio_file.id} with waveform and duration.")
                 
+                # A missing fingerprint only disables duplicate lookup, so don't hold up the upload
+                run_in_background(fingerprint_audio_file, audio_file.id)
+                
                 return Response(
                     AudioFileSerializer(audio_file).data,
                     status=status.HTTP_201_CREATED
@@ -170,6 +185,13 @@ class AudioFileViewSet(viewsets.ModelViewSet):
         if os.path.exists(original_path) and original_path != output_path:
             os.remove(original_path)
         
+        # The edited audio no longer matches the stored fingerprint
+        run_in_background(fingerprint_audio_file, audio_file.id)
+        
+        # Refresh the streaming package if one was requested; unchanged segments are reused
+        if audio_file.hls_status != 'none':
+            self._schedule_hls(audio_file, changed=True)
+        
         return Response(
             AudioFileDetailSerializer(audio_file).data,
             status=status.HTTP_200_OK
@@ -183,6 +205,64 @@ class AudioFileViewSet(viewsets.ModelViewSet):
         serializer = AudioEditSerializer(edits, many=True)
         return Response(serializer.data)
     
+    def perform_destroy(self, instance):
+        remove_hls(instance)
+        instance.delete()
+    
+    def _schedule_hls(self, audio_file, changed=False):
+        """
+        Queue HLS packaging for an audio file on the background pool.
+
+        At most one packaging run per file is queued or running, since runs
+        share the file's segment directory. Each status change is a single
+        conditional UPDATE, so concurrent requests can't both start one. If
+        the audio `changed` while a run is active, its status goes back to
+        pending and that run packages the file again when it finishes.
+        """
+        active = AudioFile.objects.filter(id=audio_file.id, hls_status__in=['pending', 'processing'])
+        if changed and active.update(hls_status='pending'):
+            audio_file.hls_status = 'pending'
+            return
+        idle = AudioFile.objects.filter(id=audio_file.id).exclude(hls_status__in=['pending', 'processing'])
+        if idle.update(hls_status='pending'):
+            run_in_background(package_hls, audio_file.id)
+        audio_file.refresh_from_db(fields=['hls_status'])
+    
+    @action(detail=True, methods=['get', 'post'])
+    def stream(self, request, pk=None):
+        """
+        Get the HLS streaming status of an audio file, or request packaging with POST.
+        The playlist URL is usable as soon as the first segment has been written.
+        """
+        audio_file = self.get_object()
+        
+        if request.method == 'POST':
+            self._schedule_hls(audio_file)
+        
+        data = {'status': audio_file.hls_status, 'playlist_url': None}
+        if audio_file.hls_status != 'none':
+            data['playlist_url'] = request.build_absolute_uri(master_playlist_url(audio_file))
+        
+        return Response(
+            data,
+            status=status.HTTP_202_ACCEPTED if request.method == 'POST' else status.HTTP_200_OK
+        )
+    
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, pk=None):
+        """Get likely near-duplicates of an audio file based on its fingerprint"""
+        audio_file = self.get_object()
+        
+        if not audio_file.fingerprints.exists():
+            return Response(
+                {'error': 'Audio file has not been fingerprinted'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        candidates = find_duplicates(audio_file)
+        serializer = AudioDuplicateSerializer(candidates, many=True)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         """Download the processed audio file"""
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class VenuesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'api.venues'
+    label = 'venues'
+
+    def ready(self):
+        # Keep cached facet counts in step with the venue tables
+        from . import signals  # noqa: F401
@@ -0,0 +1,163 @@
+"""
+Multi-city venue discovery.
+
+A BatchDiscoveryJob holds a list of stops (state, city, radius). The job runs
+on the background pool, where the stops are discovered concurrently on one
+event loop. At most AI_BATCH_CONCURRENCY stops are in flight at once, and
+model calls are paced by a process-wide AI_BATCH_REQUESTS_PER_MINUTE limit.
+Cache hits don't count against that limit. Each stop goes through the shared
+discovery cache, so repeated and overlapping batches cost little.
+
+Neighbouring cities often turn up the same venues. A venue is kept only under
+the first stop to report it; later stops count it as a duplicate. The job row
+is updated as each stop finishes, so clients can poll for progress.
+"""
+import asyncio
+import logging
+import re
+import threading
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+from utils.ai.cache import acached_discovery
+from utils.ai.openai_client import adiscover_venues
+from utils.ai.ratelimit import per_minute
+from utils.ai.telemetry import ai_call_context
+
+from .models import AISearchQuery, BatchDiscoveryJob
+
+logger = logging.getLogger(__name__)
+
+# Shared by all batch jobs in this process; built on first use
+_rate_limiter = None
+_rate_limiter_built = False
+_lock = threading.Lock()
+
+
+def _get_rate_limiter():
+    """Return the batch bucket, or None when AI_BATCH_REQUESTS_PER_MINUTE is 0 (unlimited)"""
+    global _rate_limiter, _rate_limiter_built
+    if not _rate_limiter_built:
+        with _lock:
+            if not _rate_limiter_built:
+                rpm = settings.AI_BATCH_REQUESTS_PER_MINUTE
+                _rate_limiter = per_minute(rpm) if rpm > 0 else None
+                _rate_limiter_built = True
+    return _rate_limiter
+
+
+def _clean(value):
+    value = re.sub(r'[^\w\s]', ' ', str(value or '').casefold())
+    return ' '.join(value.split())
+
+
+def venue_key(venue):
+    """
+    Identify a venue across stops.
+
+    The name alone is too loose ("The Loft" exists in many cities), so it is
+    paired with the street number when the address has one, and with the
+    city otherwise. Street names are left out because the model spells them
+    inconsistently ("St" and "Street").
+    """
+    name = re.sub(r'^the ', '', _clean(venue.get('name')))
+    number = re.match(r'\d+', _clean(venue.get('address')))
+    if number:
+        return name, number.group()
+    return name, _clean(venue.get('city'))
+
+
+class _BatchRun:
+    """State of one job while its stops are being discovered"""
+
+    def __init__(self, job):
+        self.job = job
+        self.results = [dict(result) for result in job.results]
+        self.completed = 0
+        self.duplicates = 0
+        self.seen = set()
+        self.lock = asyncio.Lock()
+        self.semaphore = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+
+    async def run(self):
+        await asyncio.gather(*[self.discover(index, stop) for index, stop in enumerate(self.job.stops)])
+
+    async def discover(self, index, stop):
+        state, city, radius = stop['state'], stop['city'], stop['radius']
+
+        async def compute(bucket_radius):
+            rate_limiter = _get_rate_limiter()
+            if rate_limiter is not None:
+                await rate_limiter.aacquire()
+            return await adiscover_venues(state, city, bucket_radius)
+
+        async with self.semaphore:
+            try:
+                venues, cache_hit = await acached_discovery(
+                    'venue', state, city, radius, compute, refresh=self.job.refresh
+                )
+            except Exception as e:
+                logger.exception(f"Batch discovery {self.job.id} failed for {city}, {state}")
+                await self.finish(index, {**stop, 'status': 'failed', 'error': str(e)})
+                return
+
+        await self.finish(index, {**stop, 'cache_hit': cache_hit}, venues)
+
+    async def finish(self, index, result, venues=None):
+        """Record a finished stop, dropping venues an earlier stop already reported"""
+        async with self.lock:
+            if venues is not None:
+                kept = []
+                for venue in venues:
+                    key = venue_key(venue)
+                    if key not in self.seen:
+                        self.seen.add(key)
+                        kept.append(venue)
+                duplicates = len(venues) - len(kept)
+                self.duplicates += duplicates
+
+                search = None
+                if kept:
+                    search = await AISearchQuery.objects.acreate(
+                        user_id=self.job.user_id,
+                        state=result['state'],
+                        city=result['city'],
+                        radius=result['radius'],
+                        results=kept
+                    )
+                result.update({
+                    'status': 'complete' if venues else 'empty',
+                    'search_id': search.id if search else None,
+                    'venues': kept,
+                    'duplicates': duplicates,
+                })
+
+            self.results[index] = result
+            self.completed += 1
+            await BatchDiscoveryJob.objects.filter(id=self.job.id).aupdate(
+                results=self.results,
+                completed_stops=self.completed,
+                duplicates_removed=self.duplicates,
+                updated_at=timezone.now()
+            )
+
+
+def run_batch_discovery(job_id):
+    """Discover venues for every stop of a batch job (runs on the background pool)"""
+    job = BatchDiscoveryJob.objects.select_related('user').get(id=job_id)
+    BatchDiscoveryJob.objects.filter(id=job_id).update(status='running', updated_at=timezone.now())
+
+    try:
+        with ai_call_context('batch-discovery', job.user):
+            # Database calls made by the loop come back to this thread
+            async_to_sync(_BatchRun(job).run)()
+    except Exception as e:
+        logger.exception(f"Batch discovery {job_id} failed")
+        BatchDiscoveryJob.objects.filter(id=job_id).update(
+            status='failed', error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        return
+
+    BatchDiscoveryJob.objects.filter(id=job_id).update(
+        status='complete', finished_at=timezone.now(), updated_at=timezone.now()
+    )
@@ -0,0 +1,323 @@
+"""
+Venue filters and facet counts.
+
+A venue list can be narrowed by state, city, capacity band, opening hours
+and whether the venue has an email address or website (the facets), and by
+a capacity range or a time the venue must be open at. Facet counts come from
+one GROUP BY query over every facet dimension at once. The grouped rows are
+small (one per distinct combination) and the counts are rolled up from them
+in Python. Each facet's counts respect every selection except its own, so
+picking a city still shows how many venues the other cities have.
+
+The grouped rows depend only on the user's venues and the non-facet filters,
+so they are cached per user and reused as facet selections change. A user's
+entries are dropped when one of their venues or states is saved or deleted
+(see signals.py); bulk_create() and queryset update() bypass those signals,
+so code that uses them must call invalidate_venue_facets().
+"""
+import hashlib
+import json
+import time as clock
+from datetime import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, CharField, Count, ExpressionWrapper, F, Q, Value, When
+
+KEY_PREFIX = 'venues:facets'
+
+# (key, label, lower bound, upper bound); capacity in [lower, upper)
+CAPACITY_BANDS = [
+    ('small', 'Under 100', 0, 100),
+    ('medium', '100 to 299', 100, 300),
+    ('large', '300 to 999', 300, 1000),
+    ('arena', '1,000 and up', 1000, None),
+]
+CAPACITY_UNKNOWN = ('unknown', 'Capacity unknown')
+
+# (key, label, time the venue must be open at)
+HOURS_BANDS = [
+    ('afternoon', 'Open in the afternoon', time(14, 0)),
+    ('evening', 'Open in the evening', time(20, 0)),
+    ('late', 'Open past midnight', time(0, 30)),
+]
+
+FACETS = ['state', 'city', 'capacity', 'hours', 'has_email', 'has_website']
+FILTER_PARAMS = FACETS + ['capacity_min', 'capacity_max', 'open_at']
+
+TRUE_VALUES = {'true', '1', 'yes'}
+FALSE_VALUES = {'false', '0', 'no'}
+
+
+def _values(query_params, name):
+    """Every value of a parameter, given repeated or comma-separated"""
+    return [value.strip() for raw in query_params.getlist(name) for value in raw.split(',') if value.strip()]
+
+
+def _flag(value, name):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def parse_filters(query_params):
+    """
+    Read venue filters from query parameters.
+
+    Returns:
+        dict: The filters that were given, by FILTER_PARAMS name
+
+    Raises:
+        ValueError: With a message for the user
+    """
+    filters = {}
+    if _values(query_params, 'state'):
+        try:
+            filters['state'] = {int(value) for value in _values(query_params, 'state')}
+        except ValueError:
+            raise ValueError("state must be state ids")
+    if _values(query_params, 'city'):
+        filters['city'] = set(_values(query_params, 'city'))
+
+    for name, known in (('capacity', [CAPACITY_UNKNOWN[0]] + [band[0] for band in CAPACITY_BANDS]),
+                        ('hours', [band[0] for band in HOURS_BANDS])):
+        selected = set(_values(query_params, name))
+        if selected - set(known):
+            raise ValueError(f"{name} must be one of: {', '.join(known)}")
+        if selected:
+            filters[name] = selected
+
+    for name in ('has_email', 'has_website'):
+        if query_params.get(name):
+            filters[name] = _flag(query_params[name], name)
+
+    for name in ('capacity_min', 'capacity_max'):
+        if query_params.get(name):
+            try:
+                filters[name] = int(query_params[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+
+    if query_params.get('open_at'):
+        try:
+            filters['open_at'] = time.fromisoformat(query_params['open_at'])
+        except ValueError:
+            raise ValueError("open_at must be a time, e.g. 21:30")
+    return filters
+
+
+def open_at_q(at):
+    """Venues open at a time of day; hours that pass midnight wrap around"""
+    same_day = Q(open_time__lt=F('close_time'), open_time__lte=at, close_time__gt=at)
+    overnight = Q(open_time__gt=F('close_time')) & (Q(open_time__lte=at) | Q(close_time__gt=at))
+    all_day = Q(open_time=F('close_time'))
+    return Q(open_time__isnull=False, close_time__isnull=False) & (same_day | overnight | all_day)
+
+
+def _capacity_band_q(key):
+    if key == CAPACITY_UNKNOWN[0]:
+        return Q(capacity__isnull=True)
+    _, _, lower, upper = next(band for band in CAPACITY_BANDS if band[0] == key)
+    q = Q(capacity__gte=lower)
+    if upper is not None:
+        q &= Q(capacity__lt=upper)
+    return q
+
+
+def _any(qs):
+    combined = Q(pk__in=[])
+    for q in qs:
+        combined |= q
+    return combined
+
+
+def base_filter_q(filters):
+    """The non-facet filters, as one Q"""
+    q = Q()
+    if 'capacity_min' in filters:
+        q &= Q(capacity__gte=filters['capacity_min'])
+    if 'capacity_max' in filters:
+        q &= Q(capacity__lte=filters['capacity_max'])
+    if 'open_at' in filters:
+        q &= open_at_q(filters['open_at'])
+    return q
+
+
+def facet_filter_q(filters):
+    """The facet selections, as one Q"""
+    q = Q()
+    if 'state' in filters:
+        q &= Q(state_id__in=filters['state'])
+    if 'city' in filters:
+        q &= Q(city__in=filters['city'])
+    if 'capacity' in filters:
+        q &= _any(_capacity_band_q(key) for key in filters['capacity'])
+    if 'hours' in filters:
+        q &= _any(open_at_q(at) for key, _, at in HOURS_BANDS if key in filters['hours'])
+    if 'has_email' in filters:
+        q &= ~Q(email='') if filters['has_email'] else Q(email='')
+    if 'has_website' in filters:
+        q &= ~Q(website='') if filters['has_website'] else Q(website='')
+    return q
+
+
+def filter_venues(queryset, filters):
+    """Apply every filter to a Venue queryset in SQL"""
+    if not filters:
+        return queryset
+    return queryset.filter(base_filter_q(filters) & facet_filter_q(filters))
+
+
+def _dimensions():
+    """Annotations for the facet dimensions of each venue"""
+    band = Case(
+        When(capacity__isnull=True, then=Value(CAPACITY_UNKNOWN[0])),
+        *[When(_capacity_band_q(key), then=Value(key)) for key, _, _, _ in CAPACITY_BANDS],
+        output_field=CharField(),
+    )
+    dimensions = {
+        'capacity_band': band,
+        'has_email': ExpressionWrapper(~Q(email=''), output_field=BooleanField()),
+        'has_website': ExpressionWrapper(~Q(website=''), output_field=BooleanField()),
+    }
+    for key, _, at in HOURS_BANDS:
+        dimensions[f'open_{key}'] = ExpressionWrapper(open_at_q(at), output_field=BooleanField())
+    return dimensions
+
+
+def grouped_counts(queryset):
+    """
+    Count venues per combination of facet values, in one query.
+
+    Returns:
+        list: dicts with state_id, state_name, city, capacity_band, has_email,
+              has_website, open_<hours band> and count
+    """
+    dimensions = _dimensions()
+    rows = (
+        queryset.order_by()
+        .annotate(**dimensions)
+        .values('state_id', 'state__name', 'city', *dimensions)
+        .annotate(count=Count('id'))
+    )
+    grouped = []
+    for row in rows:
+        row['state_name'] = row.pop('state__name')
+        for name in ('has_email', 'has_website', *(f'open_{key}' for key, _, _ in HOURS_BANDS)):
+            # SQLite returns 0 and 1
+            row[name] = bool(row[name])
+        grouped.append(row)
+    return grouped
+
+
+def _matches(row, facet, selected):
+    if facet == 'state':
+        return row['state_id'] in selected
+    if facet == 'city':
+        return row['city'] in selected
+    if facet == 'capacity':
+        return row['capacity_band'] in selected
+    if facet == 'hours':
+        return any(row[f'open_{key}'] for key in selected)
+    return row[facet] == selected
+
+
+def rollup(rows, filters):
+    """
+    Facet counts from grouped rows.
+
+    Returns:
+        dict: `total` venues matching every filter, and `facets`, a list of
+              {value, label, count} options per facet
+    """
+    selections = {facet: filters[facet] for facet in FACETS if facet in filters}
+
+    def counted(facet):
+        """Rows matching every selection except this facet's own"""
+        return [
+            row for row in rows
+            if all(_matches(row, other, selected) for other, selected in selections.items() if other != facet)
+        ]
+
+    facets = {}
+
+    states, cities = {}, {}
+    for row in counted('state'):
+        option = states.setdefault(row['state_id'], {'value': row['state_id'], 'label': row['state_name'], 'count': 0})
+        option['count'] += row['count']
+    for row in counted('city'):
+        if row['city']:
+            option = cities.setdefault(row['city'], {'value': row['city'], 'label': row['city'], 'count': 0})
+            option['count'] += row['count']
+    facets['state'] = sorted(states.values(), key=lambda option: (-option['count'], option['label']))
+    facets['city'] = sorted(cities.values(), key=lambda option: (-option['count'], option['label']))
+
+    capacity = {key: 0 for key, _, _, _ in CAPACITY_BANDS}
+    capacity[CAPACITY_UNKNOWN[0]] = 0
+    for row in counted('capacity'):
+        capacity[row['capacity_band']] += row['count']
+    facets['capacity'] = [
+        {'value': key, 'label': label, 'count': capacity[key]}
+        for key, label in [(band[0], band[1]) for band in CAPACITY_BANDS] + [CAPACITY_UNKNOWN]
+    ]
+
+    hours_rows = counted('hours')
+    facets['hours'] = [
+        {'value': key, 'label': label, 'count': sum(row['count'] for row in hours_rows if row[f'open_{key}'])}
+        for key, label, _ in HOURS_BANDS
+    ]
+
+    for facet, label in (('has_email', 'Email'), ('has_website', 'Website')):
+        flag_rows = counted(facet)
+        facets[facet] = [
+            {'value': value, 'label': f"{'Has' if value else 'No'} {label.lower()}",
+             'count': sum(row['count'] for row in flag_rows if row[facet] == value)}
+            for value in (True, False)
+        ]
+
+    total = sum(
+        row['count'] for row in rows
+        if all(_matches(row, facet, selected) for facet, selected in selections.items())
+    )
+    return {'total': total, 'facets': facets}
+
+
+def _version(user_id):
+    """The user's facet cache version; changes whenever it's invalidated"""
+    key = f'{KEY_PREFIX}:version:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        version = clock.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_venue_facets(user_id):
+    cache.set(f'{KEY_PREFIX}:version:{user_id}', clock.time_ns(), None)
+
+
+def venue_facets(user, queryset, filters, scope=None):
+    """
+    Facet counts for a user's venues under the given filters.
+
+    Args:
+        user: Owner of the venues
+        queryset (QuerySet): The user's venues, already narrowed by anything
+            other than `filters` (such as a search)
+        filters (dict): As returned by parse_filters
+        scope: Whatever narrowed the queryset, for the cache key; None if nothing did
+
+    Returns:
+        dict: See rollup()
+    """
+    base = {name: filters[name] for name in ('capacity_min', 'capacity_max', 'open_at') if name in filters}
+    fingerprint = json.dumps([scope, base], default=str, sort_keys=True)
+    key = f'{KEY_PREFIX}:{user.pk}:{_version(user.pk)}:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = grouped_counts(queryset.filter(base_filter_q(filters)))
+        cache.set(key, rows, settings.VENUE_FACETS_CACHE_TTL)
+    return rollup(rows, filters)
@@ -0,0 +1,169 @@
+"""
+Bulk import of AI search results into the venue database.
+
+All selected results are imported together: their states are resolved with
+one query, every venue is validated in memory, and the new states and venues
+are inserted with bulk_create inside one transaction. Results that fail
+validation, or that name a venue the user already has, are reported per row
+and skipped; the rest are imported.
+"""
+import logging
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .facets import invalidate_venue_facets
+from .models import State, Venue
+
+logger = logging.getLogger(__name__)
+
+# Venue fields filled from a search result, and the result key each comes from
+RESULT_FIELDS = {
+    'name': 'name',
+    'description': 'description',
+    'address': 'address',
+    'zipcode': 'zipcode',
+    'phone': 'phone',
+    'email': 'email',
+    'website': 'website',
+    'notes': 'genres',
+}
+
+
+def _selected_results(results, indices, errors):
+    """
+    Pick the selected results, reporting bad indices.
+
+    Returns:
+        list: (index, result) pairs in selection order, without repeats
+    """
+    selected = []
+    seen = set()
+    for idx in indices:
+        try:
+            idx = int(idx)
+        except (TypeError, ValueError):
+            errors.append(f"Invalid index {idx!r}")
+            continue
+        if idx < 0 or idx >= len(results):
+            errors.append(f"Index {idx} out of range")
+            continue
+        if idx not in seen:
+            seen.add(idx)
+            selected.append((idx, results[idx]))
+    return selected
+
+
+def _text(value):
+    """A result value as text; lists such as genres are joined with commas"""
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item).strip() for item in value if item not in (None, ''))
+    # The model sometimes sends null for unknown fields
+    return str(value or '').strip()
+
+
+def _build_venue(user, search_query, data):
+    """Build an unsaved Venue from one search result; state is assigned later"""
+    venue = Venue(user=user, city=_text(data.get('city')) or search_query.city.strip())
+    for field, key in RESULT_FIELDS.items():
+        setattr(venue, field, _text(data.get(key)))
+    capacity = data.get('capacity')
+    venue.capacity = None if capacity in (None, '') else capacity
+    return venue
+
+
+def _describe(error):
+    """Flatten a ValidationError into "field: message" text"""
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{field}: {' '.join(messages)}" for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def import_search_results(user, search_query, indices):
+    """
+    Import selected results of an AI search as the user's venues.
+
+    Args:
+        user: Owner of the new venues and states
+        search_query (AISearchQuery): The search holding the results
+        indices (list): Indices into search_query.results
+
+    Returns:
+        tuple: (imported Venue instances with state set, list of error strings)
+    """
+    errors = []
+    results = search_query.results or []
+    selected = _selected_results(results, indices, errors)
+    if not selected:
+        return [], errors
+
+    # Validate everything in memory first
+    candidates = []
+    for idx, data in selected:
+        if not isinstance(data, dict):
+            errors.append(f"Result {idx} is not a venue")
+            continue
+        venue = _build_venue(user, search_query, data)
+        try:
+            venue.clean_fields(exclude=['state', 'user'])
+        except ValidationError as e:
+            errors.append(f"Failed to create venue '{data.get('name')}': {_describe(e)}")
+            continue
+        state_name = str(data.get('state') or search_query.state).strip()[:50]
+        candidates.append((venue, state_name))
+
+    if not candidates:
+        return [], errors
+
+    # One query for the states the results mention
+    state_names = {state_name for _, state_name in candidates}
+    states = {state.name: state for state in State.objects.filter(user=user, name__in=state_names)}
+
+    # One query for venues the user already has under those names
+    existing = set()
+    if states:
+        existing = set(
+            Venue.objects.filter(
+                user=user,
+                state__in=states.values(),
+                name__in={venue.name for venue, _ in candidates}
+            ).values_list('name', 'state__name')
+        )
+
+    to_create = []
+    for venue, state_name in candidates:
+        if (venue.name, state_name) in existing:
+            errors.append(f"Venue '{venue.name}' already exists in {state_name}")
+            continue
+        # Also catches the same venue selected twice under different indices
+        existing.add((venue.name, state_name))
+        to_create.append((venue, state_name))
+
+    if not to_create:
+        return [], errors
+
+    try:
+        with transaction.atomic():
+            new_states = [
+                State(user=user, name=name, abbreviation=name[:2].upper())
+                for name in sorted({state_name for _, state_name in to_create} - states.keys())
+            ]
+            for state in State.objects.bulk_create(new_states):
+                states[state.name] = state
+
+            venues = []
+            for venue, state_name in to_create:
+                venue.state = states[state_name]
+                # bulk_create skips save(), which places the venue
+                venue.geocode()
+                venues.append(venue)
+            Venue.objects.bulk_create(venues)
+            # bulk_create sends no post_save
+            transaction.on_commit(lambda: invalidate_venue_facets(user.pk))
+    except IntegrityError as e:
+        # A concurrent import created one of the same rows; nothing was saved
+        logger.warning(f"Import from AI search {search_query.id} conflicted: {str(e)}")
+        errors.append("Another import changed these venues at the same time; nothing was imported. Please retry.")
+        return [], errors
+
+    logger.info(f"Imported {len(venues)} venues from AI search {search_query.id}")
+    return venues, errors
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.venues.search import drop_search_index, install_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the venue full-text search index and reindex every venue"
+
+    def handle(self, *args, **options):
+        # The schema editor runs both in one transaction
+        with connection.schema_editor() as schema_editor:
+            drop_search_index(schema_editor)
+            install_search_index(schema_editor)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the venue search index ({connection.vendor})"))
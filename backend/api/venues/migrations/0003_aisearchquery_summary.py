@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def summarize(apps, schema_editor):
+    """Fill in result_count and top_names for existing searches"""
+    from utils.ai.summary import summarize_results
+    AISearchQuery = apps.get_model('venues', 'AISearchQuery')
+
+    batch = []
+    for search in AISearchQuery.objects.only('id', 'results').iterator(chunk_size=BATCH_SIZE):
+        search.result_count, search.top_names = summarize_results(search.results)
+        batch.append(search)
+        if len(batch) == BATCH_SIZE:
+            AISearchQuery.objects.bulk_update(batch, ['result_count', 'top_names'])
+            batch = []
+    AISearchQuery.objects.bulk_update(batch, ['result_count', 'top_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0002_batchdiscoveryjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aisearchquery',
+            name='result_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aisearchquery',
+            name='top_names',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(summarize, migrations.RunPython.noop),
+    ]
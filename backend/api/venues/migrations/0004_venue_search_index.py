@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:40
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from api.venues.search import install_search_index
+    install_search_index(schema_editor)
+
+
+def drop(apps, schema_editor):
+    from api.venues.search import drop_search_index
+    drop_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0003_aisearchquery_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, drop),
+    ]
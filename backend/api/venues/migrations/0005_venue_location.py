@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def place_venues(apps, schema_editor):
+    """Geocode existing venues from their zipcode or city"""
+    from utils.geo import geocode
+    Venue = apps.get_model('venues', 'Venue')
+
+    batch = []
+    for venue in Venue.objects.select_related('state').iterator(chunk_size=BATCH_SIZE):
+        point = (geocode(venue.zipcode, venue.city, venue.state.name)
+                 or geocode('', venue.city, venue.state.abbreviation))
+        if point is None:
+            continue
+        venue.latitude, venue.longitude = point
+        batch.append(venue)
+        if len(batch) == BATCH_SIZE:
+            Venue.objects.bulk_update(batch, ['latitude', 'longitude'])
+            batch = []
+    Venue.objects.bulk_update(batch, ['latitude', 'longitude'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0004_venue_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['user', 'latitude', 'longitude'], name='venues_venue_user_geo_idx'),
+        ),
+        migrations.RunPython(place_venues, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0005_venue_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['user', 'city'], name='venues_venue_user_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['user', 'capacity'], name='venues_venue_user_cap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['user', 'open_time', 'close_time'], name='venues_venue_user_hours_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from utils.ai.summary import summarize_results
+from utils.geo import geocode
 
 class State(models.Model):
     """Represents a geographic state containing venues"""
@@ -31,6 +33,9 @@ class Venue(models.Model):
     open_time = models.TimeField(null=True, blank=True)
     close_time = models.TimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Geocoded offline from zipcode, or city, on save; see utils/geo.py
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='venues')
@@ -38,6 +43,24 @@ class Venue(models.Model):
     class Meta:
         unique_together = ('user', 'name', 'state')
         ordering = ['name']
+        indexes = [
+            # Bounding-box prefilter for `?near=` queries
+            models.Index(fields=['user', 'latitude', 'longitude'], name='venues_venue_user_geo_idx'),
+            # Venue filters and facet counts (see facets.py)
+            models.Index(fields=['user', 'city'], name='venues_venue_user_city_idx'),
+            models.Index(fields=['user', 'capacity'], name='venues_venue_user_cap_idx'),
+            models.Index(fields=['user', 'open_time', 'close_time'], name='venues_venue_user_hours_idx'),
+        ]
+    
+    def geocode(self):
+        """Place the venue from its zipcode or city; bulk_create callers must call this themselves"""
+        state = self.state
+        point = geocode(self.zipcode, self.city, state.name) or geocode('', self.city, state.abbreviation)
+        self.latitude, self.longitude = point if point else (None, None)
+    
+    def save(self, *args, **kwargs):
+        self.geocode()
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.name} ({self.city}, {self.state.abbreviation})"
@@ -48,11 +71,49 @@ class AISearchQuery(models.Model):
     city = models.CharField(max_length=100)
     radius = models.IntegerField()
     results = models.JSONField(null=True, blank=True)
+    # Kept in step with results on save, so history lists can defer results
+    result_count = models.PositiveIntegerField(default=0)
+    top_names = models.JSONField(default=list, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ai_searches')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
     
+    def save(self, *args, **kwargs):
+        self.result_count, self.top_names = summarize_results(self.results)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"Search for {self.city}, {self.state} within {self.radius} miles" 
+
+class BatchDiscoveryJob(models.Model):
+    """A multi-city venue discovery run, processed in the background"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='batch_discoveries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stops = models.JSONField()
+    results = models.JSONField(default=list, blank=True)
+    completed_stops = models.IntegerField(default=0)
+    duplicates_removed = models.IntegerField(default=0)
+    refresh = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    @property
+    def total_stops(self):
+        return len(self.stops or [])
+    
     def __str__(self):
-        return f"Search for {self.city}, {self.state} within {self.radius} miles" 
\ No newline at end of file
+        return f"Batch discovery {self.id} ({self.completed_stops}/{self.total_stops} stops, {self.status})"
@@ -0,0 +1,107 @@
+"""
+Radius queries over a user's venues.
+
+A latitude/longitude bounding box around the point prunes candidates in SQL,
+using the (user, latitude, longitude) index, and only their ids and
+coordinates are fetched. Exact haversine distances for all candidates are
+computed with NumPy in one pass. The result is a sequence of the venues
+within the radius, nearest first, that loads venue rows only when sliced, so
+paginating a large result loads just the page. Venues without coordinates
+never match.
+"""
+import re
+from collections.abc import Sequence
+import numpy as np
+from django.conf import settings
+from utils.geo import bounding_box, haversine_miles_array, load_zip_centroids, normalize_zip
+
+DEFAULT_RADIUS = 25
+
+POINT_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def parse_near(near, radius=None):
+    """
+    Resolve `near` and `radius` query parameters.
+
+    Args:
+        near (str): A ZIP code, or "lat,lng" in degrees
+        radius (str): Miles; DEFAULT_RADIUS if missing
+
+    Returns:
+        tuple: (lat, lon, radius)
+
+    Raises:
+        ValueError: With a message for the user
+    """
+    match = POINT_RE.match(near)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("near must be a ZIP code or lat,lng in degrees")
+    else:
+        zip5 = normalize_zip(near)
+        if zip5 is None:
+            raise ValueError("near must be a ZIP code or lat,lng in degrees")
+        if zip5 not in load_zip_centroids():
+            raise ValueError(f"Unknown ZIP code {zip5}")
+        lat, lon = load_zip_centroids()[zip5]
+
+    try:
+        radius = float(radius) if radius not in (None, '') else DEFAULT_RADIUS
+    except ValueError:
+        raise ValueError("Radius must be a number")
+    if not 0 < radius <= settings.VENUE_NEAR_MAX_RADIUS:
+        raise ValueError(f"Radius must be between 0 and {settings.VENUE_NEAR_MAX_RADIUS} miles")
+    return lat, lon, radius
+
+
+class NearbyVenues(Sequence):
+    """Venues by id, nearest first; rows are loaded only for the part sliced"""
+
+    def __init__(self, queryset, ids, distances):
+        self.queryset = queryset
+        self.ids = ids
+        self.distances = distances
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            ids = self.ids[index]
+            distances = self.distances[index]
+            venues = self.queryset.in_bulk(ids)
+            nearest = []
+            for venue_id, distance in zip(ids, distances):
+                venue = venues.get(venue_id)
+                if venue is None:
+                    # Deleted since the distances were computed
+                    continue
+                venue.distance_miles = round(distance, 1)
+                nearest.append(venue)
+            return nearest
+        return self[index:index + 1 or None][0]
+
+
+def venues_near(queryset, lat, lon, radius):
+    """
+    Venues of a queryset within `radius` miles of a point.
+
+    Returns:
+        NearbyVenues: Venue instances with `distance_miles` set, nearest first
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+    candidates = list(
+        queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        .order_by()
+        .values_list('id', 'latitude', 'longitude')
+    )
+    if not candidates:
+        return NearbyVenues(queryset, [], [])
+
+    rows = np.array(candidates, dtype=float)
+    distances = haversine_miles_array(lat, lon, rows[:, 1], rows[:, 2])
+    within = np.flatnonzero(distances <= radius)
+    within = within[np.argsort(distances[within], kind='stable')]
+    return NearbyVenues(queryset, rows[within, 0].astype(int).tolist(), distances[within].tolist())
@@ -0,0 +1,153 @@
+"""
+Relevance ranking of discovered venues for the requesting artist.
+
+Discovery results arrive in whatever order the model wrote them. This module
+re-orders them by how well each venue's text (name, description, genres)
+matches three documents built from the caller's own data:
+
+- the artist profile: genres (counted twice) and bio
+- venues the artist contacted with a good outcome
+- venues the artist contacted with a bad outcome
+
+ContactHistory has no outcome field, so the outcome is read from the
+contact notes ("booked", "declined", ...); contacts without either kind of
+word count as mildly positive, since the artist chose to reach out.
+
+All documents are turned into TF-IDF vectors in one NumPy matrix and scored
+by cosine similarity, so ranking a hundred venues takes a few milliseconds
+and needs no model call.
+"""
+import re
+import numpy as np
+
+from api.contacts.models import ContactHistory
+from profiles.context import get_profile_context
+
+# Score = profile similarity + weighted good-outcome similarity - weighted bad-outcome similarity
+PROFILE_WEIGHT = 1.0
+GOOD_OUTCOME_WEIGHT = 0.6
+BAD_OUTCOME_WEIGHT = 0.4
+
+# How many of the artist's most recent contacts are considered
+CONTACT_HISTORY_LIMIT = 200
+
+GOOD_OUTCOMES = re.compile(r'\b(booked|confirmed|accepted|interested|great|loved|again|paid|sold out)\b')
+BAD_OUTCOMES = re.compile(r'\b(declined|rejected|passed|not interested|no response|cancelled|canceled|closed)\b')
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to we with
+you your venue venues live music bar club located features offers known
+""".split())
+
+# Spellings that should count as the same term
+SYNONYMS = [
+    (re.compile(r'\bhip[\s-]*hop\b'), 'hiphop'),
+    (re.compile(r'\br\s*&\s*b\b|\brnb\b|\brhythm and blues\b'), 'rnb'),
+    (re.compile(r'\bneo[\s-]*soul\b'), 'neosoul'),
+    (re.compile(r'\bopen[\s-]*mic\b'), 'openmic'),
+]
+
+
+def tokenize(text):
+    """Lowercase words with genre spellings folded together and stop words removed"""
+    text = str(text or '').casefold()
+    for pattern, replacement in SYNONYMS:
+        text = pattern.sub(replacement, text)
+    return [word for word in re.findall(r'[a-z0-9]+', text) if len(word) > 1 and word not in STOP_WORDS]
+
+
+def venue_text(venue):
+    """The parts of a discovered venue that describe what it books"""
+    return ' '.join(str(venue.get(key) or '') for key in ('name', 'description', 'genres', 'notes'))
+
+
+def artist_documents(user):
+    """
+    Build the artist's reference documents.
+
+    Returns:
+        tuple: (profile text, good-outcome venue text, bad-outcome venue text)
+    """
+    profile = get_profile_context(user)['profile']
+    profile_text = ''
+    if profile is not None:
+        genres = ' '.join(str(genre) for genre in profile['genres'] or [])
+        profile_text = f"{genres} {genres} {profile['bio']}"
+
+    good, bad = [], []
+    contacts = (ContactHistory.objects.filter(user=user)
+                .select_related('venue')
+                .only('notes', 'venue__name', 'venue__description', 'venue__notes')
+                .order_by('-contact_date')[:CONTACT_HISTORY_LIMIT])
+    for contact in contacts:
+        notes = contact.notes.casefold()
+        text = f"{contact.venue.description} {contact.venue.notes}"
+        if BAD_OUTCOMES.search(notes):
+            bad.append(text)
+        else:
+            # Good outcomes count twice as much as plain contacts
+            good.append(text)
+            if GOOD_OUTCOMES.search(notes):
+                good.append(text)
+    return profile_text, ' '.join(good), ' '.join(bad)
+
+
+def _tfidf(documents):
+    """L2-normalized TF-IDF matrix, one row per document"""
+    tokenized = [tokenize(doc) for doc in documents]
+    vocabulary = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    counts = np.zeros((len(documents), max(len(vocabulary), 1)))
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(cols, dtype=int)), 1.0)
+
+    # Sub-linear term frequency and smoothed IDF, as in scikit-learn
+    tf = np.log1p(counts)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def score_venues(venues, documents):
+    """
+    Score venues against the artist's documents.
+
+    Args:
+        venues (list): Discovered venue dicts
+        documents (tuple): As returned by artist_documents
+
+    Returns:
+        numpy.ndarray: One score per venue
+    """
+    profile_text, good_text, bad_text = documents
+    matrix = _tfidf([venue_text(venue) for venue in venues] + [profile_text, good_text, bad_text])
+    candidates, references = matrix[:len(venues)], matrix[len(venues):]
+    similarity = candidates @ references.T
+    return similarity @ np.array([PROFILE_WEIGHT, GOOD_OUTCOME_WEIGHT, -BAD_OUTCOME_WEIGHT])
+
+
+def rank_venues(venues, documents):
+    """
+    Sort venues by relevance, best first, adding a `relevance` score to each.
+
+    Venues the scores can't tell apart keep their original order; with no
+    profile or contact history every score is 0 and nothing moves.
+    """
+    venues = [venue for venue in venues or [] if isinstance(venue, dict)]
+    if not venues:
+        return venues
+    scores = score_venues(venues, documents)
+    order = sorted(range(len(venues)), key=lambda i: -scores[i])
+    # Adding 0.0 turns -0.0 into 0.0
+    return [{**venues[i], 'relevance': round(float(scores[i]), 4) + 0.0} for i in order]
+
+
+def rank_for_user(venues, user):
+    """Rank venues for one user; see rank_venues"""
+    return rank_venues(venues, artist_documents(user))
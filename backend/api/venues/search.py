@@ -0,0 +1,146 @@
+"""
+Full-text search over a user's venues.
+
+The index covers name, city, address, description and notes, weighted in that
+order, and lives in the database so a search never loads the user's venue list:
+
+- PostgreSQL: a generated `search_vector` tsvector column on venues_venue
+  with a GIN index. The database recomputes it on every write.
+- SQLite (development): an FTS5 table over venues_venue kept in sync by
+  triggers, ranked with bm25.
+- Other databases: no index; each word is matched with icontains on name,
+  city and description, and results are ordered by name.
+
+install_search_index() creates either; the 0004 migration calls it. SQLite
+drops a table's triggers when Django rebuilds the table in a migration, so
+after altering Venue on SQLite run `python manage.py rebuild_venue_search_index`.
+Neither structure is a model field; search_venues() reaches them with raw SQL.
+
+Each word of the query must match, as a prefix, so results narrow as the user
+types.
+"""
+import re
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = 'venues_venue'
+FTS_TABLE = 'venues_venue_fts'
+# Longest query accepted, in words
+MAX_TERMS = 10
+
+# Indexed columns, most important first, with their Postgres weight class and
+# SQLite bm25 weight
+COLUMNS = [
+    ('name', 'A', 10.0),
+    ('city', 'B', 5.0),
+    ('address', 'B', 4.0),
+    ('description', 'C', 2.0),
+    ('notes', 'D', 1.0),
+]
+
+
+def _postgres_install_sql():
+    vector = ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight, _ in COLUMNS
+    )
+    return [
+        f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_search_idx ON {TABLE} USING gin (search_vector)",
+    ]
+
+
+def _sqlite_install_sql():
+    names = ', '.join(column for column, _, _ in COLUMNS)
+    new = ', '.join(f'new.{column}' for column, _, _ in COLUMNS)
+    old = ', '.join(f'old.{column}' for column, _, _ in COLUMNS)
+    delete_old = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {names}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({names}, content='{TABLE}', "
+        f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON {TABLE} BEGIN {delete_old} {insert_new} END",
+        # Index the rows that already exist
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def install_search_index(schema_editor):
+    """Create the search index for the database in use, and fill it"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = _postgres_install_sql()
+    elif vendor == 'sqlite':
+        statements = _sqlite_install_sql()
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TABLE}_search_idx")
+        schema_editor.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector")
+    elif vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def search_terms(query):
+    """The words of a search query, lowercased, at most MAX_TERMS of them"""
+    return re.findall(r'[^\W_]+', (query or '').lower())[:MAX_TERMS]
+
+
+def search_venues(queryset, query):
+    """
+    Restrict a Venue queryset to full-text matches, best first.
+
+    Args:
+        queryset (QuerySet): Venues to search, usually one user's
+        query (str): What the user typed
+
+    Returns:
+        QuerySet: Matching venues annotated with `rank` (higher is better),
+                  ordered by rank then name; empty if the query has no words
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        # Terms are letters and digits only, so they are safe inside a tsquery
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"{TABLE}.search_vector @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({TABLE}.search_vector, to_tsquery('english', %s))", [tsquery], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(rank=rank).order_by('-rank', 'name')
+    elif connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for _, _, weight in COLUMNS)
+        # A join, so the FTS query runs once; ranking through a correlated
+        # subquery reruns it for every matching row. The unary + keeps SQLite
+        # from starting at venues_venue and re-running the MATCH per venue,
+        # which it otherwise does for count(). The ORM can't join a table
+        # without a model, hence extra(). bm25 is lower for better matches.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'+{FTS_TABLE}.rowid = {TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={'rank': f'-bm25({FTS_TABLE}, {weights})'},
+            order_by=['-rank', 'name'],
+        )
+    else:
+        matches = Q()
+        for term in terms:
+            matches &= Q(name__icontains=term) | Q(city__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(matches).annotate(rank=Value(0.0, output_field=FloatField())).order_by('name')
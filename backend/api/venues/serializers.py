@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import State, Venue, AISearchQuery
+from django.conf import settings
+from .models import State, Venue, AISearchQuery, BatchDiscoveryJob
 
 class StateSerializer(serializers.ModelSerializer):
     """Serializer for State model"""
@@ -18,6 +19,8 @@ class VenueSerializer(serializers.ModelSerializer):
     """Serializer for Venue model"""
     state_name = serializers.CharField(source='state.name', read_only=True)
     state_abbreviation = serializers.CharField(source='state.abbreviation', read_only=True)
+    # Set by `?near=` queries
+    distance_miles = serializers.FloatField(read_only=True, required=False)
     
     class Meta:
         model = Venue
@@ -25,9 +28,10 @@ class VenueSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'address', 'city', 'state', 'state_id', 
             'state_name', 'state_abbreviation', 'zipcode', 'phone', 'email', 
             'website', 'capacity', 'open_time', 'close_time', 'notes', 
+            'latitude', 'longitude', 'distance_miles',
             'created_at', 'updated_at', 'user_id'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'user_id', 'state_name', 'state_abbreviation']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'user_id', 'state_name', 'state_abbreviation', 'latitude', 'longitude']
     
     def create(self, validated_data):
         # Ensure the venue is associated with the current user
@@ -47,6 +51,11 @@ class AIVenueResultSerializer(serializers.Serializer):
     website = serializers.URLField(required=False, allow_blank=True)
     capacity = serializers.IntegerField(required=False, allow_null=True)
     genres = serializers.CharField(required=False, allow_blank=True)
+    # Set by tiled discovery
+    distance_miles = serializers.FloatField(required=False, allow_null=True)
+    tile = serializers.CharField(required=False, allow_blank=True)
+    # Set by relevance ranking
+    relevance = serializers.FloatField(required=False)
 
 class AISearchQuerySerializer(serializers.ModelSerializer):
     """Serializer for AI search queries"""
@@ -54,10 +63,48 @@ class AISearchQuerySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = AISearchQuery
-        fields = ['id', 'state', 'city', 'radius', 'results', 'created_at', 'user_id']
-        read_only_fields = ['id', 'created_at', 'user_id']
+        fields = ['id', 'state', 'city', 'radius', 'results', 'result_count', 'top_names', 'created_at', 'user_id']
+        read_only_fields = ['id', 'result_count', 'top_names', 'created_at', 'user_id']
     
     def create(self, validated_data):
         # Ensure the search query is associated with the current user
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data) 
\ No newline at end of file
+        return super().create(validated_data)
+
+class AISearchQuerySummarySerializer(serializers.ModelSerializer):
+    """Search history entry without the results, for list views"""
+    
+    class Meta:
+        model = AISearchQuery
+        fields = ['id', 'state', 'city', 'radius', 'result_count', 'top_names', 'created_at', 'user_id']
+        read_only_fields = fields
+
+class BatchStopSerializer(serializers.Serializer):
+    """One location in a batch discovery request"""
+    state = serializers.CharField(max_length=50)
+    city = serializers.CharField(max_length=100)
+    radius = serializers.IntegerField(min_value=1)
+
+class BatchDiscoveryRequestSerializer(serializers.Serializer):
+    """Validates a batch discovery request"""
+    stops = BatchStopSerializer(many=True, allow_empty=False)
+    refresh = serializers.BooleanField(required=False, default=False)
+    
+    def validate_stops(self, stops):
+        if len(stops) > settings.AI_BATCH_MAX_STOPS:
+            raise serializers.ValidationError(
+                f"A batch can have at most {settings.AI_BATCH_MAX_STOPS} stops"
+            )
+        return stops
+
+class BatchDiscoveryJobSerializer(serializers.ModelSerializer):
+    """Serializer for batch discovery jobs and their per-stop results"""
+    total_stops = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = BatchDiscoveryJob
+        fields = [
+            'id', 'status', 'total_stops', 'completed_stops', 'duplicates_removed',
+            'refresh', 'results', 'error', 'created_at', 'updated_at', 'finished_at', 'user_id'
+        ]
+        read_only_fields = fields
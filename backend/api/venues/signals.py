@@ -0,0 +1,21 @@
+"""
+Drop a user's cached facet counts (see facets.py) whenever one of their
+venues or states changes. Deleting a state deletes its venues, which sends
+post_delete for each.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .facets import invalidate_venue_facets
+from .models import State, Venue
+
+
+@receiver([post_save, post_delete], sender=Venue)
+def venue_changed(sender, instance, **kwargs):
+    invalidate_venue_facets(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=State)
+def state_changed(sender, instance, **kwargs):
+    # State names label the state facet
+    invalidate_venue_facets(instance.user_id)
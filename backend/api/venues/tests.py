@@ -0,0 +1,260 @@
+from unittest import mock
+import numpy as np
+from django.contrib.auth import get_user_model
+from datetime import time
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from utils.geo import bounding_box, haversine_miles, haversine_miles_array
+from . import batch
+from .facets import filter_venues, grouped_counts, open_at_q, parse_filters, rollup
+from .models import AISearchQuery, State, Venue
+from .nearby import parse_near, venues_near
+from .search import search_venues
+
+AUSTIN = (30.2672, -97.7431)
+
+
+class VenueTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+        self.texas = State.objects.create(name='Texas', abbreviation='TX', user=self.user)
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.user)
+
+    def venue(self, name, city='Austin', **fields):
+        return Venue.objects.create(name=name, city=city, state=self.texas, user=self.user, **fields)
+
+
+class SearchVenuesTests(VenueTestCase):
+    def search(self, query):
+        return [venue.name for venue in search_venues(Venue.objects.filter(user=self.user), query)]
+
+    def test_name_match_ranks_above_notes_match(self):
+        self.venue('Cactus Cafe', notes='Small room')
+        self.venue('Blue Room', notes='Booker likes cactus art')
+        self.assertEqual(self.search('cactus'), ['Cactus Cafe', 'Blue Room'])
+
+    def test_every_word_matches_as_prefix(self):
+        self.venue('Continental Club', description='Live jazz nightly')
+        self.venue('Jazz Kitchen')
+        self.assertEqual(self.search('contin jaz'), ['Continental Club'])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        venue = self.venue('Mohawk')
+        venue.name = 'Stubbs'
+        venue.save()
+        self.assertEqual(self.search('mohawk'), [])
+        self.assertEqual(self.search('stubbs'), ['Stubbs'])
+        venue.delete()
+        self.assertEqual(self.search('stubbs'), [])
+
+    def test_other_databases_match_substrings(self):
+        self.venue('Continental Club', description='Live jazz nightly')
+        self.venue('Jazz Kitchen', notes='Blue room upstairs')
+        with mock.patch('api.venues.search.connection', mock.Mock(vendor='mysql')):
+            self.assertEqual(self.search('JAZZ'), ['Continental Club', 'Jazz Kitchen'])
+            self.assertEqual(self.search('nental jaz'), ['Continental Club'])
+            self.assertEqual(self.search('blue'), [])
+
+    def test_only_searches_given_queryset(self):
+        other = get_user_model().objects.create_user(username='other', password='pw')
+        state = State.objects.create(name='Texas', abbreviation='TX', user=other)
+        Venue.objects.create(name='Cactus Cafe', city='Austin', state=state, user=other)
+        self.assertEqual(self.search('cactus'), [])
+
+    def test_list_search_is_paginated(self):
+        for index in range(3):
+            self.venue(f'Blue Room {index}')
+        self.venue('Mohawk')
+        response = self.client.get('/api/venues/', {'q': 'blue', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/venues/').data), 4)
+
+
+class BoundingBoxTests(SimpleTestCase):
+    def test_holds_every_point_within_radius(self):
+        rng = np.random.default_rng(1)
+        for lat, lon, radius in ((30.0, -97.0, 25), (61.2, -149.9, 500), (-45.0, 170.0, 100)):
+            min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+            box = np.array([max_lat - lat, max_lon - lon]) * 1.5
+            points = np.array([lat, lon]) + rng.uniform(-1, 1, size=(2000, 2)) * box
+            inside = haversine_miles_array(lat, lon, points[:, 0], points[:, 1]) <= radius
+            self.assertTrue(inside.any())
+            for point_lat, point_lon in points[inside]:
+                self.assertTrue(min_lat <= point_lat <= max_lat and min_lon <= point_lon <= max_lon)
+
+    def test_edges_are_at_least_radius_away(self):
+        lat, lon, radius = 61.2, -149.9, 200
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+        self.assertGreaterEqual(haversine_miles(lat, lon, max_lat, lon), radius * 0.99)
+        self.assertGreaterEqual(haversine_miles(lat, lon, min_lat, lon), radius * 0.99)
+        # Along the northern edge, where longitude degrees are shortest
+        self.assertGreaterEqual(haversine_miles(max_lat, lon, max_lat, max_lon), radius * 0.99)
+
+
+class ParseNearTests(SimpleTestCase):
+    def test_point(self):
+        self.assertEqual(parse_near(' 30.27, -97.74 ', '10'), (30.27, -97.74, 10.0))
+
+    def test_zip_code(self):
+        with mock.patch('api.venues.nearby.load_zip_centroids', return_value={'78701': AUSTIN}):
+            self.assertEqual(parse_near('78701-1234'), AUSTIN + (25,))
+            with self.assertRaisesMessage(ValueError, "Unknown ZIP code 10001"):
+                parse_near('10001')
+
+    def test_zip_code_from_bundled_table(self):
+        lat, lon, radius = parse_near('78701')
+        self.assertLess(haversine_miles(lat, lon, *AUSTIN), 2)
+        self.assertEqual(radius, 25)
+
+    def test_rejects_bad_values(self):
+        for near, radius in (('91,0', None), ('Austin', None), ('30,-97', 'far'), ('30,-97', '0'), ('30,-97', '501')):
+            with self.assertRaises(ValueError):
+                parse_near(near, radius)
+
+
+class VenuesNearTests(VenueTestCase):
+    def setUp(self):
+        super().setUp()
+        for name, city in (('Mohawk', 'Austin'), ('Paper Tiger', 'San Antonio'),
+                           ('White Oak', 'Houston'), ('Trees', 'Dallas'), ('Barn', 'Nowhere')):
+            self.venue(name, city=city)
+
+    def test_nearest_first_within_radius(self):
+        nearby = venues_near(Venue.objects.filter(user=self.user), *AUSTIN, 150)
+        self.assertEqual(len(nearby), 3)
+        venues = nearby[0:3]
+        self.assertEqual([venue.name for venue in venues], ['Mohawk', 'Paper Tiger', 'White Oak'])
+        self.assertEqual(venues[0].distance_miles, 0)
+        self.assertAlmostEqual(venues[1].distance_miles, 74, delta=2)
+
+    def test_loads_only_the_sliced_page(self):
+        nearby = venues_near(Venue.objects.filter(user=self.user), *AUSTIN, 500)
+        with self.assertNumQueries(1):
+            self.assertEqual([venue.name for venue in nearby[1:3]], ['Paper Tiger', 'White Oak'])
+
+    def test_zip_code_places_venue_and_search(self):
+        # North Austin, about eight miles from the city centre
+        venue = self.venue('Kitty Cohen', zipcode='78758')
+        self.assertGreater(haversine_miles(venue.latitude, venue.longitude, *AUSTIN), 5)
+        response = self.client.get('/api/venues/', {'near': '78758', 'radius': 5})
+        self.assertEqual([venue['name'] for venue in response.data['results']], ['Kitty Cohen'])
+
+    def test_list_near_is_paginated_with_distances(self):
+        response = self.client.get('/api/venues/', {'near': '30.2672,-97.7431', 'radius': 100, 'q': 'paper'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([venue['name'] for venue in response.data['results']], ['Paper Tiger'])
+        self.assertAlmostEqual(response.data['results'][0]['distance_miles'], 74, delta=2)
+        response = self.client.get('/api/venues/', {'near': '30,-97', 'radius': 1000})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+
+
+class OpenAtTests(VenueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.venue('Night Owl', open_time=time(22, 0), close_time=time(2, 0))
+        self.venue('Day Cafe', open_time=time(9, 0), close_time=time(17, 0))
+        self.venue('Always Open', open_time=time(0, 0), close_time=time(0, 0))
+        self.venue('No Hours')
+
+    def open_at(self, at):
+        return list(Venue.objects.filter(open_at_q(at)).values_list('name', flat=True))
+
+    def test_hours_past_midnight_wrap_around(self):
+        self.assertEqual(self.open_at(time(0, 30)), ['Always Open', 'Night Owl'])
+        self.assertEqual(self.open_at(time(23, 0)), ['Always Open', 'Night Owl'])
+        self.assertEqual(self.open_at(time(12, 0)), ['Always Open', 'Day Cafe'])
+
+    def test_closing_time_is_exclusive(self):
+        self.assertEqual(self.open_at(time(2, 0)), ['Always Open'])
+        self.assertEqual(self.open_at(time(17, 0)), ['Always Open'])
+        self.assertEqual(self.open_at(time(22, 0)), ['Always Open', 'Night Owl'])
+
+
+class FacetTests(VenueTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        georgia = State.objects.create(name='Georgia', abbreviation='GA', user=self.user)
+        self.venue('Mohawk', capacity=900, email='book@mohawk.example', open_time=time(19, 0), close_time=time(2, 0))
+        self.venue('Cactus Cafe', capacity=80, open_time=time(11, 0), close_time=time(23, 0))
+        self.venue('Stubbs', capacity=2200, website='https://stubbs.example')
+        self.venue('Trees', city='Dallas', capacity=600, email='hi@trees.example',
+                   open_time=time(20, 0), close_time=time(1, 0))
+        Venue.objects.create(name='Masquerade', city='Atlanta', state=georgia, user=self.user, capacity=1000)
+
+    def filters(self, **params):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        return parse_filters(query)
+
+    def test_counts_match_filtered_lists(self):
+        venues = Venue.objects.filter(user=self.user)
+        rows = grouped_counts(venues)
+        for filters in (self.filters(), self.filters(city='Austin'), self.filters(capacity='large,arena'),
+                        self.filters(city='Austin,Dallas', hours='late', has_email='true')):
+            counts = rollup(rows, filters)
+            self.assertEqual(counts['total'], filter_venues(venues, filters).count())
+            for facet, options in counts['facets'].items():
+                for option in options:
+                    # Each option counts as if it were the facet's only selection
+                    value = option['value'] if facet.startswith('has_') else {option['value']}
+                    selected = dict(filters, **{facet: value})
+                    self.assertEqual(option['count'], filter_venues(venues, selected).count(), (filters, facet, option))
+
+    def test_own_selection_is_ignored(self):
+        counts = rollup(grouped_counts(Venue.objects.filter(user=self.user)), self.filters(city='Dallas'))
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual([(option['value'], option['count']) for option in counts['facets']['city']],
+                         [('Austin', 3), ('Atlanta', 1), ('Dallas', 1)])
+        self.assertEqual({option['value']: option['count'] for option in counts['facets']['hours']},
+                         {'afternoon': 0, 'evening': 1, 'late': 1})
+
+    def test_endpoint_drops_cached_counts_when_a_venue_changes(self):
+        response = self.client.get('/api/venues/facets/', {'capacity_min': 500})
+        self.assertEqual(response.data['total'], 4)
+        self.venue('Emos', capacity=700)
+        response = self.client.get('/api/venues/facets/', {'capacity_min': 500})
+        self.assertEqual(response.data['total'], 5)
+        self.assertEqual(self.client.get('/api/venues/facets/', {'hours': 'brunch'}).status_code, 400)
+
+    def test_filtered_list_is_paginated(self):
+        response = self.client.get('/api/venues/', {'state': self.texas.id, 'open_at': '00:30'})
+        self.assertEqual([venue['name'] for venue in response.data['results']], ['Mohawk', 'Trees'])
+
+
+class ImportSearchResultsTests(VenueTestCase):
+    def test_list_values_are_joined(self):
+        search = AISearchQuery.objects.create(state='Texas', city='Austin', radius=25, user=self.user, results=[
+            {'name': 'Mohawk', 'genres': ['indie', 'rock'], 'website': None},
+            {'name': 'Cactus Cafe', 'genres': 'folk', 'city': 'Austin '},
+        ])
+        response = self.client.post(f'/api/ai/searches/{search.id}/import/', {'venue_indices': [0, 1]}, format='json')
+        self.assertEqual(response.data['total_imported'], 2, response.data['errors'])
+        self.assertEqual(dict(Venue.objects.values_list('name', 'notes')),
+                         {'Mohawk': 'indie, rock', 'Cactus Cafe': 'folk'})
+        self.assertEqual(Venue.objects.get(name='Mohawk').website, '')
+
+
+class BatchRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(batch, _rate_limiter=None, _rate_limiter_built=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(AI_BATCH_REQUESTS_PER_MINUTE=0)
+    def test_zero_means_unlimited(self):
+        self.assertIsNone(batch._get_rate_limiter())
+
+    @override_settings(AI_BATCH_REQUESTS_PER_MINUTE=120)
+    def test_built_once_from_settings(self):
+        limiter = batch._get_rate_limiter()
+        self.assertEqual(limiter.rate, 2)
+        self.assertIs(batch._get_rate_limiter(), limiter)
@@ -0,0 +1,148 @@
+"""
+Tiled venue discovery for wide radii.
+
+One discovery call returns about ten venues, nearly all in the central city,
+however large the radius. A tiled search splits the area into tiles: the
+central city plus the largest gazetteer cities inside the radius, each at
+least AI_TILE_RADIUS miles from the tiles already chosen. Every tile is an
+ordinary AI_TILE_RADIUS-mile discovery, so tiles share cache entries with
+plain searches of those cities. The tiles are discovered concurrently, at
+most AI_TILE_CONCURRENCY at a time; the account rate limiter in
+utils/ai/resilience.py paces the model calls themselves.
+
+Venues from different tiles are merged with the batch discovery duplicate
+check and ranked by distance from the centre. Coverage grows with the radius
+(up to AI_TILE_MAX_TILES tiles) while the wall time stays close to one call.
+"""
+import asyncio
+import logging
+from collections import namedtuple
+from django.conf import settings
+from utils.ai.cache import acached_discovery
+from utils.ai.openai_client import adiscover_venues
+from utils.ai.resilience import AIUnavailable
+from utils.geo import cities_within, find_city, haversine_miles
+
+from .batch import venue_key
+
+logger = logging.getLogger(__name__)
+
+Tile = namedtuple('Tile', ['state', 'city', 'radius', 'distance', 'lat', 'lon'])
+
+
+def plan_tiles(state, city, radius):
+    """
+    Split a search area into tiles.
+
+    A radius no larger than one tile, or a centre city missing from the
+    gazetteer, gives a single tile covering the whole search.
+
+    Returns:
+        list: Tile tuples, the centre first
+    """
+    tile_radius = settings.AI_TILE_RADIUS
+    center = find_city(state, city)
+    if center is None or radius <= tile_radius:
+        return [Tile(state, city, radius, 0.0, None, None)]
+
+    tiles = [Tile(state, city, tile_radius, 0.0, center.lat, center.lon)]
+    # Larger cities first: they are where venues are
+    candidates = sorted(cities_within(center.lat, center.lon, radius), key=lambda pair: -pair[0].population)
+    for candidate, distance in candidates:
+        if len(tiles) >= settings.AI_TILE_MAX_TILES:
+            break
+        if all(haversine_miles(tile.lat, tile.lon, candidate.lat, candidate.lon) >= tile_radius for tile in tiles):
+            tiles.append(Tile(candidate.state, candidate.name, tile_radius, distance, candidate.lat, candidate.lon))
+    return tiles
+
+
+def _distance(venue, tile, center):
+    """Miles from the search centre to a venue, placed by its own city when known"""
+    if center is None:
+        return None
+    place = find_city(venue.get('state') or tile.state, venue.get('city') or '')
+    if place is None:
+        return tile.distance
+    return haversine_miles(center.lat, center.lon, place.lat, place.lon)
+
+
+def merge_tiles(tiles, tile_venues, radius, center):
+    """
+    Merge per-tile venues, dropping duplicates and venues outside the radius.
+
+    Returns:
+        list: Venues with `distance_miles` and `tile` added, nearest first
+    """
+    merged = []
+    seen = set()
+    # Nearer tiles first, so a venue reported twice keeps the closer placement
+    for tile, venues in sorted(zip(tiles, tile_venues), key=lambda pair: pair[0].distance):
+        for venue in venues or []:
+            if not isinstance(venue, dict):
+                continue
+            key = venue_key(venue)
+            if key in seen:
+                continue
+            seen.add(key)
+            distance = _distance(venue, tile, center)
+            if distance is not None and distance > radius:
+                continue
+            merged.append({
+                **venue,
+                'distance_miles': round(distance, 1) if distance is not None else None,
+                'tile': f"{tile.city}, {tile.state}",
+            })
+    merged.sort(key=lambda venue: venue['distance_miles'] if venue['distance_miles'] is not None else radius)
+    return merged
+
+
+async def tiled_discovery(state, city, radius, refresh=False):
+    """
+    Discover venues across a wide radius, one concurrent call per tile.
+
+    Returns:
+        tuple: (ranked venues, per-tile summaries, whether every tile was a cache hit)
+
+    Raises:
+        AIUnavailable: Every tile that needed the model failed because of it
+    """
+    tiles = plan_tiles(state, city, radius)
+    semaphore = asyncio.Semaphore(settings.AI_TILE_CONCURRENCY)
+
+    async def discover(tile):
+        async with semaphore:
+            return await acached_discovery(
+                'venue', tile.state, tile.city, tile.radius,
+                lambda bucket_radius: adiscover_venues(tile.state, tile.city, bucket_radius),
+                refresh=refresh,
+            )
+
+    outcomes = await asyncio.gather(*[discover(tile) for tile in tiles], return_exceptions=True)
+
+    tile_venues = []
+    summaries = []
+    cache_hits = []
+    unavailable = None
+    for tile, outcome in zip(tiles, outcomes):
+        summary = {'state': tile.state, 'city': tile.city, 'radius': tile.radius,
+                   'distance_miles': round(tile.distance, 1)}
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, AIUnavailable):
+                unavailable = outcome
+            else:
+                logger.error(f"Tiled discovery failed for {tile.city}, {tile.state}: {str(outcome)}")
+            tile_venues.append([])
+            summaries.append({**summary, 'status': 'failed', 'error': str(outcome)})
+            continue
+        venues, cache_hit = outcome
+        tile_venues.append(venues)
+        cache_hits.append(cache_hit)
+        summaries.append({**summary, 'status': 'complete', 'count': len(venues or []), 'cache_hit': cache_hit})
+
+    if unavailable is not None and not any(tile_venues):
+        raise unavailable
+
+    center = find_city(state, city)
+    venues = merge_tiles(tiles, tile_venues, radius, center)
+    logger.info(f"Tiled discovery near {city}, {state} ({radius} miles): {len(tiles)} tiles, {len(venues)} venues")
+    return venues, summaries, bool(cache_hits) and all(cache_hits)
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views.state_views import StateList, StateDetail
 from .views.venue_views import VenueList, VenueDetail, StateVenueList
-from .views.ai_views import VenueDiscoveryView, SearchHistoryListView, SearchResultsDetailView, ImportSearchResultsView
+from .views.ai_views import VenueDiscoveryView, VenueDiscoveryStreamView, SearchHistoryListView, SearchResultsDetailView, ImportSearchResultsView
 
 urlpatterns = [
     # State endpoints
@@ -15,6 +15,7 @@ urlpatterns = [
     
     # AI Discovery endpoints
     path('ai/discover/', VenueDiscoveryView.as_view(), name='venue-discovery'),
+    path('ai/discover/stream/', VenueDiscoveryStreamView.as_view(), name='venue-discovery-stream'),
     path('ai/searches/', SearchHistoryListView.as_view(), name='search-history'),
     path('ai/searches/<int:pk>/', SearchResultsDetailView.as_view(), name='search-results'),
     path('ai/searches/<int:pk>/import/', ImportSearchResultsView.as_view(), name='import-venues'),
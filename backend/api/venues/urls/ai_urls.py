@@ -1,8 +1,16 @@
 from django.urls import path
-from ..views.ai_views import VenueDiscoveryView, SearchHistoryListView, SearchResultsDetailView, ImportSearchResultsView
+from ..views.ai_views import VenueDiscoveryView, VenueDiscoveryStreamView, SearchHistoryListView, SearchResultsDetailView, ImportSearchResultsView
+from ..views.batch_views import BatchDiscoveryView, BatchDiscoveryDetailView
+from ..views.tiled_views import TiledVenueDiscoveryView
+from ..views.combined_views import CombinedDiscoveryView
 
 urlpatterns = [
     path('discover/', VenueDiscoveryView.as_view(), name='venue-discovery'),
+    path('discover/stream/', VenueDiscoveryStreamView.as_view(), name='venue-discovery-stream'),
+    path('discover/tiled/', TiledVenueDiscoveryView.as_view(), name='venue-discovery-tiled'),
+    path('discover/combined/', CombinedDiscoveryView.as_view(), name='combined-discovery'),
+    path('discover/batch/', BatchDiscoveryView.as_view(), name='venue-discovery-batch'),
+    path('discover/batch/<int:pk>/', BatchDiscoveryDetailView.as_view(), name='venue-discovery-batch-detail'),
     path('searches/', SearchHistoryListView.as_view(), name='search-history'),
     path('searches/<int:pk>/', SearchResultsDetailView.as_view(), name='search-results'),
     path('searches/<int:pk>/import/', ImportSearchResultsView.as_view(), name='import-venues'),
@@ -1,8 +1,9 @@
 from django.urls import path
-from ..views.venue_views import VenueList, VenueDetail, StateVenueList
+from ..views.venue_views import VenueList, VenueDetail, StateVenueList, VenueFacets
 
 urlpatterns = [
     path('', VenueList.as_view(), name='venue-list'),
+    path('facets/', VenueFacets.as_view(), name='venue-facets'),
     path('<int:pk>/', VenueDetail.as_view(), name='venue-detail'),
     path('states/<int:state_id>/venues/', StateVenueList.as_view(), name='state-venue-list'),
 ]
@@ -0,0 +1,57 @@
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from utils.background import run_in_background
+from utils.throttling import AIDiscoveryThrottle
+
+from ..batch import run_batch_discovery
+from ..models import BatchDiscoveryJob
+from ..serializers import BatchDiscoveryJobSerializer, BatchDiscoveryRequestSerializer
+
+def _stop_count(request):
+    """Throttle cost of a batch: one unit per stop, each of which may call the model"""
+    stops = request.data.get('stops') if isinstance(request.data, dict) else None
+    return len(stops) if isinstance(stops, list) else 1
+
+class BatchDiscoveryView(ListAPIView):
+    """
+    API view for multi-city venue discovery.
+    POST starts a background job for a list of stops and answers 202 with the job;
+    GET lists the user's jobs. Each stop counts against the discovery throttle.
+    """
+    serializer_class = BatchDiscoveryJobSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AIDiscoveryThrottle.costing(_stop_count)]
+
+    def get_queryset(self):
+        """Return only jobs belonging to the authenticated user"""
+        return BatchDiscoveryJob.objects.filter(user=self.request.user)
+
+    def post(self, request):
+        serializer = BatchDiscoveryRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stops = serializer.validated_data['stops']
+        job = BatchDiscoveryJob.objects.create(
+            user=request.user,
+            stops=stops,
+            refresh=serializer.validated_data['refresh'],
+            results=[{**stop, 'status': 'pending'} for stop in stops]
+        )
+        run_in_background(run_batch_discovery, job.id)
+
+        return Response(BatchDiscoveryJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class BatchDiscoveryDetailView(RetrieveAPIView):
+    """
+    API view for polling a batch discovery job.
+    Stops are filled in as they finish; `status` becomes `complete` when all are done.
+    """
+    serializer_class = BatchDiscoveryJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Return only jobs belonging to the authenticated user"""
+        return BatchDiscoveryJob.objects.filter(user=self.request.user)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from asgiref.sync import async_to_sync, sync_to_async
+from networking.models import NetworkingSearchQuery
+from networking.serializers import NetworkingSearchQuerySerializer
+from utils.ai.cache import acached_discovery, wants_refresh
+from utils.ai.openai_client import adiscover_networking, adiscover_venues
+from utils.ai.resilience import AIUnavailable
+from utils.throttling import AIDiscoveryThrottle
+
+from ..ranking import rank_for_user
+from ..serializers import AISearchQuerySerializer
+
+logger = logging.getLogger(__name__)
+
+class CombinedDiscoveryView(APIView):
+    """
+    API view for discovering venues and networking opportunities for one location.
+    Both searches run concurrently, so the response takes about as long as the
+    slower of the two. Each is saved like its own endpoint saves it; one failing
+    doesn't discard the other. Counts as two discovery requests against the throttle.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AIDiscoveryThrottle.costing(2)]
+
+    def post(self, request):
+        state = request.data.get('state')
+        city = request.data.get('city')
+        radius = request.data.get('radius')
+
+        if not all([state, city, radius]):
+            return Response(
+                {"error": "Missing required parameters: state, city, and radius"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            radius = int(radius)
+        except ValueError:
+            return Response(
+                {"error": "Radius must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        refresh = wants_refresh(request.data.get('refresh'))
+        outcomes = async_to_sync(self.discover_both)(request, state, city, radius, refresh)
+
+        payload = {}
+        for name, outcome in zip(('venues', 'networking'), outcomes):
+            if isinstance(outcome, AIUnavailable):
+                payload[name] = {"error": str(outcome)}
+            elif isinstance(outcome, BaseException):
+                logger.error(f"Combined {name} discovery failed for {city}, {state}: {str(outcome)}")
+                payload[name] = {"error": f"{name.capitalize()} discovery failed"}
+            else:
+                payload[name] = outcome
+
+        if all('error' in section for section in payload.values()):
+            unavailable = [outcome for outcome in outcomes if isinstance(outcome, AIUnavailable)]
+            if len(unavailable) == len(outcomes):
+                # 503 with Retry-After
+                raise unavailable[0]
+            return Response(payload, status=status.HTTP_404_NOT_FOUND)
+        return Response(payload, status=status.HTTP_201_CREATED)
+
+    async def discover_both(self, request, state, city, radius, refresh):
+        """Run both halves concurrently; each outcome is a result or the exception it raised"""
+        return await asyncio.gather(
+            self.discover_venues(request, state, city, radius, refresh),
+            self.discover_networking(request, state, city, radius, refresh),
+            return_exceptions=True
+        )
+
+    async def discover_venues(self, request, state, city, radius, refresh):
+        """Venue half: same results and saved search as VenueDiscoveryView"""
+        venues_data, cache_hit = await acached_discovery(
+            'venue', state, city, radius,
+            lambda bucket_radius: adiscover_venues(state, city, bucket_radius),
+            refresh=refresh,
+        )
+        if not venues_data:
+            return {"error": "Failed to get venue recommendations or no venues found"}
+
+        venues_data = await sync_to_async(rank_for_user)(venues_data, request.user)
+        serializer = AISearchQuerySerializer(
+            data={'state': state, 'city': city, 'radius': radius, 'results': venues_data},
+            context={'request': request}
+        )
+        if not await sync_to_async(serializer.is_valid)():
+            return {"error": serializer.errors}
+        await sync_to_async(serializer.save)()
+        return {**serializer.data, 'cache_hit': cache_hit}
+
+    async def discover_networking(self, request, state, city, radius, refresh):
+        """Networking half: same results and saved search as NetworkingDiscoveryView"""
+        opportunities, cache_hit = await acached_discovery(
+            'networking', state, city, radius,
+            lambda bucket_radius: adiscover_networking(state, city, bucket_radius),
+            refresh=refresh,
+        )
+        search_query = await NetworkingSearchQuery.objects.acreate(
+            user=request.user,
+            state=state,
+            city=city,
+            radius=radius,
+            results=opportunities
+        )
+        return {**NetworkingSearchQuerySerializer(search_query).data, 'cache_hit': cache_hit}
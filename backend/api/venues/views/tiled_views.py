@@ -0,0 +1,83 @@
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from asgiref.sync import async_to_sync
+from utils.ai.cache import wants_refresh
+from utils.throttling import AIDiscoveryThrottle
+
+from ..ranking import rank_for_user
+from ..serializers import AISearchQuerySerializer
+from ..tiling import plan_tiles, tiled_discovery
+
+def _tile_count(request):
+    """Throttle cost of a tiled search: one unit per tile, each of which may call the model"""
+    state, city, radius = (request.data.get(name) for name in ('state', 'city', 'radius'))
+    if not all([state, city, radius]):
+        return 1
+    try:
+        return len(plan_tiles(state, city, int(radius)))
+    except (AttributeError, TypeError, ValueError):
+        return 1
+
+class TiledVenueDiscoveryView(APIView):
+    """
+    API view for discovering venues across a wide radius.
+    The area is split into tiles around nearby cities that are searched concurrently;
+    the merged venues are ranked by distance from the requested city, or by
+    relevance to the artist with `"sort": "relevance"`. Each tile counts against
+    the discovery throttle.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [AIDiscoveryThrottle.costing(_tile_count)]
+
+    def post(self, request):
+        state = request.data.get('state')
+        city = request.data.get('city')
+        radius = request.data.get('radius')
+        sort = request.data.get('sort', 'distance')
+
+        if not all([state, city, radius]):
+            return Response(
+                {"error": "Missing required parameters: state, city, and radius"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            radius = int(radius)
+        except ValueError:
+            return Response(
+                {"error": "Radius must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if sort not in ('distance', 'relevance'):
+            return Response(
+                {"error": "Sort must be 'distance' or 'relevance'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The tiles are searched concurrently on an event loop
+        venues_data, tiles, cache_hit = async_to_sync(tiled_discovery)(
+            state, city, radius, refresh=wants_refresh(request.data.get('refresh'))
+        )
+
+        if not venues_data:
+            return Response(
+                {"error": "Failed to get venue recommendations or no venues found", "tiles": tiles},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if sort == 'relevance':
+            venues_data = rank_for_user(venues_data, request.user)
+
+        serializer = AISearchQuerySerializer(
+            data={'state': state, 'city': city, 'radius': radius, 'results': venues_data},
+            context={'request': request}
+        )
+
+        if serializer.is_valid():
+            serializer.save()
+            return Response({**serializer.data, 'cache_hit': cache_hit, 'tiles': tiles}, status=status.HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
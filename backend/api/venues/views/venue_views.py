@@ -3,18 +3,73 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, ListAPIView
+from rest_framework.pagination import PageNumberPagination
 
+from ..facets import filter_venues, parse_filters, venue_facets
 from ..models import Venue, State
+from ..nearby import parse_near, venues_near
+from ..search import search_venues
 from ..serializers import VenueSerializer
 
-class VenueList(ListCreateAPIView):
+class VenueSearchPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class VenueSearchMixin:
+    """
+    Full-text search with `?q=`, ranked best first (see search.py), radius
+    queries with `?near=<zip|lat,lng>&radius=`, nearest first (see nearby.py),
+    and filters such as `?city=&capacity=&has_email=` (see facets.py). All may
+    be combined. Searches and filtered lists are paginated; without any of
+    them the full list is returned as before.
+    """
+    pagination_class = VenueSearchPagination
+    near = None
+    filters = None
+    
+    @property
+    def search_query(self):
+        return self.request.query_params.get('q', '').strip()
+    
+    def list(self, request, *args, **kwargs):
+        try:
+            self.parse_params(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+    
+    def parse_params(self, request):
+        near = request.query_params.get('near', '').strip()
+        if near:
+            self.near = parse_near(near, request.query_params.get('radius'))
+        self.filters = parse_filters(request.query_params)
+    
+    def search_queryset(self, queryset):
+        """Apply `q` and `near`; the latter turns the queryset into a list"""
+        if self.search_query:
+            queryset = search_venues(queryset, self.search_query)
+        if self.near:
+            return venues_near(queryset, *self.near)
+        return queryset
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.search_queryset(filter_venues(queryset, self.filters))
+    
+    def paginate_queryset(self, queryset):
+        if not (self.search_query or self.near or self.filters):
+            return None
+        return super().paginate_queryset(queryset)
+
+class VenueList(VenueSearchMixin, ListCreateAPIView):
     """View for listing and creating venues"""
     serializer_class = VenueSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         # Only return venues belonging to the current user
-        return Venue.objects.filter(user=self.request.user)
+        return Venue.objects.filter(user=self.request.user).select_related('state')
     
     def perform_create(self, serializer):
         # Ensure venue is associated with current user
@@ -29,7 +84,7 @@ class VenueDetail(RetrieveUpdateDestroyAPIView):
         # Only return venues belonging to the current user
         return Venue.objects.filter(user=self.request.user)
 
-class StateVenueList(ListAPIView):
+class StateVenueList(VenueSearchMixin, ListAPIView):
     """View for listing venues for a specific state"""
     serializer_class = VenueSerializer
     permission_classes = [IsAuthenticated]
@@ -42,4 +97,27 @@ class StateVenueList(ListAPIView):
         return Venue.objects.filter(
             state_id=state_id,
             user=self.request.user
-        ) 
\ No newline at end of file
+        ).select_related('state')
+
+class VenueFacets(VenueSearchMixin, APIView):
+    """
+    Facet counts for the user's venues under the same `q`, `near` and filter
+    parameters as the venue list; each facet ignores its own selection
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            self.parse_params(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Venue.objects.filter(user=request.user)
+        scope = None
+        if self.search_query or self.near:
+            found = self.search_queryset(queryset)
+            # A subquery for search; radius matches are already a list of ids
+            ids = found.ids if self.near else found.order_by().values('id')
+            queryset = queryset.filter(id__in=ids)
+            scope = [self.search_query, self.near]
+        return Response(venue_facets(request.user, queryset, self.filters, scope))
@@ -17,6 +17,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from channels.db import database_sync_to_async
 from channels.security.websocket import AllowedHostsOriginValidator
+from utils.ai.streaming import keep_receive
 
 # Configure logging
 logger = logging.getLogger('websocket')
@@ -98,8 +99,9 @@ def TokenAuthMiddlewareStack(inner):
 
 # Define application
 application = ProtocolTypeRouter({
-    # Django's ASGI application for handling HTTP requests
-    "http": get_asgi_application(),
+    # Django's ASGI application for handling HTTP requests; streamed responses
+    # watch `receive` to stop as soon as the client disconnects
+    "http": keep_receive(get_asgi_application()),
     
     # WebSocket handler with auth and validation
     "websocket": TokenAuthMiddlewareStack(
@@ -0,0 +1,114 @@
+"""
+Mail-merge outreach for many venues at once.
+
+The artist context is built once for the whole batch and each venue's email
+is drafted from the templates in composer.py. In polish mode the drafts are
+rewritten by the model concurrently, at most EMAIL_BATCH_CONCURRENCY at a
+time; the account rate limiter in utils/ai/resilience.py paces the calls.
+Each email is saved as a VenueOutreach row as soon as it is ready and then
+streamed to the client as a Server-Sent Event carrying the row's id, so a
+client that disconnects early keeps the emails it has already seen. Template
+drafts are all ready at once and are saved with one bulk_create.
+"""
+import asyncio
+import logging
+from django.conf import settings
+from api.venues.models import Venue
+from utils.ai.resilience import AIUnavailable
+from utils.ai.streaming import sse_event
+
+from .composer import aload_artist_context, compose_email, polish_prompt
+from .models import VenueOutreach
+
+logger = logging.getLogger(__name__)
+
+
+async def batch_email_stream(user, venue_ids, tone, mode, polish, event_date=None, notes=''):
+    """
+    Generate the Server-Sent Events for a batch of outreach emails.
+
+    Each venue gets an `email` event with `venue`, `venue_name`, `email` and
+    the saved `outreach_id`, or with `error` (and `retry_after` when the AI service is unavailable).
+    Venue ids that aren't the user's are reported the same way. A final
+    `done` event lists the saved outreach ids by venue.
+
+    Args:
+        user: The artist sending the emails
+        venue_ids (list): Ids of the user's venues
+        tone (str): Template tone, see composer.TONES
+        mode (str): 'template' or 'polish'
+        polish (callable): Async prompt -> text; the model call used in polish mode
+        event_date (date): Preferred performance date, for every email
+        notes (str): Notes included in every email
+
+    Yields:
+        str: Formatted SSE events
+    """
+    venues = {venue.id: venue async for venue in Venue.objects.filter(user=user, id__in=venue_ids)}
+    for venue_id in dict.fromkeys(venue_ids):
+        if venue_id not in venues:
+            yield sse_event('email', {'venue': venue_id, 'error': 'Venue not found'})
+
+    artist = await aload_artist_context(user)
+    drafts = {
+        venue.id: compose_email(artist, venue.name, venue=venue, event_date=event_date, notes=notes, tone=tone)
+        for venue in venues.values()
+    }
+
+    def outreach(venue_id, email):
+        return VenueOutreach(
+            user=user,
+            venue=venues[venue_id],
+            venue_name=venues[venue_id].name,
+            email_content=email,
+            event_date=event_date,
+            notes=notes
+        )
+
+    def email_event(row):
+        return sse_event('email', {
+            'venue': row.venue_id, 'venue_name': row.venue_name, 'email': row.email_content, 'outreach_id': row.id,
+        })
+
+    saved = []
+    failed = 0
+    if mode == 'polish':
+        semaphore = asyncio.Semaphore(settings.EMAIL_BATCH_CONCURRENCY)
+
+        async def polish_one(venue_id):
+            async with semaphore:
+                try:
+                    return venue_id, await polish(polish_prompt(drafts[venue_id], artist)), None
+                except AIUnavailable as e:
+                    return venue_id, None, {**e.detail, 'retry_after': e.wait}
+                except Exception as e:
+                    logger.error(f"Polishing outreach to venue {venue_id} failed: {str(e)}")
+                    return venue_id, None, {'error': 'Failed to generate email'}
+
+        tasks = [asyncio.ensure_future(polish_one(venue_id)) for venue_id in drafts]
+        try:
+            for task in asyncio.as_completed(tasks):
+                venue_id, email, error = await task
+                if error is not None:
+                    failed += 1
+                    yield sse_event('email', {'venue': venue_id, 'venue_name': venues[venue_id].name, **error})
+                    continue
+                row = outreach(venue_id, email)
+                await row.asave()
+                saved.append(row)
+                yield email_event(row)
+        finally:
+            # Stops outstanding calls if the client disconnected mid-stream
+            for task in tasks:
+                task.cancel()
+    else:
+        saved = await VenueOutreach.objects.abulk_create([outreach(venue_id, email) for venue_id, email in drafts.items()])
+        for row in saved:
+            yield email_event(row)
+
+    logger.info(f"Batch outreach for user {user.id}: {len(saved)} emails saved, {failed} failed")
+    yield sse_event('done', {
+        'count': len(saved),
+        'failed': failed + len(set(venue_ids) - venues.keys()),
+        'outreach': [{'venue': row.venue_id, 'outreach_id': row.id} for row in saved],
+    })
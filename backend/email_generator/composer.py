@@ -0,0 +1,148 @@
+"""
+Template-based outreach emails.
+
+Most outreach is the same email: introduce the artist, say why the venue
+fits, ask about booking. compose_email() assembles it from the artist's
+profile, social links, the venue and the user's notes with plain string
+templates, so a draft costs no model call and takes well under a
+millisecond. Each tone is a set of templates; polish_prompt() builds the
+prompt for the optional model pass that rewrites a draft.
+"""
+from string import Formatter
+from asgiref.sync import sync_to_async
+from profiles.context import get_profile_context
+
+TONES = {
+    'professional': {
+        'subject': "Booking inquiry: {artist_name} at {venue_name}",
+        'greeting': "Dear {venue_name} booking team,",
+        'intro': "My name is {artist_name}, and I'm writing to ask about performance opportunities at {venue_name}.",
+        'bio': "{bio}",
+        'genres': "My music spans {genres}, and I believe it would be a strong fit for your audience.",
+        'venue': "{venue_line}",
+        'date': "I'm particularly interested in performing on {event_date}, if that date is available.",
+        'ask': "Could you share how your booking process works and what you look for in performers? "
+               "I'd be glad to send a press kit, recordings or anything else that would help.",
+        'closing': "Thank you for your time and consideration. I look forward to hearing from you.",
+        'sign_off': "Best regards,",
+    },
+    'friendly': {
+        'subject': "{artist_name} would love to play {venue_name}",
+        'greeting': "Hi {venue_name} team,",
+        'intro': "I'm {artist_name}, and I'd love to put on a show at {venue_name}.",
+        'bio': "{bio}",
+        'genres': "I play {genres}, and I think your crowd would really connect with it.",
+        'venue': "{venue_line}",
+        'date': "{event_date} would be a great date for me if you have an opening.",
+        'ask': "How do you usually book acts? Happy to send over music, videos or whatever helps.",
+        'closing': "Thanks so much, and hope to talk soon!",
+        'sign_off': "Cheers,",
+    },
+    'brief': {
+        'subject': "Booking: {artist_name}",
+        'greeting': "Hello {venue_name},",
+        'intro': "I'm {artist_name}, and I'd like to perform at {venue_name}.",
+        'bio': "",
+        'genres': "I play {genres}.",
+        'venue': "",
+        'date': "I'm looking at {event_date}.",
+        'ask': "Who should I talk to about booking?",
+        'closing': "",
+        'sign_off': "Thanks,",
+    },
+}
+
+DEFAULT_TONE = 'professional'
+
+
+def load_artist_context(user):
+    """
+    The artist values an email is filled with, from the cached profile context.
+
+    Returns:
+        dict: artist_name, bio, genres, phone_number, email, social_links
+              (a list of [label, url] pairs) and prompt (the artist described
+              for a model prompt)
+    """
+    context = get_profile_context(user)
+    return {**context['artist'], 'email': user.email or '', 'prompt': context['prompt']}
+
+
+aload_artist_context = sync_to_async(load_artist_context)
+
+
+def _venue_line(venue):
+    """A sentence about the venue itself, from whatever its record has"""
+    if venue is None:
+        return ''
+    place = f" in {venue.city}" if venue.city else ''
+    if venue.capacity:
+        return f"Your {venue.capacity}-capacity room{place} is exactly the kind of space where my shows work best."
+    if venue.city:
+        return f"I've been looking for the right room{place}, and {venue.name} stood out."
+    return ''
+
+
+def compose_email(artist, venue_name, venue=None, event_date=None, notes='', tone=DEFAULT_TONE):
+    """
+    Assemble an outreach email from templates.
+
+    Args:
+        artist (dict): As returned by aload_artist_context
+        venue_name (str): Venue the email is addressed to
+        venue (Venue): The venue's record, if the user has one; adds a line about it
+        event_date (date): Preferred performance date
+        notes (str): The user's notes, included as their own paragraph
+        tone (str): One of TONES
+
+    Returns:
+        str: Plain text email, starting with a "Subject:" line
+    """
+    templates = TONES[tone]
+    values = {
+        **artist,
+        'venue_name': venue_name,
+        'venue_line': _venue_line(venue),
+        'event_date': f"{event_date:%B} {event_date.day}, {event_date.year}" if event_date else '',
+    }
+
+    def fill(part):
+        # A sentence whose values are missing is left out rather than rendered with gaps
+        fields = [field for _, field, _, _ in Formatter().parse(templates[part]) if field]
+        if any(not values.get(field) for field in fields):
+            return ''
+        return templates[part].format(**values).strip()
+
+    body = [fill('intro'), fill('bio'), fill('genres'), fill('venue')]
+    if event_date:
+        body.append(fill('date'))
+    if notes:
+        body.append(notes.strip())
+    body.extend([fill('ask'), fill('closing')])
+
+    signature = [fill('sign_off'), artist['artist_name']]
+    if artist['email']:
+        signature.append(artist['email'])
+    if artist['phone_number']:
+        signature.append(artist['phone_number'])
+    signature.extend(f"{label}: {url}" for label, url in artist['social_links'])
+
+    paragraphs = [f"Subject: {fill('subject')}", fill('greeting')]
+    paragraphs.extend(paragraph for paragraph in body if paragraph)
+    paragraphs.append('\n'.join(line for line in signature if line))
+    return '\n\n'.join(paragraphs)
+
+
+def polish_prompt(draft, artist):
+    """Prompt asking the model to rewrite a template draft without losing any of its facts"""
+    return f"""
+    Polish the following cold email from a musician to a music venue. Make it read naturally and
+    persuasively, keep the same tone, and keep it about the same length. Keep the "Subject:" line.
+    You MUST keep every fact, date, contact detail and link from the draft, and must not add new ones.
+    The artist's details are below for reference. Return only the email, as plain text.
+
+    {artist['prompt']}
+
+    Draft:
+    {draft}
+    """
@@ -1,4 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
+from .composer import TONES, DEFAULT_TONE
 from .models import VenueOutreach
 
 class VenueOutreachSerializer(serializers.ModelSerializer):
@@ -8,6 +10,30 @@ class VenueOutreachSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sent_date']
 
 class EmailGenerationSerializer(serializers.Serializer):
-    venue_name = serializers.CharField(required=True)
+    MODES = ['template', 'polish']
+
+    venue_name = serializers.CharField(required=False, allow_blank=True)
+    # One of the user's saved venues; its name is used when venue_name is left out
+    venue = serializers.IntegerField(required=False, allow_null=True)
+    event_date = serializers.DateField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    tone = serializers.ChoiceField(choices=list(TONES), default=DEFAULT_TONE)
+    # 'template' drafts the email without a model call; 'polish' has the model rewrite the draft
+    mode = serializers.ChoiceField(choices=MODES, default='template')
+
+    def validate(self, data):
+        if not data.get('venue_name') and not data.get('venue'):
+            raise serializers.ValidationError({'venue_name': "Provide venue_name or venue."})
+        return data 
+
+class BatchEmailGenerationSerializer(serializers.Serializer):
+    """A mail-merge request: one email per saved venue, sharing the other options"""
+    venues = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.EMAIL_BATCH_MAX_VENUES
+    )
     event_date = serializers.DateField(required=False, allow_null=True)
-    notes = serializers.CharField(required=False, allow_blank=True) 
\ No newline at end of file
+    notes = serializers.CharField(required=False, allow_blank=True)
+    tone = serializers.ChoiceField(choices=list(TONES), default=DEFAULT_TONE)
+    mode = serializers.ChoiceField(choices=EmailGenerationSerializer.MODES, default='template')
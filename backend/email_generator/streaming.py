@@ -0,0 +1,77 @@
+"""
+Outreach email generation streamed as Server-Sent Events.
+
+In polish mode the model's rewrite is forwarded as `token` events while it
+is generated, so the user watches the email being written instead of
+waiting for the whole completion. A template draft needs no model call and
+is sent as a single `token` event. The VenueOutreach record is saved only
+once the email is complete.
+
+If the client disconnects, sse_response() closes the generator at once. That
+closes the upstream stream in astream_completion, so the model stops
+generating, and nothing is saved.
+"""
+import logging
+from utils.ai.openai_client import astream_completion
+from utils.ai.resilience import AIUnavailable
+from utils.ai.streaming import sse_event
+
+from .composer import DEFAULT_TONE, aload_artist_context, compose_email, polish_prompt
+from .models import VenueOutreach
+
+logger = logging.getLogger(__name__)
+
+
+async def email_event_stream(user, venue_name, mode, venue=None, event_date=None, notes='', tone=DEFAULT_TONE):
+    """
+    Generate the Server-Sent Events for one outreach email.
+
+    Yields `token` events with `text`, then `done` with `outreach_id` and the
+    full `email`. Failures end the stream with an `error` event; when the model
+    is unavailable it carries `retry_after` in seconds.
+
+    Args:
+        user: The artist sending the email
+        venue_name (str): Venue the email is addressed to
+        mode (str): 'template' or 'polish'
+        venue (Venue): The venue's record, if the user has one
+        event_date (date): Preferred performance date
+        notes (str): The user's notes
+        tone (str): Template tone, see composer.TONES
+
+    Yields:
+        str: Formatted SSE events
+    """
+    artist = await aload_artist_context(user)
+    draft = compose_email(artist, venue_name, venue=venue, event_date=event_date, notes=notes, tone=tone)
+
+    if mode == 'polish':
+        pieces = []
+        messages = [{"role": "user", "content": polish_prompt(draft, artist)}]
+        try:
+            # Same budget as agenerate_completion
+            async for text in astream_completion(messages, max_tokens=500):
+                pieces.append(text)
+                yield sse_event('token', {'text': text})
+        except AIUnavailable as e:
+            logger.warning(f"AI unavailable for streamed email to {venue_name}: {str(e)}")
+            yield sse_event('error', {**e.detail, 'retry_after': e.wait})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming email to {venue_name}: {str(e)}")
+            yield sse_event('error', {'error': 'Failed to generate email. Please try again later.'})
+            return
+        email = ''.join(pieces)
+    else:
+        email = draft
+        yield sse_event('token', {'text': email})
+
+    outreach = await VenueOutreach.objects.acreate(
+        user=user,
+        venue=venue,
+        venue_name=venue_name,
+        email_content=email,
+        event_date=event_date,
+        notes=notes
+    )
+    yield sse_event('done', {'outreach_id': outreach.id, 'email': email})
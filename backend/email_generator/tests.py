@@ -1,3 +1,155 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from api.venues.models import State, Venue
+from utils.ai.streaming import keep_receive
+from . import streaming
+from .batch import batch_email_stream
+from .composer import compose_email
+from .models import VenueOutreach
+
+
+def parse_event(chunk):
+    event, data = chunk.strip().split('\n')
+    return event[len('event: '):], json.loads(data[len('data: '):])
+
+
+class BatchEmailStreamTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+        state = State.objects.create(name='Texas', abbreviation='TX', user=self.user)
+        self.venues = [
+            Venue.objects.create(name=name, city='Austin', state=state, user=self.user)
+            for name in ('Blue Room', 'Late Bar')
+        ]
+        self.release = {venue.name: asyncio.Event() for venue in self.venues}
+
+    async def polish(self, prompt):
+        for name, released in self.release.items():
+            if name in prompt:
+                await released.wait()
+                return f'Polished for {name}'
+
+    def stream(self, mode='polish'):
+        return batch_email_stream(self.user, [venue.id for venue in self.venues] + [0], 'friendly', mode, self.polish)
+
+    async def test_saves_each_email_before_sending_it(self):
+        stream = self.stream()
+        self.assertEqual(parse_event(await stream.__anext__())[1]['error'], 'Venue not found')
+
+        self.release['Late Bar'].set()
+        event, data = parse_event(await asyncio.wait_for(stream.__anext__(), 1))
+        self.assertEqual((event, data['venue_name']), ('email', 'Late Bar'))
+        saved = await VenueOutreach.objects.aget(id=data['outreach_id'])
+        self.assertEqual(saved.email_content, 'Polished for Late Bar')
+        self.assertEqual(await VenueOutreach.objects.acount(), 1)
+
+        self.release['Blue Room'].set()
+        rest = [parse_event(chunk) async for chunk in stream]
+        self.assertEqual([event for event, _ in rest], ['email', 'done'])
+        done = rest[-1][1]
+        self.assertEqual((done['count'], done['failed']), (2, 1))
+        self.assertEqual({row['outreach_id'] for row in done['outreach']},
+                         {data['outreach_id'], rest[0][1]['outreach_id']})
+
+    async def test_disconnect_keeps_emails_already_sent(self):
+        stream = self.stream()
+        await stream.__anext__()
+        self.release['Late Bar'].set()
+        await stream.__anext__()
+        await stream.aclose()
+        self.assertEqual([row.venue_name async for row in VenueOutreach.objects.all()], ['Late Bar'])
+
+    async def test_template_drafts_are_saved_together(self):
+        events = [parse_event(chunk) async for chunk in self.stream(mode='template')]
+        emails = [data for event, data in events if event == 'email' and 'email' in data]
+        self.assertEqual([data['venue_name'] for data in emails], ['Blue Room', 'Late Bar'])
+        for data in emails:
+            saved = await VenueOutreach.objects.aget(id=data['outreach_id'])
+            self.assertEqual(saved.email_content, data['email'])
+
+
+class ComposeEmailTests(SimpleTestCase):
+    artist = {'artist_name': 'Kay', 'bio': '', 'genres': '', 'email': '', 'phone_number': '', 'social_links': []}
+
+    def test_brief_tone_leaves_out_missing_genres(self):
+        email = compose_email(self.artist, 'Blue Room', tone='brief')
+        self.assertIn("I'm Kay, and I'd like to perform at Blue Room.", email)
+        self.assertNotIn('play', email)
+        email = compose_email({**self.artist, 'genres': 'soul, funk'}, 'Blue Room', tone='brief')
+        self.assertIn('I play soul, funk.', email)
+
+    def test_sentences_with_missing_values_are_dropped(self):
+        email = compose_email(self.artist, 'Blue Room')
+        self.assertNotIn('spans', email)
+        self.assertNotIn('\n\n\n', email)
+
+
+class GenerateEmailTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='artist', password='pw')
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.user)
+
+    def test_template_email_is_saved(self):
+        response = self.client.post('/api/email-generator/generate/', {'venue_name': 'Blue Room'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Blue Room', response.data['email'])
+        self.assertEqual(VenueOutreach.objects.get(id=response.data['outreach_id']).email_content,
+                         response.data['email'])
+
+    def test_polish_rewrites_the_draft(self):
+        completion = mock.Mock(choices=[mock.Mock(message=mock.Mock(content='Polished'))])
+        with mock.patch('email_generator.views.acreate_chat_completion', mock.AsyncMock(return_value=completion)):
+            response = self.client.post('/api/email-generator/generate/',
+                                        {'venue_name': 'Blue Room', 'mode': 'polish'}, format='json')
+        self.assertEqual((response.status_code, response.data['email']), (200, 'Polished'))
+
+
+class EmailStreamDisconnectTests(TransactionTestCase):
+    async def test_disconnect_stops_the_model_at_once(self):
+        user = await get_user_model().objects.acreate(username='artist')
+        closed = asyncio.Event()
+
+        async def completion(messages, max_tokens=None):
+            try:
+                yield 'Dear venue,'
+                await asyncio.Event().wait()
+            finally:
+                closed.set()
+
+        body = json.dumps({'venue_name': 'Blue Room', 'mode': 'polish'}).encode()
+        disconnect = asyncio.Event()
+        sent = []
+
+        async def receive():
+            if body not in sent:
+                sent.append(body)
+                return {'type': 'http.request', 'body': body}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if b'Dear venue' in message.get('body', b''):
+                disconnect.set()
+
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/api/email-generator/generate/stream/', 'query_string': b'',
+            'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode()),
+                        (b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode())],
+        }
+        with mock.patch.object(streaming, 'astream_completion', completion):
+            await asyncio.wait_for(keep_receive(ASGIHandler())(scope, receive, send), 5)
+
+        self.assertTrue(closed.is_set())
+        self.assertEqual(sent[1]['status'], 200)
+        self.assertFalse(sent[-1].get('more_body'))
+        self.assertEqual(await VenueOutreach.objects.acount(), 0)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VenueOutreachViewSet, generate_email
+from .views import VenueOutreachViewSet, generate_email, generate_email_batch, generate_email_stream
 
 router = DefaultRouter()
 router.register(r'outreach', VenueOutreachViewSet, basename='outreach')
@@ -8,4 +8,6 @@ router.register(r'outreach', VenueOutreachViewSet, basename='outreach')
 urlpatterns = [
     path('', include(router.urls)),
     path('generate/', generate_email, name='generate-email'),
+    path('generate/stream/', generate_email_stream, name='generate-email-stream'),
+    path('generate/batch/', generate_email_batch, name='generate-email-batch'),
 ] 
\ No newline at end of file
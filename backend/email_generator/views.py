@@ -1,41 +1,35 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
 from rest_framework.response import Response
 from .models import VenueOutreach
-from .serializers import VenueOutreachSerializer, EmailGenerationSerializer
-from openai import OpenAI
+from .serializers import VenueOutreachSerializer, EmailGenerationSerializer, BatchEmailGenerationSerializer
+from utils.ai.telemetry import acreate_chat_completion
+from utils.ai.resilience import AIUnavailable
+from asgiref.sync import async_to_sync
+from utils.throttling import EmailGenerationThrottle
 from django.conf import settings
 from django.utils import timezone
-from profiles.models import ArtistProfile, SocialLink
+from api.venues.models import Venue
+from .batch import batch_email_stream
+from .streaming import email_event_stream
+from .composer import compose_email, load_artist_context, polish_prompt
+from utils.ai.streaming import sse_response
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-def generate_completion(prompt, max_tokens=500):
-    """Generate a completion using OpenAI API"""
-    try:
-        # Debug dump of available arguments - this will help us understand what's being passed
-        logger.info("OpenAI API settings: KEY=%s, MODEL=%s", 
-                   settings.OPENAI_API_KEY[:5] + "..." if settings.OPENAI_API_KEY else "Not set", 
-                   settings.OPENAI_MODEL)
-        
-        # Try to create client directly with minimal arguments
-        logger.info("Initializing OpenAI client directly")
-        try:
-            client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            logger.info("OpenAI client initialized successfully")
-        except Exception as e:
-            logger.error(f"First OpenAI client init error: {e}")
-            # Fallback approach - create with empty init
-            logger.info("Trying fallback OpenAI client initialization")
-            client = OpenAI()
-            client.api_key = settings.OPENAI_API_KEY
-            logger.info("Fallback OpenAI client initialization succeeded")
+async def agenerate_completion(prompt, max_tokens=500):
+    """
+    Generate a completion using OpenAI API.
 
+    Failures are logged and re-raised; AIUnavailable means the model can't be
+    reached right now.
+    """
+    try:
         logger.info("Calling OpenAI completion create")
-        response = client.chat.completions.create(
+        response = await acreate_chat_completion(
             model=settings.OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
@@ -46,7 +40,7 @@ def generate_completion(prompt, max_tokens=500):
         logger.error(f"Error generating OpenAI completion: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
         logger.error(f"Error details: {repr(e)}")
-        return "Error generating response. Please try again later."
+        raise
 
 class VenueOutreachViewSet(viewsets.ModelViewSet):
     """ViewSet for venue outreach history"""
@@ -59,83 +53,45 @@ class VenueOutreachViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([EmailGenerationThrottle])
 def generate_email(request):
-    """Generate an email to a venue using AI"""
+    """
+    Generate an email to a venue.
+
+    The email is assembled from templates in the chosen tone, without a model
+    call; `"mode": "polish"` additionally has the model rewrite the draft.
+    """
     serializer = EmailGenerationSerializer(data=request.data)
     
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     # Extract data from request
-    venue_name = serializer.validated_data['venue_name']
+    venue_id = serializer.validated_data.get('venue')
     event_date = serializer.validated_data.get('event_date')
     notes = serializer.validated_data.get('notes', '')
+    tone = serializer.validated_data['tone']
+    mode = serializer.validated_data['mode']
     
-    # Get user profile for artist information
-    try:
-        artist_profile = request.user.artist_profile
-        artist_name = artist_profile.artist_name or request.user.username
-        bio = artist_profile.bio or "I'm an artist looking to perform at your venue."
-        genres = ", ".join(artist_profile.genres) if artist_profile.genres else "various genres"
-        phone_number = artist_profile.phone_number or ""
-        
-        # Get social media links
-        social_links = SocialLink.objects.filter(profile=artist_profile)
-        social_links_text = ""
-        if social_links.exists():
-            social_links_text = "\nSocial Media Links:\n"
-            for link in social_links:
-                social_links_text += f"- {link.label}: {link.url}\n"
-    except:
-        # Default values if profile doesn't exist
-        artist_name = request.user.username
-        bio = "I'm an artist looking to perform at your venue."
-        genres = "various genres"
-        phone_number = ""
-        social_links_text = ""
-    
-    # Create prompt for OpenAI
-    prompt = f"""
-    Write a professional cold email to {venue_name} from {artist_name}, inquiring about 
-    potential performance opportunities. You MUST use ALL of the following information in the email:
+    venue = None
+    if venue_id:
+        venue = Venue.objects.filter(id=venue_id, user=request.user).first()
+        if venue is None:
+            return Response({"error": "Venue not found"}, status=status.HTTP_404_NOT_FOUND)
+    venue_name = serializer.validated_data.get('venue_name') or venue.name
     
-    Artist Name: {artist_name}
-    Music Genres: {genres}
-    Bio: {bio}
-    """
-
-    if phone_number:
-        prompt += f"Phone Number: {phone_number}\n"
-    
-    if social_links_text:
-        prompt += f"\n{social_links_text}"
-    
-    if event_date:
-        prompt += f"\nPreferred Event Date: {event_date.strftime('%B %d, %Y')}"
-    
-    if notes:
-        prompt += f"\nAdditional Notes: {notes}"
-    
-    prompt += """
-    
-    The email MUST include ALL of the following elements:
-    - A strong introduction of the artist using their bio information
-    - Clear expression of interest in performing at the venue
-    - Detailed mention of musical style/genres and any achievements from the bio
-    - Request for information about booking process
-    - Professional closing with contact information (email and phone if provided)
-    - All provided social media links formatted clearly in the email signature
-    
-    Format as plain text email and make sure to incorporate EVERY piece of information provided above.
-    """
+    # Artist information from the user's profile, with defaults if there is none
+    artist = load_artist_context(request.user)
+    email_content = compose_email(artist, venue_name, venue=venue, event_date=event_date, notes=notes, tone=tone)
     
     try:
-        # Generate email with OpenAI API
-        email_content = generate_completion(prompt)
+        if mode == 'polish':
+            email_content = async_to_sync(agenerate_completion)(polish_prompt(email_content, artist))
         
         # Save outreach record
         outreach = VenueOutreach.objects.create(
             user=request.user,
+            venue=venue,
             venue_name=venue_name,
             email_content=email_content,
             event_date=event_date,
@@ -144,11 +100,79 @@ def generate_email(request):
         
         return Response({
             "email": email_content,
-            "outreach_id": outreach.id
+            "outreach_id": outreach.id,
+            "mode": mode,
+            "tone": tone
         })
         
+    except AIUnavailable:
+        # Answered as 503 with Retry-After; nothing is saved
+        raise
     except Exception as e:
         return Response(
             {"error": f"Failed to generate email: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+def _polish_count(request):
+    """Throttle cost of a batch: one unit per email the model polishes; templates need no calls"""
+    data = request.data
+    if not isinstance(data, dict) or data.get('mode') != 'polish':
+        return 1
+    venues = data.get('venues')
+    return len(venues) if isinstance(venues, list) else 1
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([EmailGenerationThrottle.costing(_polish_count)])
+def generate_email_batch(request):
+    """
+    Generate outreach emails for a list of the user's venues.
+
+    Answers with a text/event-stream: one `email` event per venue as it is
+    ready, then a `done` event with the saved outreach ids. In polish mode
+    each venue counts against the email throttle.
+    """
+    serializer = BatchEmailGenerationSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    events = batch_email_stream(
+        request.user, data['venues'], data['tone'], data['mode'], agenerate_completion,
+        event_date=data.get('event_date'),
+        notes=data.get('notes', '')
+    )
+    return sse_response(request, events)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([EmailGenerationThrottle])
+def generate_email_stream(request):
+    """
+    Generate an email to a venue, streamed as Server-Sent Events.
+
+    Takes the same body as generate_email. The email arrives as `token`
+    events; a `done` event follows once the outreach record is saved.
+    """
+    serializer = EmailGenerationSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    venue = None
+    if data.get('venue'):
+        venue = Venue.objects.filter(id=data['venue'], user=request.user).first()
+        if venue is None:
+            return Response({"error": "Venue not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    events = email_event_stream(
+        request.user, data.get('venue_name') or venue.name, data['mode'],
+        venue=venue,
+        event_date=data.get('event_date'),
+        notes=data.get('notes', ''),
+        tone=data['tone']
+    )
+    return sse_response(request, events)
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def summarize(apps, schema_editor):
+    """Fill in result_count and top_names for existing searches"""
+    from utils.ai.summary import summarize_results
+    NetworkingSearchQuery = apps.get_model('networking', 'NetworkingSearchQuery')
+
+    batch = []
+    for search in NetworkingSearchQuery.objects.only('id', 'results').iterator(chunk_size=BATCH_SIZE):
+        search.result_count, search.top_names = summarize_results(search.results)
+        batch.append(search)
+        if len(batch) == BATCH_SIZE:
+            NetworkingSearchQuery.objects.bulk_update(batch, ['result_count', 'top_names'])
+            batch = []
+    NetworkingSearchQuery.objects.bulk_update(batch, ['result_count', 'top_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('networking', '0003_alter_eventtype_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkingsearchquery',
+            name='result_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='networkingsearchquery',
+            name='top_names',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(summarize, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from network.models import NetworkContact
+from utils.ai.summary import summarize_results
 
 # Create your models here.
 
@@ -11,10 +12,17 @@ class NetworkingSearchQuery(models.Model):
     city = models.CharField(max_length=100)
     radius = models.IntegerField()
     results = models.JSONField(null=True, blank=True)
+    # Kept in step with results on save, so history lists can defer results
+    result_count = models.PositiveIntegerField(default=0)
+    top_names = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+    
+    def save(self, *args, **kwargs):
+        self.result_count, self.top_names = summarize_results(self.results)
+        super().save(*args, **kwargs)
         
     def __str__(self):
         return f"Networking search near {self.city}, {self.state} ({self.radius} miles)"
@@ -8,8 +8,15 @@ logger = logging.getLogger(__name__)
 class NetworkingSearchQuerySerializer(serializers.ModelSerializer):
     class Meta:
         model = NetworkingSearchQuery
-        fields = ['id', 'state', 'city', 'radius', 'results', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'state', 'city', 'radius', 'results', 'result_count', 'top_names', 'created_at']
+        read_only_fields = ['id', 'result_count', 'top_names', 'created_at']
+
+class NetworkingSearchSummarySerializer(serializers.ModelSerializer):
+    """Search history entry without the results, for list views"""
+    class Meta:
+        model = NetworkingSearchQuery
+        fields = ['id', 'state', 'city', 'radius', 'result_count', 'top_names', 'created_at']
+        read_only_fields = fields
 
 class EventTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -2,6 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     NetworkingDiscoveryView, 
+    NetworkingDiscoveryStreamView,
+    NetworkingSearchDetailView,
     EventViewSet, 
     EventTypeViewSet, 
     OpportunityViewSet,
@@ -16,5 +18,7 @@ router.register(r'milestones', MilestoneViewSet, basename='milestone')
 
 urlpatterns = [
     path('opportunities-search/', NetworkingDiscoveryView.as_view(), name='networking-opportunities-search'),
+    path('opportunities-search/<int:pk>/', NetworkingSearchDetailView.as_view(), name='networking-search-detail'),
+    path('opportunities-search/stream/', NetworkingDiscoveryStreamView.as_view(), name='networking-opportunities-search-stream'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
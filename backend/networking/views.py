@@ -7,6 +7,7 @@ from rest_framework.decorators import action
 from .models import NetworkingSearchQuery, Event, EventType, EventAttendee, Opportunity, Milestone
 from .serializers import (
     NetworkingSearchQuerySerializer, 
+    NetworkingSearchSummarySerializer,
     EventSerializer,
     EventTypeSerializer,
     EventAttendeeSerializer,
@@ -14,7 +15,10 @@ from .serializers import (
     MilestoneSerializer
 )
 from network.models import NetworkContact
-from utils.ai.openai_client import discover_networking
+from utils.ai.openai_client import discover_networking, networking_discovery_messages
+from utils.ai.streaming import discovery_event_stream, sse_response
+from utils.throttling import AIDiscoveryThrottle
+from utils.ai.cache import cached_discovery, wants_refresh
 from django.db.models import Q, Value
 from django.db import models
 import logging
@@ -25,6 +29,7 @@ logger = logging.getLogger(__name__)
 
 class NetworkingDiscoveryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIDiscoveryThrottle]
     
     def post(self, request):
         state = request.data.get('state')
@@ -37,8 +42,12 @@ class NetworkingDiscoveryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        # Call OpenAI API for networking suggestions
-        opportunities = discover_networking(state, city, radius)
+        # Call OpenAI API for networking suggestions, reusing a recent search for the same area
+        opportunities, cache_hit = cached_discovery(
+            'networking', state, city, radius,
+            lambda bucket_radius: discover_networking(state, city, bucket_radius),
+            refresh=wants_refresh(request.data.get('refresh')),
+        )
         
         # Save the search query and results
         search_query = NetworkingSearchQuery.objects.create(
@@ -50,14 +59,57 @@ class NetworkingDiscoveryView(APIView):
         )
         
         serializer = NetworkingSearchQuerySerializer(search_query)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({**serializer.data, 'cache_hit': cache_hit}, status=status.HTTP_201_CREATED)
         
     def get(self, request):
-        """Get user's previous networking searches"""
-        searches = NetworkingSearchQuery.objects.filter(user=request.user)
-        serializer = NetworkingSearchQuerySerializer(searches, many=True)
+        """Get user's previous networking searches, summarized; see NetworkingSearchDetailView"""
+        searches = NetworkingSearchQuery.objects.filter(user=request.user).defer('results')
+        serializer = NetworkingSearchSummarySerializer(searches, many=True)
         return Response(serializer.data)
 
+class NetworkingSearchDetailView(APIView):
+    """A previous networking search with its full results"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        search_query = get_object_or_404(NetworkingSearchQuery, pk=pk, user=request.user)
+        return Response(NetworkingSearchQuerySerializer(search_query).data)
+
+class NetworkingDiscoveryStreamView(APIView):
+    """
+    Networking opportunity search with results streamed as Server-Sent Events.
+    Each opportunity is sent as an `opportunity` event as soon as it is complete.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIDiscoveryThrottle]
+    
+    def post(self, request):
+        state = request.data.get('state')
+        city = request.data.get('city')
+        radius = request.data.get('radius')
+        
+        if not all([state, city, radius]):
+            return Response(
+                {"error": "State, city, and radius are required"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        def persist(opportunities):
+            return NetworkingSearchQuery.objects.create(
+                user=request.user,
+                state=state,
+                city=city,
+                radius=radius,
+                results=opportunities
+            )
+        
+        events = discovery_event_stream(
+            'networking', state, city, radius,
+            networking_discovery_messages, 'opportunity', persist,
+            refresh=wants_refresh(request.data.get('refresh'))
+        )
+        return sse_response(request, events)
+
 class EventViewSet(viewsets.ModelViewSet):
     """API endpoint for managing networking events"""
     serializer_class = EventSerializer
@@ -0,0 +1,97 @@
+"""
+Cached per-user artist profile context.
+
+Profile reads, outreach emails and discovery ranking all need the same
+things about an artist: the serialized profile with its social links, the
+values outreach emails are filled with, and the block of text that
+describes the artist in a model prompt. They are built together from two
+queries and kept in the Django cache per user, so repeated reads cost no
+queries. Saving or deleting an ArtistProfile or SocialLink drops the user's
+entry (see signals.py); queryset update() and bulk_create() bypass those
+signals, so code that uses them must call invalidate_profile_context().
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ArtistProfile
+from .serializers import ArtistProfileSerializer
+
+DEFAULT_BIO = "I'm an artist looking to perform at your venue."
+DEFAULT_GENRES = "various genres"
+
+KEY_PREFIX = 'profiles:context'
+
+
+def profile_context_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def _artist_values(profile_data, username):
+    """What outreach emails say about the artist; the account email is added by the caller"""
+    if profile_data is None:
+        return {
+            'artist_name': username,
+            'bio': DEFAULT_BIO,
+            'genres': DEFAULT_GENRES,
+            'phone_number': '',
+            'social_links': [],
+        }
+    return {
+        'artist_name': profile_data['artist_name'] or username,
+        'bio': profile_data['bio'] or DEFAULT_BIO,
+        'genres': ", ".join(profile_data['genres']) if profile_data['genres'] else DEFAULT_GENRES,
+        'phone_number': profile_data['phone_number'] or '',
+        'social_links': [[link['label'], link['url']] for link in profile_data['social_links']],
+    }
+
+
+def render_prompt_block(artist):
+    """The artist described for a model prompt"""
+    lines = [
+        f"Artist Name: {artist['artist_name']}",
+        f"Music Genres: {artist['genres']}",
+        f"Bio: {artist['bio']}",
+    ]
+    if artist['phone_number']:
+        lines.append(f"Phone Number: {artist['phone_number']}")
+    if artist['social_links']:
+        lines.append("Social Media Links:")
+        lines.extend(f"- {label}: {url}" for label, url in artist['social_links'])
+    return '\n'.join(lines)
+
+
+def build_profile_context(user):
+    """
+    Build a user's profile context from the database.
+
+    Returns:
+        dict: `profile` (ArtistProfileSerializer data, or None if the user has
+              no profile), `artist` (email template values) and `prompt`
+              (the rendered prompt block)
+    """
+    profile = ArtistProfile.objects.filter(user=user).prefetch_related('social_links').first()
+    profile_data = dict(ArtistProfileSerializer(profile).data) if profile is not None else None
+    artist = _artist_values(profile_data, user.username)
+    return {
+        'profile': profile_data,
+        'artist': artist,
+        'prompt': render_prompt_block(artist),
+    }
+
+
+def get_profile_context(user):
+    """The user's profile context, from the cache when possible"""
+    key = profile_context_key(user.pk)
+    context = cache.get(key)
+    if context is None:
+        context = build_profile_context(user)
+        cache.set(key, context, settings.PROFILE_CONTEXT_CACHE_TTL)
+    return context
+
+
+aget_profile_context = sync_to_async(get_profile_context)
+
+
+def invalidate_profile_context(user_id):
+    cache.delete(profile_context_key(user_id))
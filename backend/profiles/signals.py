@@ -0,0 +1,24 @@
+"""
+Drop a user's cached profile context (see context.py) whenever their
+profile or one of its social links changes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .context import invalidate_profile_context
+from .models import ArtistProfile, SocialLink
+
+
+@receiver([post_save, post_delete], sender=ArtistProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_profile_context(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=SocialLink)
+def social_link_changed(sender, instance, **kwargs):
+    if SocialLink.profile.is_cached(instance):
+        user_id = instance.profile.user_id
+    else:
+        user_id = ArtistProfile.objects.filter(id=instance.profile_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_profile_context(user_id)
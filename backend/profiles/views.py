@@ -2,6 +2,7 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from .context import get_profile_context
 from .models import ArtistProfile, SocialLink
 from .serializers import ArtistProfileSerializer, SocialLinkSerializer
 
@@ -20,6 +21,14 @@ class ArtistProfileViewSet(viewsets.ModelViewSet):
         profile, created = ArtistProfile.objects.get_or_create(user=self.request.user)
         return profile
     
+    def retrieve(self, request, *args, **kwargs):
+        # Reads come from the cached profile context; only a user without a
+        # profile yet goes through get_object, which creates it
+        profile = get_profile_context(request.user)['profile']
+        if profile is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(profile)
+    
     # Override list to return only the user's profile
     def list(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
@@ -58,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utils.ai.telemetry.AICallContextMiddleware',
 ]
 
 ROOT_URLCONF = 'urls'
@@ -128,6 +129,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Background task settings
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 4))
+
+# HLS streaming settings for audio playback
+AUDIO_HLS_SEGMENT_SECONDS = float(os.environ.get('AUDIO_HLS_SEGMENT_SECONDS', 6))
+AUDIO_HLS_BITRATES = os.environ.get('AUDIO_HLS_BITRATES', '64k,128k').split(',')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -173,6 +181,22 @@ else:
         },
     }
 
+# Cache configuration (shared between workers when Redis is available)
+if os.environ.get('USE_REDIS', 'False') == 'True' or not DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 2000},
+        },
+    }
+
 # Configure logging for channels
 LOGGING = {
     'version': 1,
@@ -261,6 +285,113 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4-turbo-preview')
 OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS', 2000))
 OPENAI_TEMPERATURE = float(os.environ.get('OPENAI_TEMPERATURE', 0.5))
+# Point the shared clients at an OpenAI-compatible server instead of api.openai.com,
+# e.g. the local stub from `python manage.py openai_stub_server` (http://127.0.0.1:8001/v1)
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
+# Shared OpenAI HTTP client settings (timeouts in seconds)
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 60))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 2))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 60))
+
+# Resilience around OpenAI calls (utils/ai/resilience.py). Failed attempts are
+# retried with jittered exponential backoff (seconds), or after the API's
+# Retry-After; waits longer than OPENAI_RETRY_MAX_WAIT give up instead.
+OPENAI_RETRY_BACKOFF_BASE = float(os.environ.get('OPENAI_RETRY_BACKOFF_BASE', 0.5))
+OPENAI_RETRY_BACKOFF_MAX = float(os.environ.get('OPENAI_RETRY_BACKOFF_MAX', 8))
+OPENAI_RETRY_MAX_WAIT = float(os.environ.get('OPENAI_RETRY_MAX_WAIT', 20))
+# Consecutive upstream failures that open the circuit, and how long it stays open
+OPENAI_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('OPENAI_BREAKER_FAILURE_THRESHOLD', 5))
+OPENAI_BREAKER_RESET_TIMEOUT = float(os.environ.get('OPENAI_BREAKER_RESET_TIMEOUT', 30))
+# Account limits per worker (0 disables), and the longest a call waits for capacity
+OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get('OPENAI_REQUESTS_PER_MINUTE', 500))
+OPENAI_TOKENS_PER_MINUTE = int(os.environ.get('OPENAI_TOKENS_PER_MINUTE', 200000))
+OPENAI_LIMITER_MAX_WAIT = float(os.environ.get('OPENAI_LIMITER_MAX_WAIT', 10))
+
+# AI discovery result cache
+AI_DISCOVERY_CACHE_TTL = int(os.environ.get('AI_DISCOVERY_CACHE_TTL', 60 * 60 * 24))
+AI_DISCOVERY_CACHE_MAX_ENTRIES = int(os.environ.get('AI_DISCOVERY_CACHE_MAX_ENTRIES', 500))
+# How long identical requests wait on an in-flight call before calling upstream themselves
+AI_SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('AI_SINGLE_FLIGHT_TIMEOUT', OPENAI_TIMEOUT + 30))
+
+# Multi-city batch discovery: stops discovered at once, model calls per minute
+# across all batch jobs in a worker (0 for no limit), and the largest batch accepted
+AI_BATCH_CONCURRENCY = int(os.environ.get('AI_BATCH_CONCURRENCY', 4))
+AI_BATCH_REQUESTS_PER_MINUTE = int(os.environ.get('AI_BATCH_REQUESTS_PER_MINUTE', 60))
+AI_BATCH_MAX_STOPS = int(os.environ.get('AI_BATCH_MAX_STOPS', 25))
+
+# Tiled wide-radius discovery: the radius (miles) each tile searches, the most
+# tiles one search is split into, and how many tiles are discovered at once
+AI_TILE_RADIUS = int(os.environ.get('AI_TILE_RADIUS', 25))
+AI_TILE_MAX_TILES = int(os.environ.get('AI_TILE_MAX_TILES', 8))
+AI_TILE_CONCURRENCY = int(os.environ.get('AI_TILE_CONCURRENCY', 8))
+
+# ZIP centroid table used to place venues (utils/geo.py): the Census ZCTA
+# gazetteer file, or a zip,lat,lon CSV. Without it venues are placed by city.
+GEO_ZIP_CENTROIDS_PATH = os.environ.get(
+    'GEO_ZIP_CENTROIDS_PATH', str(Path(__file__).resolve().parent / 'utils' / 'data' / 'us_zip_centroids.csv')
+)
+# Largest radius (miles) accepted by `?near=` venue queries
+VENUE_NEAR_MAX_RADIUS = int(os.environ.get('VENUE_NEAR_MAX_RADIUS', 500))
+# Seconds a user's grouped venue facet counts (api/venues/facets.py) are kept;
+# they are also dropped whenever one of the user's venues or states changes
+VENUE_FACETS_CACHE_TTL = int(os.environ.get('VENUE_FACETS_CACHE_TTL', 60 * 10))
+
+# Per-user throttling of expensive endpoints (utils/throttling.py), counted over a
+# sliding window in the shared cache. Rates are "<requests>/<second|minute|hour|day>"
+# per scope and tier, overridable with THROTTLE_RATE_<SCOPE>_<TIER>; an empty rate
+# means no limit. Users in a group named after a tier get its rates (the first
+# listed tier wins), everyone else gets 'default'.
+THROTTLE_TIERS = ['pro']
+THROTTLE_EXEMPT_STAFF = os.environ.get('THROTTLE_EXEMPT_STAFF', 'True') == 'True'
+THROTTLE_RATES = {
+    scope: {
+        tier: os.environ.get(f'THROTTLE_RATE_{scope}_{tier}'.upper(), rate)
+        for tier, rate in rates.items()
+    }
+    for scope, rates in {
+        'ai_discovery': {'default': '30/hour', 'pro': '150/hour'},
+        'email_generation': {'default': '60/hour', 'pro': '300/hour'},
+        'audio_edit': {'default': '60/hour', 'pro': '300/hour'},
+        'audio_upload': {'default': '20/hour', 'pro': '100/hour'},
+    }.items()
+}
+
+# Seconds a user's cached profile context (profiles/context.py) is kept; it is
+# also dropped whenever the profile or one of its social links is saved
+PROFILE_CONTEXT_CACHE_TTL = int(os.environ.get('PROFILE_CONTEXT_CACHE_TTL', 60 * 60 * 24))
+
+# Mail-merge outreach: emails polished by the model at once, and the most
+# venues one batch request may name
+EMAIL_BATCH_CONCURRENCY = int(os.environ.get('EMAIL_BATCH_CONCURRENCY', 5))
+EMAIL_BATCH_MAX_VENUES = int(os.environ.get('EMAIL_BATCH_MAX_VENUES', 100))
+
+# Discovery cache warming (`python manage.py warm_discovery_cache`): how many of
+# the most searched locations over the lookback window are kept warm, how close
+# to expiry (seconds) an entry is refreshed, and the daily token budget for it
+AI_CACHE_WARM_TOP_N = int(os.environ.get('AI_CACHE_WARM_TOP_N', 30))
+AI_CACHE_WARM_LOOKBACK_DAYS = int(os.environ.get('AI_CACHE_WARM_LOOKBACK_DAYS', 14))
+AI_CACHE_WARM_REFRESH_WITHIN = int(os.environ.get('AI_CACHE_WARM_REFRESH_WITHIN', 60 * 60 * 6))
+AI_CACHE_WARM_DAILY_TOKENS = int(os.environ.get('AI_CACHE_WARM_DAILY_TOKENS', 150000))
+AI_CACHE_WARM_INTERVAL = int(os.environ.get('AI_CACHE_WARM_INTERVAL', 60 * 60))
+
+# Days raw model responses (VenueSearch.raw_response) are kept before
+# `python manage.py prune_ai_raw_responses` blanks them; 0 keeps them forever
+AI_RAW_RESPONSE_RETENTION_DAYS = int(os.environ.get('AI_RAW_RESPONSE_RETENTION_DAYS', 30))
+
+# AI call telemetry (see `python manage.py ai_usage_report`)
+AI_TELEMETRY_ENABLED = os.environ.get('AI_TELEMETRY_ENABLED', 'True') == 'True'
+# USD per million (prompt, completion) tokens, used to estimate cost in usage reports
+AI_MODEL_PRICING = {
+    'gpt-4-turbo-preview': (10.00, 30.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
 
 # Email Configuration
 if DEBUG:
@@ -26,6 +26,9 @@ urlpatterns = [
     path('api/ai/searches/<str:search_id>/', ai_views.get_search_results, name='search_results'),
     path('api/ai/searches/<str:search_id>/import/', ai_views.import_venues, name='import_venues'),
     path('api/ai/searches/<str:search_id>/import-opportunities/', ai_views.import_opportunities, name='import_opportunities'),
+    path('api/ai/client-stats/', ai_views.get_client_stats, name='ai_client_stats'),
+    path('api/ai/usage/', ai_views.get_usage_summary, name='ai_usage'),
+    path('api/ai/throttles/', ai_views.get_throttle_stats, name='ai_throttle_stats'),
     
     # New features
     path('api/network/', include('network.urls')),
@@ -1,6 +1,9 @@
-# Import the patch early to ensure it's applied before any OpenAI client is created
-from .openai_patch import *
-
-# Now import regular modules
+from .client import *
+from .telemetry import *
+from .cache import *
+from .singleflight import *
+from .ratelimit import *
+from .resilience import *
+from .summary import *
 from .openai_client import *
-from .templates import * 
\ No newline at end of file
+from .templates import *
\ No newline at end of file
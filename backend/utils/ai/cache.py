@@ -0,0 +1,218 @@
+"""
+Shared cache for AI discovery results.
+
+Discovery prompts depend only on the location and the kind of search, so the
+same "Atlanta, GA, 25 miles" search from different users can be answered from
+one model call. Results are stored in the Django cache under a key built from
+the normalized state, city, radius bucket and search type, with a TTL and a
+size bound enforced by a small LRU index kept alongside the entries.
+"""
+import hashlib
+import logging
+import re
+import time
+from django.conf import settings
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from .singleflight import single_flight, async_single_flight
+from .telemetry import discovery_cache_status, record_ai_call, arecord_ai_call
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'RADIUS_BUCKETS', 'normalize_state', 'normalize_city', 'radius_bucket',
+    'discovery_cache_key', 'get_cached_discovery', 'set_cached_discovery',
+    'discovery_cache_expiry', 'cached_discovery', 'acached_discovery', 'wants_refresh',
+]
+
+KEY_PREFIX = 'ai:discovery'
+LRU_INDEX_KEY = f'{KEY_PREFIX}:lru'
+
+# Radii are rounded up to one of these so 20 and 25 miles share an entry
+RADIUS_BUCKETS = (5, 10, 25, 50, 100, 250)
+
+US_STATES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL',
+    'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA',
+    'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV',
+    'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY',
+    'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR',
+    'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD',
+    'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+    'washington': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+}
+
+
+def _clean(value):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    value = re.sub(r'[^\w\s]', ' ', str(value or '').casefold())
+    return ' '.join(value.split())
+
+
+def normalize_state(state):
+    """Normalize a state name or abbreviation to its two-letter code where known"""
+    cleaned = _clean(state)
+    if cleaned in US_STATES:
+        return US_STATES[cleaned]
+    return cleaned.upper()
+
+
+def normalize_city(city):
+    """Normalize a city name, treating "St." and "Saint" alike"""
+    cleaned = _clean(city)
+    return re.sub(r'\bst\b', 'saint', cleaned)
+
+
+def radius_bucket(radius):
+    """Round a radius in miles up to the nearest bucket"""
+    try:
+        radius = int(radius)
+    except (TypeError, ValueError):
+        radius = RADIUS_BUCKETS[0]
+    for bucket in RADIUS_BUCKETS:
+        if radius <= bucket:
+            return bucket
+    return RADIUS_BUCKETS[-1]
+
+
+def discovery_cache_key(search_type, state, city, radius):
+    """Build the cache key for a discovery search"""
+    normalized = f"{search_type}|{normalize_state(state)}|{normalize_city(city)}|{radius_bucket(radius)}"
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{search_type}:{digest}"
+
+
+def _touch(key, evict=True):
+    """
+    Move a key to the most-recent end of the LRU index and evict the oldest
+    entries beyond AI_DISCOVERY_CACHE_MAX_ENTRIES.
+
+    The index lives in the same cache as the entries. Concurrent updates from
+    different workers can drop an index write, which only makes eviction
+    slightly less exact; every entry still expires through its TTL.
+    """
+    index = cache.get(LRU_INDEX_KEY) or []
+    if key in index:
+        index.remove(key)
+    index.append(key)
+
+    evicted = []
+    max_entries = settings.AI_DISCOVERY_CACHE_MAX_ENTRIES
+    if evict and len(index) > max_entries:
+        evicted, index = index[:-max_entries], index[-max_entries:]
+        cache.delete_many(evicted + [f"{evicted_key}:expires" for evicted_key in evicted])
+        logger.info(f"Evicted {len(evicted)} discovery cache entries")
+
+    cache.set(LRU_INDEX_KEY, index, None)
+
+
+def get_cached_discovery(key):
+    """Return the cached value for a discovery key, or None on a miss"""
+    value = cache.get(key)
+    if value is not None:
+        _touch(key, evict=False)
+    return value
+
+
+def set_cached_discovery(key, value):
+    """Store a discovery result for AI_DISCOVERY_CACHE_TTL seconds"""
+    ttl = settings.AI_DISCOVERY_CACHE_TTL
+    cache.set_many({key: value, f"{key}:expires": time.time() + ttl}, ttl)
+    _touch(key)
+
+
+def discovery_cache_expiry(key):
+    """
+    Return when a cached discovery entry expires, as a Unix timestamp.
+
+    Returns None if the entry is missing or was stored without an expiry.
+    """
+    found = cache.get_many([key, f"{key}:expires"])
+    if key not in found:
+        return None
+    return found.get(f"{key}:expires")
+
+
+def cached_discovery(search_type, state, city, radius, compute, refresh=False):
+    """
+    Return discovery results from the cache, computing them on a miss.
+
+    Args:
+        search_type (str): Kind of search, e.g. 'venue' or 'networking'
+        state (str): State name or abbreviation
+        city (str): City name
+        radius (int): Requested radius in miles
+        compute (callable): Called with the bucketed radius on a miss; concurrent
+            misses for the same key are coalesced into one call
+        refresh (bool): Skip the cache lookup and overwrite the entry
+
+    Returns:
+        tuple: (results, cache_hit)
+    """
+    key = discovery_cache_key(search_type, state, city, radius)
+    if not refresh:
+        cached = get_cached_discovery(key)
+        if cached is not None:
+            logger.info(f"Discovery cache hit for {search_type} search near {city}, {state}")
+            record_ai_call(cache_status='hit')
+            return cached, True
+
+    computed = []
+
+    def compute_and_store():
+        computed.append(True)
+        with discovery_cache_status('refresh' if refresh else 'miss'):
+            results = compute(radius_bucket(radius))
+        # Empty results usually mean the call failed, so don't pin them in the cache
+        if results:
+            set_cached_discovery(key, results)
+        return results
+
+    # Identical searches already waiting on the model share that one call
+    results = single_flight(key, compute_and_store)
+    if not computed:
+        record_ai_call(cache_status='coalesced')
+    return results, False
+
+
+async def acached_discovery(search_type, state, city, radius, compute, refresh=False):
+    """
+    Async version of cached_discovery for async views.
+
+    compute is a coroutine function taking the bucketed radius.
+
+    Returns:
+        tuple: (results, cache_hit)
+    """
+    key = discovery_cache_key(search_type, state, city, radius)
+    if not refresh:
+        cached = await sync_to_async(get_cached_discovery)(key)
+        if cached is not None:
+            logger.info(f"Discovery cache hit for {search_type} search near {city}, {state}")
+            await arecord_ai_call(cache_status='hit')
+            return cached, True
+
+    computed = []
+
+    async def compute_and_store():
+        computed.append(True)
+        with discovery_cache_status('refresh' if refresh else 'miss'):
+            results = await compute(radius_bucket(radius))
+        if results:
+            await sync_to_async(set_cached_discovery)(key, results)
+        return results
+
+    results = await async_single_flight(key, compute_and_store)
+    if not computed:
+        await arecord_ai_call(cache_status='coalesced')
+    return results, False
+
+
+def wants_refresh(value):
+    """Interpret a request's `refresh` flag, which may arrive as a string"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
@@ -0,0 +1,153 @@
+"""
+Process-wide OpenAI clients.
+
+Every AI call in the project goes through the clients returned here instead
+of building its own OpenAI(...) instance. Both clients sit on a pooled,
+keep-alive httpx transport, so repeated calls reuse the same TLS connection
+to the API rather than paying for a new handshake each time. The SDK's
+built-in retries are off; utils.ai.resilience retries instead.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import weakref
+import httpx
+from django.conf import settings
+from openai import OpenAI, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['get_openai_client', 'get_async_openai_client', 'get_connection_stats']
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+# Set by utils.ai.telemetry around a call to count the HTTP attempts it made
+attempt_counter = contextvars.ContextVar('openai_attempt_counter', default=None)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'connections_opened': 0,
+}
+
+
+def _record(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _trace(event_name, info):
+    """httpcore trace hook: count requests sent and new TCP connections opened"""
+    if event_name == 'connection.connect_tcp.complete':
+        _record('connections_opened')
+    elif event_name in ('http11.send_request_headers.started', 'http2.send_request_headers.started'):
+        _record('requests')
+
+
+async def _async_trace(event_name, info):
+    _trace(event_name, info)
+
+
+def _count_attempt():
+    counter = attempt_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def _attach_trace(request):
+    _count_attempt()
+    request.extensions['trace'] = _trace
+
+
+async def _attach_async_trace(request):
+    _count_attempt()
+    request.extensions['trace'] = _async_trace
+
+
+def _timeout():
+    return httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_openai_client():
+    """
+    Return the shared synchronous OpenAI client, creating it on first use.
+
+    The client is thread-safe and is meant to be reused for the lifetime of
+    the process.
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                http_client = httpx.Client(
+                    timeout=_timeout(),
+                    limits=_limits(),
+                    event_hooks={'request': [_attach_trace]},
+                )
+                _sync_client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL,
+                    timeout=_timeout(),
+                    max_retries=0,
+                    http_client=http_client,
+                )
+                logger.info("Initialized shared OpenAI client")
+    return _sync_client
+
+
+def get_async_openai_client():
+    """
+    Return the shared AsyncOpenAI client for the running event loop.
+
+    httpx async connections are bound to the loop that opened them, so one
+    client is kept per loop. Under daphne that is a single client for the
+    whole process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            timeout=_timeout(),
+            limits=_limits(),
+            event_hooks={'request': [_attach_async_trace]},
+        )
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=http_client,
+        )
+        _async_clients[loop] = client
+        logger.info("Initialized shared AsyncOpenAI client")
+    return client
+
+
+def get_connection_stats():
+    """
+    Return connection reuse counters for the shared clients.
+
+    Returns:
+        dict: Requests sent, connections opened, reused requests and reuse ratio
+    """
+    with _stats_lock:
+        requests = _stats['requests']
+        opened = _stats['connections_opened']
+    reused = max(requests - opened, 0)
+    return {
+        'requests': requests,
+        'connections_opened': opened,
+        'connections_reused': reused,
+        'reuse_ratio': round(reused / requests, 3) if requests else 0.0,
+    }
@@ -1,81 +1,125 @@
 import json
 import logging
 from django.conf import settings
-from openai import OpenAI
+from .telemetry import create_chat_completion, acreate_chat_completion, astream_chat_completion
+from .resilience import AIUnavailable
 from .templates import VENUE_DISCOVERY_PROMPT, NETWORKING_OPPORTUNITIES_PROMPT
 
 logger = logging.getLogger(__name__)
 
-def get_openai_client():
+def venue_discovery_messages(state, city, radius):
+    """Build the chat messages for a venue discovery search"""
+    return [
+        {"role": "system", "content": "You are a venue discovery assistant."},
+        {"role": "user", "content": VENUE_DISCOVERY_PROMPT.format(state=state, city=city, radius=radius)}
+    ]
+
+def networking_discovery_messages(state, city, radius):
+    """Build the chat messages for a networking opportunity search"""
+    return [
+        {"role": "system", "content": "You are a networking opportunity discovery assistant."},
+        {"role": "user", "content": NETWORKING_OPPORTUNITIES_PROMPT.format(state=state, city=city, radius=radius)}
+    ]
+
+async def astream_completion(messages, max_tokens=None):
     """
-    Safely initialize and return an OpenAI client, filtering out any unexpected parameters.
-    This helps avoid issues with proxy settings or other environment variables affecting initialization.
+    Request a streamed completion and yield its text as it arrives. It is
+    async because under ASGI Django buffers synchronous iterators, so only an
+    async one lets a StreamingHttpResponse send each piece as it arrives.
+    
+    Args:
+        messages (list): Chat messages to send
+        max_tokens (int): Completion budget; defaults to OPENAI_MAX_TOKENS
+        
+    Yields:
+        str: Pieces of the completion text
     """
+    stream = astream_chat_completion(
+        model=settings.OPENAI_MODEL,
+        messages=messages,
+        max_tokens=max_tokens or settings.OPENAI_MAX_TOKENS,
+        temperature=settings.OPENAI_TEMPERATURE
+    )
     try:
-        # Only pass the API key to avoid any issues with proxies or other parameters
-        return OpenAI(api_key=settings.OPENAI_API_KEY)
-    except Exception as e:
-        logger.error(f"Error initializing OpenAI client: {str(e)}")
-        # As a fallback, try with an empty init and set api_key afterward
-        try:
-            client = OpenAI()
-            client.api_key = settings.OPENAI_API_KEY
-            return client
-        except Exception as e2:
-            logger.error(f"Fallback OpenAI client initialization also failed: {str(e2)}")
-            raise
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.aclose()
 
-def discover_venues(state, city, radius):
+def parse_json_array(content):
     """
-    Use OpenAI to discover venues near a location.
+    Extract the JSON array from a completion's text.
     
-    Args:
-        state (str): State name
-        city (str): City name
-        radius (int): Search radius in miles
-        
     Returns:
-        list: List of venue dictionaries
+        list: The parsed array, or [] if none could be found
+    """
+    json_start = content.find('[')
+    json_end = content.rfind(']') + 1
+    
+    if json_start >= 0 and json_end > 0:
+        return json.loads(content[json_start:json_end])
+    
+    # Fallback if no JSON found
+    logger.error(f"No JSON array found in response: {content}")
+    return []
+
+def _discover(messages):
+    """
+    Run a discovery prompt and return its parsed results, or [] on failure.
+
+    AIUnavailable is passed on, so an outage isn't mistaken for an empty search.
     """
     try:
-        # Format the prompt with location data
-        formatted_prompt = VENUE_DISCOVERY_PROMPT.format(
-            state=state,
-            city=city,
-            radius=radius
+        # Call OpenAI API through the shared client
+        response = create_chat_completion(
+            model=settings.OPENAI_MODEL,
+            messages=messages,
+            max_tokens=settings.OPENAI_MAX_TOKENS,
+            temperature=settings.OPENAI_TEMPERATURE
         )
-        
-        # Call OpenAI API - only pass API key
-        client = get_openai_client()
-        response = client.chat.completions.create(
+        return parse_json_array(response.choices[0].message.content)
+    except AIUnavailable:
+        # Let the view answer 503 instead of reporting "no results"
+        raise
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API: {str(e)}")
+        return []
+
+async def _adiscover(messages):
+    """Async version of _discover, for use from async views"""
+    try:
+        response = await acreate_chat_completion(
             model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a venue discovery assistant."},
-                {"role": "user", "content": formatted_prompt}
-            ],
+            messages=messages,
             max_tokens=settings.OPENAI_MAX_TOKENS,
             temperature=settings.OPENAI_TEMPERATURE
         )
-        
-        # Extract JSON data from response
-        content = response.choices[0].message.content
-        # Find JSON array in the response
-        json_start = content.find('[')
-        json_end = content.rfind(']') + 1
-        
-        if json_start >= 0 and json_end > 0:
-            json_str = content[json_start:json_end]
-            venues = json.loads(json_str)
-            return venues
-        else:
-            # Fallback if no JSON found
-            logger.error(f"No JSON array found in response: {content}")
-            return []
-            
+        return parse_json_array(response.choices[0].message.content)
+    except AIUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error calling OpenAI API: {str(e)}")
         return []
 
+def discover_venues(state, city, radius):
+    """
+    Use OpenAI to discover venues near a location.
+    
+    Args:
+        state (str): State name
+        city (str): City name
+        radius (int): Search radius in miles
+        
+    Returns:
+        list: List of venue dictionaries
+    """
+    return _discover(venue_discovery_messages(state, city, radius))
+
+async def adiscover_venues(state, city, radius):
+    """Async version of discover_venues"""
+    return await _adiscover(venue_discovery_messages(state, city, radius))
+
 def discover_networking(state, city, radius):
     """
     Use OpenAI to discover networking opportunities near a location.
@@ -88,41 +132,8 @@ def discover_networking(state, city, radius):
     Returns:
         list: List of networking opportunity dictionaries
     """
-    try:
-        # Format the prompt with location data
-        formatted_prompt = NETWORKING_OPPORTUNITIES_PROMPT.format(
-            state=state,
-            city=city,
-            radius=radius
-        )
-        
-        # Call OpenAI API - only pass API key
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a networking opportunity discovery assistant."},
-                {"role": "user", "content": formatted_prompt}
-            ],
-            max_tokens=settings.OPENAI_MAX_TOKENS,
-            temperature=settings.OPENAI_TEMPERATURE
-        )
-        
-        # Extract JSON data from response
-        content = response.choices[0].message.content
-        # Find JSON array in the response
-        json_start = content.find('[')
-        json_end = content.rfind(']') + 1
-        
-        if json_start >= 0 and json_end > 0:
-            json_str = content[json_start:json_end]
-            opportunities = json.loads(json_str)
-            return opportunities
-        else:
-            # Fallback if no JSON found
-            logger.error(f"No JSON array found in response: {content}")
-            return []
-            
-    except Exception as e:
-        logger.error(f"Error calling OpenAI API: {str(e)}")
-        return [] 
\ No newline at end of file
+    return _discover(networking_discovery_messages(state, city, radius))
+
+async def adiscover_networking(state, city, radius):
+    """Async version of discover_networking"""
+    return await _adiscover(networking_discovery_messages(state, city, radius))
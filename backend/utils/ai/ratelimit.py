@@ -0,0 +1,83 @@
+"""
+Request-rate limiting for AI calls.
+
+A token bucket refills at a steady rate and holds at most `capacity`
+tokens. Callers reserve tokens and then sleep for whatever wait the
+reservation returned, so the lock is never held while waiting and the same
+bucket can be shared by threads and by coroutines on different event loops.
+"""
+import asyncio
+import threading
+import time
+
+__all__ = ['TokenBucket', 'per_minute']
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Largest burst allowed; defaults to one second's worth
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        Take tokens from the bucket, going into debt if it is empty.
+
+        Args:
+            tokens (float): Tokens to take
+            max_wait (float): If the wait would be longer than this, take
+                nothing and return None
+
+        Returns:
+            float: Seconds the caller must wait before using its tokens
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(tokens - self._tokens, 0) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def refund(self, tokens=1):
+        """Give back tokens from a reservation that won't be used"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens=1):
+        """Block until the tokens are available"""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens=1):
+        """Wait on the event loop until the tokens are available"""
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def per_minute(limit):
+    """
+    Build a bucket allowing `limit` calls per minute.
+
+    A burst of up to a tenth of the limit is allowed, so short batches don't
+    wait needlessly while the per-minute rate still holds.
+    """
+    return TokenBucket(limit / 60.0, capacity=max(1, limit // 10))
@@ -0,0 +1,321 @@
+"""
+Retries, circuit breaking and account-wide rate limiting for OpenAI calls.
+
+Every completion made through utils.ai.telemetry goes through call() or
+acall() here, which wrap a single upstream request in three layers:
+
+- An account limiter: two token buckets sized to the account's requests and
+  tokens per minute (OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE).
+  Calls wait for capacity, but never longer than OPENAI_LIMITER_MAX_WAIT.
+- A circuit breaker: after OPENAI_BREAKER_FAILURE_THRESHOLD consecutive
+  timeouts, connection errors or 5xx responses, calls fail at once for
+  OPENAI_BREAKER_RESET_TIMEOUT seconds. Then one trial call is let through,
+  and its outcome closes or reopens the circuit.
+- Retries: timeouts, connection errors, 429s and 5xx responses are retried up
+  to OPENAI_MAX_RETRIES times with jittered exponential backoff. A
+  Retry-After header from the API takes precedence over the backoff.
+
+When a call can't be made or keeps failing, AIUnavailable is raised. It is a
+DRF APIException, so views that let it through answer 503 with Retry-After.
+The SDK's own retries are turned off (see utils.ai.client) so every attempt
+passes through the breaker and the limiter.
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+import openai
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .ratelimit import per_minute
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['AIUnavailable', 'CircuitBreaker', 'get_circuit_breaker', 'estimate_tokens']
+
+# Errors worth another attempt; anything else (bad request, auth) fails at once
+RETRYABLE_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                    openai.InternalServerError)
+
+
+class AIUnavailable(APIException):
+    """
+    The model can't be reached right now.
+
+    Args:
+        message (str): Why, for the logs and the response body
+        wait (float): Seconds after which a retry may succeed, sent as Retry-After
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The AI service is temporarily unavailable. Please try again later.'
+    default_code = 'ai_unavailable'
+
+    def __init__(self, message=None, wait=None):
+        self.message = message or self.default_detail
+        # Body matches the {"error": ...} shape the other endpoints use
+        super().__init__({'error': self.default_detail})
+        self.wait = max(1, int(wait + 0.999)) if wait else None
+
+    def __str__(self):
+        return self.message
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker shared by every call in the process.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit
+        reset_timeout (float): Seconds the circuit stays open before a trial call
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def before_call(self):
+        """Raise AIUnavailable unless a call may be made now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise AIUnavailable("OpenAI circuit is open", wait=remaining)
+            if self._trial_running:
+                raise AIUnavailable("OpenAI circuit is half-open with a trial call in flight",
+                                    wait=self.reset_timeout)
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("OpenAI circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_running
+            self._trial_running = False
+            if reopen or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                logger.warning(f"OpenAI circuit opened after {self._failures} consecutive failures")
+
+    def release_trial(self):
+        """Let another trial through when a trial call ended without a verdict"""
+        with self._lock:
+            self._trial_running = False
+
+
+_lock = threading.Lock()
+_breaker = None
+_limiters = None
+
+
+def get_circuit_breaker():
+    """Return the process-wide circuit breaker for OpenAI calls"""
+    global _breaker
+    if _breaker is None:
+        with _lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(settings.OPENAI_BREAKER_FAILURE_THRESHOLD,
+                                          settings.OPENAI_BREAKER_RESET_TIMEOUT)
+    return _breaker
+
+
+def _get_limiters():
+    """Return the (requests, tokens) buckets; either is None when unlimited"""
+    global _limiters
+    if _limiters is None:
+        with _lock:
+            if _limiters is None:
+                rpm = settings.OPENAI_REQUESTS_PER_MINUTE
+                tpm = settings.OPENAI_TOKENS_PER_MINUTE
+                _limiters = (per_minute(rpm) if rpm > 0 else None, per_minute(tpm) if tpm > 0 else None)
+    return _limiters
+
+
+def estimate_tokens(kwargs):
+    """
+    Rough token cost of a chat completion request, for the TPM bucket.
+
+    Prompt text is counted at four characters a token, plus the completion
+    budget the request asks for.
+    """
+    chars = sum(len(str(message.get('content') or '')) for message in kwargs.get('messages', []))
+    return chars // 4 + kwargs.get('max_tokens', settings.OPENAI_MAX_TOKENS)
+
+
+def _reserve(tokens):
+    """
+    Reserve one request and `tokens` tokens from the account limiter.
+
+    Returns:
+        float: Seconds to wait before calling
+    """
+    max_wait = settings.OPENAI_LIMITER_MAX_WAIT
+    requests_bucket, tokens_bucket = _get_limiters()
+    wait = 0.0
+    if requests_bucket is not None:
+        wait = requests_bucket.reserve(1, max_wait=max_wait)
+        if wait is None:
+            raise AIUnavailable("OpenAI request rate limit reached", wait=1 / requests_bucket.rate)
+    if tokens_bucket is not None:
+        token_wait = tokens_bucket.reserve(tokens, max_wait=max_wait)
+        if token_wait is None:
+            # The request slot won't be used either
+            if requests_bucket is not None:
+                requests_bucket.refund(1)
+            raise AIUnavailable("OpenAI token rate limit reached", wait=tokens / tokens_bucket.rate)
+        wait = max(wait, token_wait)
+    return wait
+
+
+def _admit(breaker, tokens):
+    """
+    Check the breaker, then reserve capacity for one attempt.
+
+    Returns:
+        float: Seconds to wait before calling
+    """
+    breaker.before_call()
+    try:
+        return _reserve(tokens)
+    except AIUnavailable:
+        breaker.release_trial()
+        raise
+
+
+def _retry_after(error):
+    """Seconds the API asked us to wait, from Retry-After(-Ms), or None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            retry_date = email.utils.parsedate_to_datetime(value)
+            return max(retry_date.timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff for the given retry number (0-based)"""
+    ceiling = min(settings.OPENAI_RETRY_BACKOFF_MAX, settings.OPENAI_RETRY_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _is_upstream_failure(error):
+    """Whether an error says upstream is unhealthy; 429s only say we're too fast"""
+    return isinstance(error, RETRYABLE_ERRORS) and not isinstance(error, openai.RateLimitError)
+
+
+def _after_failure(error, attempt, breaker):
+    """
+    Record a failed attempt and decide whether to retry.
+
+    Returns:
+        float: Seconds to sleep before the next attempt
+
+    Raises:
+        The error itself if it isn't retryable, or AIUnavailable if the
+        retries are used up or the wait would be too long
+    """
+    if not isinstance(error, RETRYABLE_ERRORS):
+        # The call reached a healthy API that rejected it
+        breaker.record_success()
+        raise error
+
+    if _is_upstream_failure(error):
+        breaker.record_failure()
+    else:
+        breaker.release_trial()
+
+    retry_after = _retry_after(error)
+    if attempt >= settings.OPENAI_MAX_RETRIES:
+        raise AIUnavailable(f"OpenAI call failed after {attempt + 1} attempts: {type(error).__name__}",
+                            wait=retry_after) from error
+    delay = retry_after if retry_after is not None else _backoff(attempt)
+    if delay > settings.OPENAI_RETRY_MAX_WAIT:
+        raise AIUnavailable(f"OpenAI asked to retry after {delay:.0f}s", wait=delay) from error
+    logger.info(f"Retrying OpenAI call in {delay:.2f}s after {type(error).__name__}")
+    return delay
+
+
+def call(request, kwargs):
+    """
+    Make an OpenAI request with limiting, circuit breaking and retries.
+
+    Args:
+        request (callable): Makes one upstream attempt and returns its result
+        kwargs (dict): The completion arguments, used to estimate token cost
+
+    Returns:
+        The result of the first successful attempt
+    """
+    breaker = get_circuit_breaker()
+    tokens = estimate_tokens(kwargs)
+    attempt = 0
+    while True:
+        wait = _admit(breaker, tokens)
+        if wait:
+            time.sleep(wait)
+        try:
+            result = request()
+        except Exception as e:
+            delay = _after_failure(e, attempt, breaker)
+            attempt += 1
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall(request, kwargs):
+    """Async version of call(); request is a coroutine function"""
+    breaker = get_circuit_breaker()
+    tokens = estimate_tokens(kwargs)
+    attempt = 0
+    while True:
+        wait = _admit(breaker, tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            delay = _after_failure(e, attempt, breaker)
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
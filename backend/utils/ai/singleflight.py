@@ -0,0 +1,204 @@
+"""
+Single-flight coalescing of identical in-flight AI calls.
+
+When several requests for the same normalized discovery search arrive while
+one is already waiting on the model, only the first (the leader) calls
+upstream; the rest wait for and share its result. Within a process the
+waiters block on an Event (or await a Future in async views). Across daphne
+workers the leader holds a lock in the Django cache and publishes its result
+there for the other workers.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['single_flight', 'async_single_flight']
+
+POLL_INTERVAL = 0.2
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class _LeaderCancelled(Exception):
+    """The caller making the upstream call was cancelled before it had a result"""
+
+
+def _run_as_cache_leader(key, compute):
+    """
+    Run compute under the cross-process lock for key, or wait for the worker
+    that holds it.
+    """
+    lock_key = f"{key}:lock"
+    result_key = f"{key}:result"
+    timeout = settings.AI_SINGLE_FLIGHT_TIMEOUT
+    token = uuid.uuid4().hex
+
+    if cache.add(lock_key, token, timeout):
+        try:
+            result = compute()
+            cache.set(result_key, {'token': token, 'result': result}, timeout)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # Another worker is computing; wait for the result published under its token
+    leader_token = cache.get(lock_key)
+    if leader_token is None:
+        # The leader finished between our add() and get()
+        published = cache.get(result_key)
+        if published is not None:
+            return published['result']
+    logger.info(f"Waiting on in-flight AI request in another worker for {key}")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        published = cache.get(result_key)
+        if published is not None and published.get('token') == leader_token:
+            return published['result']
+        if cache.get(lock_key) != leader_token:
+            # The leader finished without publishing (it failed) or a new flight started
+            published = cache.get(result_key)
+            if published is not None and published.get('token') == leader_token:
+                return published['result']
+            break
+        time.sleep(POLL_INTERVAL)
+
+    logger.warning(f"In-flight AI request for {key} did not produce a result; calling upstream directly")
+    return compute()
+
+
+def single_flight(key, compute):
+    """
+    Call compute() once for all concurrent callers using the same key.
+
+    Args:
+        key (str): Identifies the request, e.g. a normalized discovery cache key
+        compute (callable): Makes the upstream call and returns its result
+
+    Returns:
+        The result of the single upstream call
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        logger.info(f"Coalescing identical in-flight AI request for {key}")
+        flight.done.wait(settings.AI_SINGLE_FLIGHT_TIMEOUT)
+        if flight.error is not None:
+            raise flight.error
+        if not flight.done.is_set():
+            return compute()
+        return flight.result
+
+    try:
+        flight.result = _run_as_cache_leader(key, compute)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+_async_flights = {}
+
+
+async def _arun_as_cache_leader(key, compute):
+    """Async version of _run_as_cache_leader; compute is a coroutine function"""
+    lock_key = f"{key}:lock"
+    result_key = f"{key}:result"
+    timeout = settings.AI_SINGLE_FLIGHT_TIMEOUT
+    token = uuid.uuid4().hex
+
+    if await cache.aadd(lock_key, token, timeout):
+        try:
+            result = await compute()
+            await cache.aset(result_key, {'token': token, 'result': result}, timeout)
+            return result
+        finally:
+            await cache.adelete(lock_key)
+
+    leader_token = await cache.aget(lock_key)
+    if leader_token is None:
+        published = await cache.aget(result_key)
+        if published is not None:
+            return published['result']
+    logger.info(f"Waiting on in-flight AI request in another worker for {key}")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        published = await cache.aget(result_key)
+        if published is not None and published.get('token') == leader_token:
+            return published['result']
+        if await cache.aget(lock_key) != leader_token:
+            published = await cache.aget(result_key)
+            if published is not None and published.get('token') == leader_token:
+                return published['result']
+            break
+        await asyncio.sleep(POLL_INTERVAL)
+
+    logger.warning(f"In-flight AI request for {key} did not produce a result; calling upstream directly")
+    return await compute()
+
+
+async def async_single_flight(key, compute):
+    """
+    Await compute() once for all concurrent async callers using the same key.
+
+    Callers on the same event loop share one Future; other workers, and sync
+    callers in this process, are coordinated through the cache lock. If the
+    caller making the upstream call is cancelled, for example because its
+    client disconnected, the callers waiting on it start a new flight.
+
+    Args:
+        key (str): Identifies the request, e.g. a normalized discovery cache key
+        compute (callable): Coroutine function making the upstream call
+
+    Returns:
+        The result of the single upstream call
+    """
+    loop = asyncio.get_running_loop()
+    flight = _async_flights.get((loop, key))
+    if flight is not None:
+        logger.info(f"Coalescing identical in-flight AI request for {key}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight), settings.AI_SINGLE_FLIGHT_TIMEOUT)
+        except _LeaderCancelled:
+            # The first waiter to get here leads the new flight
+            return await async_single_flight(key, compute)
+
+    flight = _async_flights[(loop, key)] = loop.create_future()
+    try:
+        result = await _arun_as_cache_leader(key, compute)
+        flight.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        # Only this caller was cancelled; the waiters shouldn't fail with it
+        flight.set_exception(_LeaderCancelled())
+        flight.exception()
+        raise
+    except Exception as e:
+        flight.set_exception(e)
+        # Don't warn about an exception nobody was waiting for
+        flight.exception()
+        raise
+    finally:
+        _async_flights.pop((loop, key), None)
@@ -0,0 +1,288 @@
+"""
+Helpers for streaming AI results to the browser as they are generated.
+
+The discovery prompts ask for a JSON array of objects. JSONArrayStreamParser
+consumes the completion text as it arrives and hands back each top-level
+object as soon as its closing brace is seen, so the first result can be sent
+to the client long before the model has finished the whole array.
+
+Django 4.2 doesn't watch for the client going away while it streams a
+response; the ASGI server only cancels the application some time later.
+sse_response() closes the event generator as soon as the client's
+`http.disconnect` arrives, which keep_receive() makes visible to the view.
+"""
+import asyncio
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from .cache import discovery_cache_key, get_cached_discovery, set_cached_discovery, radius_bucket
+from .openai_client import astream_completion
+from .singleflight import async_single_flight
+from .telemetry import discovery_cache_status, arecord_ai_call
+from .resilience import AIUnavailable
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['JSONArrayStreamParser', 'sse_event', 'sse_response', 'keep_receive', 'discovery_event_stream', 'SSE_HEADERS']
+
+# Headers that stop proxies (nginx in particular) from buffering the stream
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+# Where keep_receive() puts the ASGI receive callable in the scope
+RECEIVE_SCOPE_KEY = 'sse.receive'
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extract the objects of a JSON array from streamed text.
+
+    Anything before the opening bracket (such as a ```json fence) is ignored.
+    Objects that fail to parse are logged and skipped.
+    """
+
+    def __init__(self):
+        self.text = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current = []
+
+    def feed(self, chunk):
+        """
+        Consume a piece of completion text.
+
+        Returns:
+            list: Objects completed by this chunk
+        """
+        completed = []
+        self.text.append(chunk)
+        for char in chunk:
+            if not self._started:
+                self._started = char == '['
+                continue
+
+            if self._depth > 0:
+                self._current.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._current = [char]
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = ''.join(self._current)
+                    self._current = []
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed object in streamed response: {raw[:200]}")
+        return completed
+
+    @property
+    def raw_text(self):
+        """The full text consumed so far"""
+        return ''.join(self.text)
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def keep_receive(app):
+    """
+    Wrap an ASGI HTTP application so requests keep their `receive` callable.
+
+    Django has read the request body by the time a view runs, so the next
+    message on `receive` is the client's `http.disconnect`.
+    """
+    async def application(scope, receive, send):
+        scope[RECEIVE_SCOPE_KEY] = receive
+        return await app(scope, receive, send)
+    return application
+
+
+async def _disconnected(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def close_on_disconnect(events, receive):
+    """
+    Pass events through until the client disconnects, then close `events`.
+
+    Closing raises GeneratorExit (or CancelledError, if it was waiting) inside
+    the generator at once, so its cleanup runs without waiting for the ASGI
+    server to cancel the response.
+    """
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    next_event = None
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.__anext__())
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                logger.info("Client disconnected, closing event stream")
+                return
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                return
+            yield event
+    finally:
+        disconnected.cancel()
+        if next_event is not None and not next_event.done():
+            next_event.cancel()
+            await asyncio.wait({next_event})
+        await events.aclose()
+
+
+def sse_response(request, events):
+    """
+    A text/event-stream response for an async generator of SSE events.
+
+    Under keep_receive() the generator is closed as soon as the client
+    disconnects; otherwise it is left to the server.
+    """
+    receive = getattr(request, 'scope', {}).get(RECEIVE_SCOPE_KEY)
+    if receive is not None:
+        events = close_on_disconnect(events, receive)
+    return StreamingHttpResponse(events, content_type='text/event-stream', headers=SSE_HEADERS)
+
+
+def _rank_with_order(results, rank):
+    """
+    Rank results, also returning where each ranked item was in `results`.
+
+    Returns:
+        tuple: (ranked results, their indices in `results`)
+    """
+    tagged = [{**item, '_stream_index': index} for index, item in enumerate(results) if isinstance(item, dict)]
+    ranked = rank(tagged)
+    return ranked, [item.pop('_stream_index') for item in ranked]
+
+
+def _retrieve_exception(future):
+    """Mark a finished flight's exception as seen once nobody is awaiting it"""
+    if not future.cancelled():
+        future.exception()
+
+
+async def discovery_event_stream(search_type, state, city, radius, build_messages, item_event, persist,
+                                 refresh=False, rank=None):
+    """
+    Generate the Server-Sent Events for a streaming discovery search.
+
+    Each result is sent as an `item_event` event as soon as it is complete.
+    A cached result for the same location is replayed instead of calling the
+    model. Like acached_discovery, a miss goes through async_single_flight,
+    so identical searches in flight, streamed or not, share one model call.
+    A request that waits on another's call replays its results at the end.
+    If the client goes away, the shared call still runs to the end and its
+    result is cached for the others.
+
+    When the stream ends the search is persisted and a final `done` event
+    carries the saved record's id. With `rank`, results are saved best first.
+    Results replayed from the cache or another request's call are also sent
+    best first. Results streamed live go out as they arrive, and `done`
+    carries `order`, their indices best first. If the model is unavailable,
+    the `error` event carries `retry_after` in seconds.
+
+    This is an async generator because under ASGI Django 4.2 reads a
+    synchronous iterator to the end before sending anything.
+
+    Args:
+        search_type (str): Discovery cache search type
+        state (str): State name
+        city (str): City name
+        radius (int): Requested radius in miles
+        build_messages (callable): Builds the chat messages from (state, city, radius)
+        item_event (str): Event name for each result, e.g. 'venue'
+        persist (callable): Saves the full result list and returns the record;
+            synchronous, it is run in a worker thread
+        refresh (bool): Ignore any cached result
+        rank (callable): Orders a result list for the requesting user, e.g.
+            rank_for_user; synchronous, it is run in a worker thread
+
+    Yields:
+        str: Formatted SSE events
+    """
+    key = discovery_cache_key(search_type, state, city, radius)
+    cached = None if refresh else await sync_to_async(get_cached_discovery)(key)
+    streamed = []
+
+    if cached is not None:
+        results, cache_hit = cached, True
+        await arecord_ai_call(cache_status='hit')
+    else:
+        cache_hit = False
+        arrived = asyncio.Queue()
+        computed = []
+
+        async def compute_and_store():
+            computed.append(True)
+            parser = JSONArrayStreamParser()
+            found = []
+            with discovery_cache_status('refresh' if refresh else 'miss'):
+                async for text in astream_completion(build_messages(state, city, radius_bucket(radius))):
+                    for item in parser.feed(text):
+                        found.append(item)
+                        arrived.put_nowait(item)
+            if found:
+                await sync_to_async(set_cached_discovery)(key, found)
+            return found
+
+        # A task, so the call outlives this generator if the client disconnects
+        flight = asyncio.ensure_future(async_single_flight(key, compute_and_store))
+        flight.add_done_callback(_retrieve_exception)
+        try:
+            while True:
+                next_item = asyncio.ensure_future(arrived.get())
+                await asyncio.wait({next_item, flight}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_item.done():
+                    next_item.cancel()
+                    break
+                streamed.append(next_item.result())
+                yield sse_event(item_event, streamed[-1])
+            results = flight.result()
+        except AIUnavailable as e:
+            logger.warning(f"AI unavailable for {search_type} discovery: {str(e)}")
+            yield sse_event('error', {**e.detail, 'retry_after': e.wait})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming {search_type} discovery: {str(e)}")
+            yield sse_event('error', {'error': 'Failed to get recommendations. Please try again later.'})
+            return
+        if not computed:
+            await arecord_ai_call(cache_status='coalesced')
+
+    order = None
+    if rank is not None:
+        results, order = await sync_to_async(_rank_with_order)(results, rank)
+    if not streamed:
+        # Nothing went out live, so send the whole result list in order
+        for item in results:
+            yield sse_event(item_event, item)
+        order = None
+
+    record = await sync_to_async(persist)(results)
+    done = {'id': record.id, 'count': len(results), 'cache_hit': cache_hit}
+    if order is not None:
+        done['order'] = order
+    yield sse_event('done', done)
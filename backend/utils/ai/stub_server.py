@@ -0,0 +1,247 @@
+"""
+A local stand-in for the OpenAI chat completions API.
+
+It answers POST /v1/chat/completions, streaming or not, with canned but
+plausible content. Discovery prompts get a JSON array of venues or
+networking opportunities for the city in the prompt; anything else gets a
+short email-style text. Latency, token rate and error injection are
+configurable, so the discovery, networking and email flows can be load
+tested without network access or API spend. Point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:8001/v1.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['StubConfig', 'make_stub_server']
+
+VENUE_KINDS = ['Lounge', 'Music Hall', 'Social Club', 'Listening Room', 'Warehouse', 'Rooftop', 'Theater', 'Tavern']
+VENUE_WORDS = ['Velvet', 'Copper', 'Midnight', 'Echo', 'Northside', 'Blue Note', 'Groove', 'Parlor', 'Vinyl', 'Basement']
+EVENT_KINDS = ['Open Mic', 'Producer Meetup', 'Songwriter Workshop', 'Industry Mixer', 'Showcase', 'Conference']
+
+EMAIL_BODY = (
+    "Subject: Booking inquiry\n\n"
+    "Hi there,\n\n"
+    "I'm reaching out to ask about performance opportunities at your venue. "
+    "My music blends hip-hop and R&B, and I have been building a following with regular local shows. "
+    "I would love to learn more about your booking process and any open dates in the coming months.\n\n"
+    "Thank you for your time,\n"
+    "The Artist\n"
+)
+
+
+class StubConfig:
+    """
+    Behaviour of the stub server.
+
+    Args:
+        latency (float): Seconds to wait before the first token
+        tokens_per_second (float): Generation speed; 0 sends everything at once
+        error_rate (float): Fraction of requests answered with error_status
+        error_status (int): Status for injected errors, e.g. 429 or 500
+        retry_after (float): Retry-After seconds sent with injected 429s
+        items (int): Number of venues or opportunities per discovery answer
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=0, error_rate=0.0, error_status=500,
+                 retry_after=1, items=8):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.items = items
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def _prompt_field(prompt, name, default):
+    match = re.search(rf'-\s*{name}:\s*([^\n]+)', prompt)
+    return match.group(1).strip() if match else default
+
+
+def _venues(prompt, count):
+    city = _prompt_field(prompt, 'City', 'Springfield')
+    state = _prompt_field(prompt, 'State', 'GA')
+    rng = random.Random(f"{city}|{state}")
+    return [
+        {
+            'name': f"The {rng.choice(VENUE_WORDS)} {rng.choice(VENUE_KINDS)}",
+            'description': 'Intimate room with a resident DJ and a weekly hip-hop and R&B night.',
+            'address': f"{rng.randint(100, 9999)} {rng.choice(['Main', 'Peachtree', 'Broad', 'Market'])} St",
+            'city': city,
+            'state': state[:2].upper(),
+            'zipcode': f"{rng.randint(10000, 99999)}",
+            'phone': f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            'email': f"booking{index}@example.com",
+            'website': f"https://venue{index}.example.com",
+            'capacity': rng.choice([80, 150, 250, 400, 800]),
+            'genres': 'Hip-Hop, R&B, Soul',
+        }
+        for index in range(count)
+    ]
+
+
+def _opportunities(prompt, count):
+    city = _prompt_field(prompt, 'City', 'Springfield')
+    state = _prompt_field(prompt, 'State', 'GA')
+    rng = random.Random(f"net|{city}|{state}")
+    kinds = [rng.choice(EVENT_KINDS) for _ in range(count)]
+    return [
+        {
+            'name': f"{city} {kinds[index]}",
+            'title': f"{city} {kinds[index]}",
+            'organization': f"{city} Music Collective",
+            'description': 'Monthly gathering for local artists, producers and promoters.',
+            'type': kinds[index],
+            'address': f"{rng.randint(100, 9999)} Center Ave",
+            'city': city,
+            'state': state[:2].upper(),
+            'date': 'Recurring - first Thursday of the month',
+            'time': '7:00 PM',
+            'cost': rng.choice(['Free', '$10', '$25']),
+            'website': f"https://event{index}.example.com",
+            'contact': f"events{index}@example.com",
+        }
+        for index in range(count)
+    ]
+
+
+def canned_reply(messages, items):
+    """Pick a plausible reply for the prompt in messages"""
+    prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+    lowered = prompt.lower()
+    if 'json' not in lowered:
+        return EMAIL_BODY
+    if 'networking' in lowered or 'opportunit' in lowered:
+        return '```json\n' + json.dumps(_opportunities(prompt, items), indent=2) + '\n```'
+    return '```json\n' + json.dumps(_venues(prompt, items), indent=2) + '\n```'
+
+
+def _tokens(text):
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        config = self.config
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON body', 'type': 'invalid_request_error'}})
+            return
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        with config.lock:
+            config.requests += 1
+
+        if config.error_rate and random.random() < config.error_rate:
+            headers = {'Retry-After': str(config.retry_after)} if config.error_status == 429 else None
+            self._send_json(config.error_status, {
+                'error': {'message': 'Injected error from the stub server', 'type': 'server_error'}
+            }, headers)
+            return
+
+        time.sleep(config.latency)
+        model = body.get('model', 'stub-model')
+        content = canned_reply(body.get('messages', []), config.items)
+        prompt_tokens = _tokens(json.dumps(body.get('messages', [])))
+        completion_tokens = _tokens(content)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+
+        if not body.get('stream'):
+            if config.tokens_per_second:
+                time.sleep(completion_tokens / config.tokens_per_second)
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        # Send roughly one token (four characters) per chunk
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        delay = 1 / config.tokens_per_second if config.tokens_per_second else 0
+        try:
+            for piece in pieces:
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}],
+                }
+                self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                if delay:
+                    time.sleep(delay)
+            final = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            }
+            self._chunk(f"data: {json.dumps(final)}\n\n".encode())
+            if (body.get('stream_options') or {}).get('include_usage'):
+                usage_chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                               'model': model, 'choices': [], 'usage': usage}
+                self._chunk(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. it cancelled the stream
+            pass
+
+
+def make_stub_server(host='127.0.0.1', port=8001, config=None):
+    """
+    Build (but don't start) a stub server.
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to run it
+    """
+    handler = type('StubHandler', (_Handler,), {'config': config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
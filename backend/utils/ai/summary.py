@@ -0,0 +1,34 @@
+"""
+Summaries of AI search results for history lists.
+
+Search history rows keep a result count and the first few result names next
+to the full results, so list endpoints can show them without loading (or
+sending) every result.
+"""
+
+__all__ = ['TOP_NAMES', 'summarize_results']
+
+# How many result names a history row shows
+TOP_NAMES = 3
+
+
+def summarize_results(results, name_keys=('name', 'title')):
+    """
+    Return (count, top names) for a list of result dicts.
+
+    Args:
+        results (list): Parsed results; None or a non-list counts as empty
+        name_keys (tuple): Keys tried in order for each result's name
+    """
+    if not isinstance(results, list):
+        return 0, []
+    names = []
+    for result in results:
+        if len(names) == TOP_NAMES:
+            break
+        if not isinstance(result, dict):
+            continue
+        name = next((result[key] for key in name_keys if result.get(key)), None)
+        if name:
+            names.append(str(name)[:100])
+    return len(results), names
@@ -0,0 +1,290 @@
+"""
+Per-call telemetry for AI completions.
+
+Every chat completion goes through create_chat_completion() (or its async
+and streaming counterparts). It makes the call through utils.ai.resilience
+(retries, circuit breaker, account rate limits), times it and writes one
+AICallLog row. Each row records the model, token usage, latency, retries, the discovery
+cache status, and the endpoint and user the call was made for. Discovery
+requests answered from the cache get a row too, so hit rates can be reported
+next to upstream cost.
+
+The endpoint and user come from AICallContextMiddleware, which remembers the
+current request. Work outside a request, such as management commands or
+background jobs, labels itself with ai_call_context().
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from .client import get_openai_client, get_async_openai_client, attempt_counter
+from . import resilience
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'AICallContextMiddleware', 'ai_call_context', 'discovery_cache_status',
+    'record_ai_call', 'arecord_ai_call', 'create_chat_completion', 'acreate_chat_completion',
+    'astream_chat_completion',
+]
+
+_request = contextvars.ContextVar('ai_call_request', default=None)
+_labels = contextvars.ContextVar('ai_call_labels', default=None)
+_cache_status = contextvars.ContextVar('ai_cache_status', default='none')
+
+
+class AICallContextMiddleware:
+    """
+    Remember the current request so AI calls can be attributed to it.
+
+    The request is deliberately not cleared when the response is returned:
+    streamed responses are consumed after the middleware has finished, and
+    their calls should still be attributed to the request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        _request.set(request)
+        _labels.set(None)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        _request.set(request)
+        _labels.set(None)
+        return await self.get_response(request)
+
+
+@contextmanager
+def ai_call_context(endpoint, user=None):
+    """Label AI calls made outside a request, e.g. `with ai_call_context('warm_cache'):`"""
+    token = _labels.set({'endpoint': endpoint, 'user': user})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+@contextmanager
+def discovery_cache_status(status):
+    """Mark completions made inside the block as a cache 'miss' or 'refresh'"""
+    token = _cache_status.set(status)
+    try:
+        yield
+    finally:
+        _cache_status.reset(token)
+
+
+def _caller():
+    """Return (endpoint, user) for the current call"""
+    labels = _labels.get()
+    if labels is not None:
+        return labels['endpoint'], labels['user']
+
+    request = _request.get()
+    if request is None:
+        return 'unknown', None
+    match = getattr(request, 'resolver_match', None)
+    endpoint = match.view_name if match else request.path
+    # DRF copies the authenticated user onto the Django request
+    user = getattr(request, 'user', None)
+    if user is not None and not user.is_authenticated:
+        user = None
+    return endpoint, user
+
+
+def record_ai_call(model='', prompt_tokens=None, completion_tokens=None, latency=0.0,
+                   retries=0, cache_status=None, streamed=False, error=''):
+    """
+    Write one AICallLog row. Failures are logged and never reach the caller.
+
+    Args:
+        model (str): Model that answered, blank for cache answers
+        prompt_tokens (int): Prompt tokens reported by the API, if known
+        completion_tokens (int): Completion tokens reported by the API, if known
+        latency (float): Seconds spent waiting on the call
+        retries (int): HTTP attempts beyond the first
+        cache_status (str): Overrides the discovery cache status of the context
+        streamed (bool): Whether the completion was streamed
+        error (str): Exception class name if the call failed
+    """
+    if not settings.AI_TELEMETRY_ENABLED:
+        return
+    from ai.models import AICallLog
+
+    try:
+        endpoint, user = _caller()
+        AICallLog.objects.create(
+            endpoint=endpoint[:100],
+            user=user,
+            model=model or '',
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=int(latency * 1000),
+            retries=max(retries, 0),
+            cache_status=cache_status or _cache_status.get(),
+            streamed=streamed,
+            error=error[:100],
+        )
+    except Exception as e:
+        logger.warning(f"Could not record AI call telemetry: {str(e)}")
+
+
+async def arecord_ai_call(**kwargs):
+    """Async version of record_ai_call"""
+    # Copies the context, so the endpoint and cache status carry over
+    await sync_to_async(record_ai_call)(**kwargs)
+
+
+def _usage(response):
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return None, None
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+def create_chat_completion(**kwargs):
+    """
+    Call chat.completions.create on the shared client and record the call.
+
+    Takes the same keyword arguments as the OpenAI client. With stream=True
+    the returned stream records itself once it has been consumed.
+    """
+    if kwargs.get('stream'):
+        return _TracedStream(kwargs)
+
+    counter = [0]
+    token = attempt_counter.set(counter)
+    start = time.monotonic()
+    try:
+        response = resilience.call(lambda: get_openai_client().chat.completions.create(**kwargs), kwargs)
+    except Exception as e:
+        record_ai_call(model=kwargs.get('model'), latency=time.monotonic() - start,
+                       retries=counter[0] - 1, error=type(e).__name__)
+        raise
+    finally:
+        attempt_counter.reset(token)
+
+    prompt_tokens, completion_tokens = _usage(response)
+    record_ai_call(model=response.model or kwargs.get('model'), prompt_tokens=prompt_tokens,
+                   completion_tokens=completion_tokens, latency=time.monotonic() - start,
+                   retries=counter[0] - 1)
+    return response
+
+
+async def acreate_chat_completion(**kwargs):
+    """Async version of create_chat_completion (non-streaming only)"""
+    counter = [0]
+    token = attempt_counter.set(counter)
+    start = time.monotonic()
+    try:
+        response = await resilience.acall(lambda: get_async_openai_client().chat.completions.create(**kwargs), kwargs)
+    except Exception as e:
+        await arecord_ai_call(model=kwargs.get('model'), latency=time.monotonic() - start,
+                              retries=counter[0] - 1, error=type(e).__name__)
+        raise
+    finally:
+        attempt_counter.reset(token)
+
+    prompt_tokens, completion_tokens = _usage(response)
+    await arecord_ai_call(model=response.model or kwargs.get('model'), prompt_tokens=prompt_tokens,
+                          completion_tokens=completion_tokens, latency=time.monotonic() - start,
+                          retries=counter[0] - 1)
+    return response
+
+
+def _chunk_usage(chunk):
+    """Token counts from a stream's trailing usage chunk, if this is one"""
+    usage = getattr(chunk, 'usage', None)
+    if not usage:
+        return None
+    if isinstance(usage, dict):
+        return usage.get('prompt_tokens'), usage.get('completion_tokens')
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+async def astream_chat_completion(**kwargs):
+    """
+    Async streamed completion: yields the chunks and records the call once
+    the stream ends or is closed. The connection is released either way.
+    """
+    kwargs['stream'] = True
+    kwargs.setdefault('extra_body', {'stream_options': {'include_usage': True}})
+    model = kwargs.get('model')
+    counter = [0]
+    token = attempt_counter.set(counter)
+    start = time.monotonic()
+    try:
+        stream = await resilience.acall(lambda: get_async_openai_client().chat.completions.create(**kwargs), kwargs)
+    except Exception as e:
+        await arecord_ai_call(model=model, latency=time.monotonic() - start,
+                              retries=counter[0] - 1, streamed=True, error=type(e).__name__)
+        raise
+    finally:
+        attempt_counter.reset(token)
+
+    tokens = (None, None)
+    error = ''
+    try:
+        async for chunk in stream:
+            tokens = _chunk_usage(chunk) or tokens
+            yield chunk
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        await stream.response.aclose()
+        await arecord_ai_call(model=model, prompt_tokens=tokens[0], completion_tokens=tokens[1],
+                              latency=time.monotonic() - start, retries=counter[0] - 1,
+                              streamed=True, error=error)
+
+
+class _TracedStream:
+    """
+    Iterate a streamed completion and record it when iteration ends.
+
+    The API is asked to append a usage chunk to the stream. Servers that
+    don't support that leave the token counts empty.
+    """
+
+    def __init__(self, kwargs):
+        kwargs.setdefault('extra_body', {'stream_options': {'include_usage': True}})
+        self.model = kwargs.get('model')
+        self.start = time.monotonic()
+        counter = [0]
+        token = attempt_counter.set(counter)
+        try:
+            self.stream = resilience.call(lambda: get_openai_client().chat.completions.create(**kwargs), kwargs)
+        except Exception as e:
+            record_ai_call(model=self.model, latency=time.monotonic() - self.start,
+                           retries=counter[0] - 1, streamed=True, error=type(e).__name__)
+            raise
+        finally:
+            attempt_counter.reset(token)
+        self.retries = counter[0] - 1
+        self.response = self.stream.response
+
+    def __iter__(self):
+        tokens = (None, None)
+        error = ''
+        try:
+            for chunk in self.stream:
+                tokens = _chunk_usage(chunk) or tokens
+                yield chunk
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record_ai_call(model=self.model, prompt_tokens=tokens[0], completion_tokens=tokens[1],
+                           latency=time.monotonic() - self.start, retries=self.retries,
+                           streamed=True, error=error)
@@ -0,0 +1,38 @@
+"""
+Small in-process background task runner.
+
+Work that should not hold up a request (audio packaging, batch jobs) is
+submitted to a shared thread pool. Each task closes its database connection
+when done so worker threads don't leak connections.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 4),
+    thread_name_prefix='background',
+)
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on the shared background pool.
+
+    Returns:
+        concurrent.futures.Future: Future for the task's result
+    """
+    def task():
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            logger.exception(f"Background task {getattr(func, '__name__', func)} failed")
+            raise
+        finally:
+            connections.close_all()
+
+    return _executor.submit(task)
@@ -0,0 +1,62 @@
+"""
+Custom model fields.
+"""
+import zlib
+from django.db import models
+
+__all__ = ['CompressedTextField']
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored zlib-compressed in a binary column.
+
+    Model completions are verbose JSON and compress to a fraction of their
+    size. The attribute is a plain str in Python; only the database sees
+    bytes, so the column can't be filtered on by content.
+    """
+
+    def __init__(self, *args, level=6, **kwargs):
+        self.level = level
+        kwargs.setdefault('default', '')
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.level != 6:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def _check_str_default_value(self):
+        # Unlike BinaryField, the Python value is text
+        return []
+
+    def get_default(self):
+        # BinaryField coerces a str default to bytes
+        return self.default if isinstance(self.default, str) else super().get_default()
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return zlib.decompress(bytes(value)).decode('utf-8')
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return zlib.decompress(bytes(value)).decode('utf-8')
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        return zlib.compress(str(value).encode('utf-8'), self.level)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,162 @@
+"""
+Offline US gazetteer and distance helpers.
+
+utils/data/us_cities.csv lists the larger US cities (and the main town of
+sparser regions) with their coordinates and approximate population. It is
+small enough to load into memory once per process, which lets discovery
+place cities and measure distances without calling a geocoding service.
+
+ZIP codes are placed with the table at GEO_ZIP_CENTROIDS_PATH, by default
+utils/data/us_zip_centroids.csv: zip, lat and lon for every US ZIP code, taken
+from the MIT-licensed `zipcodes` package (1.2.0, data as of October 2021). The
+Census Bureau's ZCTA gazetteer file (tab-separated, public domain) can be used
+instead. ZIP codes missing from the table fall back to the city.
+"""
+import csv
+import logging
+import math
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from utils.ai.cache import normalize_city, normalize_state
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'City', 'haversine_miles', 'haversine_miles_array', 'bounding_box', 'load_cities',
+    'find_city', 'cities_within', 'normalize_zip', 'load_zip_centroids', 'geocode',
+]
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'us_cities.csv')
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.05
+
+ZIP_RE = re.compile(r'^(\d{5})(?:-?\d{4})?$')
+
+City = namedtuple('City', ['name', 'state', 'lat', 'lon', 'population'])
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """Great-circle distance in miles between two points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def haversine_miles_array(lat, lon, lats, lons):
+    """Distances in miles from one point to arrays of points, all in degrees"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(lat, lon, radius):
+    """
+    A latitude/longitude box holding every point within `radius` miles.
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lon, max_lon) in degrees
+    """
+    dlat = radius / MILES_PER_DEGREE_LAT
+    # Degrees of longitude shrink towards the poles; size for the widest edge
+    edge = min(abs(lat) + dlat, 89.9)
+    dlon = min(radius / (MILES_PER_DEGREE_LAT * math.cos(math.radians(edge))), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+@lru_cache(maxsize=None)
+def load_cities():
+    """
+    Load the gazetteer.
+
+    Returns:
+        dict: (normalized state, normalized city) -> City
+    """
+    cities = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            city = City(row['city'], row['state'], float(row['lat']), float(row['lon']), int(row['population']))
+            cities[(normalize_state(city.state), normalize_city(city.name))] = city
+    return cities
+
+
+def find_city(state, city):
+    """Look up a city by state and name; returns None if it isn't in the gazetteer"""
+    return load_cities().get((normalize_state(state), normalize_city(city)))
+
+
+def cities_within(lat, lon, radius):
+    """
+    Gazetteer cities within `radius` miles of a point.
+
+    Returns:
+        list: (City, distance in miles) pairs, nearest first
+    """
+    found = []
+    for city in load_cities().values():
+        distance = haversine_miles(lat, lon, city.lat, city.lon)
+        if distance <= radius:
+            found.append((city, distance))
+    found.sort(key=lambda pair: pair[1])
+    return found
+
+
+def normalize_zip(zipcode):
+    """The five-digit ZIP code in a ZIP or ZIP+4 string, or None"""
+    match = ZIP_RE.match(str(zipcode or '').strip())
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=None)
+def load_zip_centroids():
+    """
+    Load the ZIP centroid table.
+
+    Returns:
+        dict: five-digit ZIP code -> (lat, lon); empty if there's no table
+    """
+    path = settings.GEO_ZIP_CENTROIDS_PATH
+    if not os.path.exists(path):
+        logger.warning(f"No ZIP centroid table at {path}; venues are placed by city only")
+        return {}
+    centroids = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        dialect = 'excel-tab' if '\t' in f.readline() else 'excel'
+        f.seek(0)
+        for row in csv.DictReader(f, dialect=dialect):
+            row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            zipcode = normalize_zip(row.get('geoid') or row.get('zip'))
+            try:
+                lat = float(row.get('intptlat') or row['lat'])
+                lon = float(row.get('intptlong') or row['lon'])
+            except (KeyError, ValueError):
+                continue
+            if zipcode:
+                centroids[zipcode] = (lat, lon)
+    return centroids
+
+
+def geocode(zipcode='', city='', state=''):
+    """
+    Place an address offline: by ZIP centroid if known, else by city.
+
+    Returns:
+        tuple: (lat, lon), or None if neither is known
+    """
+    centroids = load_zip_centroids()
+    zip5 = normalize_zip(zipcode)
+    if zip5 in centroids:
+        return centroids[zip5]
+    place = find_city(state, city) if city and state else None
+    if place is not None:
+        return place.lat, place.lon
+    return None
@@ -0,0 +1,247 @@
+"""
+Per-user request throttling for expensive endpoints.
+
+Each throttle covers one scope (AI discovery, email generation, audio edits,
+audio uploads) and limits every user separately, at the rate configured in
+THROTTLE_RATES for the scope and the user's tier. A user's tier is the first
+of THROTTLE_TIERS they have a group of the same name for, else 'default';
+staff are not throttled unless THROTTLE_EXEMPT_STAFF is off.
+
+A request counts as one unit unless its throttle was built with costing():
+endpoints that start one model call per stop, tile or venue are charged one
+unit per call, before any of the work starts.
+
+Requests are counted over a sliding window kept in the shared Django cache,
+so the limit holds across workers: the count in the previous fixed window,
+weighted by how much of it still overlaps the sliding window, plus the count
+in the current one. Counters are bumped with cache.incr(), which is atomic on
+Redis, and a rejected request takes its increment back. Rejections raise
+RateLimited, answered with 429 and Retry-After. Allowed and throttled
+requests are also counted per day, scope and tier for throttle_stats().
+"""
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'DEFAULT_TIER', 'RateLimited', 'parse_rate', 'user_tier', 'ScopedUserThrottle',
+    'AIDiscoveryThrottle', 'EmailGenerationThrottle', 'AudioEditThrottle',
+    'AudioUploadThrottle', 'throttle_stats',
+]
+
+KEY_PREFIX = 'throttle'
+DEFAULT_TIER = 'default'
+OUTCOMES = ('allowed', 'throttled')
+# Days of daily counters kept for throttle_stats()
+STATS_RETENTION_DAYS = 8
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+class RateLimited(Throttled):
+    """
+    The user has used up their requests for a scope.
+
+    Args:
+        wait (float): Seconds until the next request is allowed, sent as Retry-After
+    """
+
+    def __init__(self, wait=None):
+        super().__init__(wait)
+        # Body matches the {"error": ...} shape the other endpoints use
+        self.detail = {'error': str(self.detail)}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as "30/hour" or "5/m".
+
+    Returns:
+        tuple: (requests, seconds), or None if the rate is empty (no limit)
+    """
+    if not rate:
+        return None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period.strip()[0]]
+
+
+def user_tier(user):
+    """The user's throttle tier, or None if they are exempt"""
+    if not user or not user.is_authenticated:
+        return DEFAULT_TIER
+    if user.is_staff and settings.THROTTLE_EXEMPT_STAFF:
+        return None
+    if settings.THROTTLE_TIERS:
+        groups = set(user.groups.filter(name__in=settings.THROTTLE_TIERS).values_list('name', flat=True))
+        for tier in settings.THROTTLE_TIERS:
+            if tier in groups:
+                return tier
+    return DEFAULT_TIER
+
+
+def _stats_key(day, scope, tier, outcome):
+    return f'{KEY_PREFIX}:stats:{day.isoformat()}:{scope}:{tier}:{outcome}'
+
+
+def _incr(key, timeout, delta=1):
+    """Increment a counter, creating it if needed"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, delta, timeout)
+        return delta
+
+
+class ScopedUserThrottle(BaseThrottle):
+    """
+    Sliding-window throttle for one scope of THROTTLE_RATES.
+
+    Subclasses set `scope`. Safe methods aren't counted, so a view's GET
+    (history, job status) stays free while its POST is limited. A rejected
+    request raises RateLimited rather than returning False, so the response
+    has the {"error": ...} body.
+    """
+    scope = None
+    # Units one request takes: a number, or a function of the request
+    cost = 1
+    timer = time.time
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_rate(self, tier):
+        rates = settings.THROTTLE_RATES.get(self.scope, {})
+        return parse_rate(rates.get(tier, rates.get(DEFAULT_TIER)))
+
+    @classmethod
+    def costing(cls, cost):
+        """
+        This throttle, charging `cost` units per request instead of one.
+
+        Args:
+            cost: A number, or a function taking the request and returning one,
+                such as the number of model calls the request will make
+        """
+        return type(cls.__name__, (cls,), {'cost': staticmethod(cost) if callable(cost) else cost})
+
+    def get_cost(self, request):
+        """Units the request takes, at least one"""
+        cost = self.cost(request) if callable(self.cost) else self.cost
+        return max(int(cost), 1)
+
+    def get_cache_key(self, request):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'{KEY_PREFIX}:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        tier = user_tier(request.user)
+        rate = self.get_rate(tier) if tier is not None else None
+        if rate is None:
+            return True
+        num_requests, duration = rate
+        # A request larger than the whole allowance uses all of it rather than never fitting
+        cost = min(self.get_cost(request), num_requests)
+
+        now = self.timer()
+        window = int(now // duration)
+        elapsed = now - window * duration
+        key = self.get_cache_key(request)
+        current_key = f'{key}:{window}'
+        previous = cache.get(f'{key}:{window - 1}', 0)
+        # Kept for two windows, while it can still be the previous one
+        current = _incr(current_key, duration * 2, cost)
+
+        weight = 1 - elapsed / duration
+        if previous * weight + current <= num_requests:
+            self.record(tier, 'allowed')
+            return True
+
+        cache.decr(current_key, cost)
+        self.wait_seconds = self.compute_wait(previous, current - cost, num_requests, duration, elapsed, cost)
+        self.record(tier, 'throttled')
+        logger.info(f"Throttled {self.scope} request from {key} ({tier} tier, {num_requests}/{duration}s)")
+        raise RateLimited(self.wait_seconds)
+
+    @staticmethod
+    def compute_wait(previous, current, num_requests, duration, elapsed, cost=1):
+        """Seconds until `cost` more units fit in the sliding window"""
+        room = num_requests - current - cost
+        if room >= 0:
+            # The previous window's share shrinks as it slides out
+            return max(duration * (1 - room / previous) - elapsed, 0) if previous else 0
+        # Full on its own; wait for this window to become the previous one
+        return duration - elapsed + max(duration * (1 - (num_requests - cost) / current), 0)
+
+    def wait(self):
+        return self.wait_seconds
+
+    def record(self, tier, outcome):
+        _incr(_stats_key(timezone.localdate(), self.scope, tier, outcome), STATS_RETENTION_DAYS * 24 * 60 * 60)
+
+
+class AIDiscoveryThrottle(ScopedUserThrottle):
+    """Venue and networking discovery, which call the model unless the result is cached"""
+    scope = 'ai_discovery'
+
+
+class EmailGenerationThrottle(ScopedUserThrottle):
+    """Outreach email generation, single, streamed and batch"""
+    scope = 'email_generation'
+
+
+class AudioEditThrottle(ScopedUserThrottle):
+    """Audio edits, which re-encode the file"""
+    scope = 'audio_edit'
+
+
+class AudioUploadThrottle(ScopedUserThrottle):
+    """Audio uploads, which are probed, fingerprinted and segmented for HLS"""
+    scope = 'audio_upload'
+
+
+def throttle_stats(days=7):
+    """
+    Allowed and throttled request counts per day, scope and tier.
+
+    Returns:
+        list: One dict per day, newest first, with `date` and `scopes`
+              ({scope: {tier: {'allowed': n, 'throttled': n}}})
+    """
+    days = max(1, min(days, STATS_RETENTION_DAYS))
+    tiers = [DEFAULT_TIER, *settings.THROTTLE_TIERS]
+    today = timezone.localdate()
+    day_list = [today - timedelta(days=offset) for offset in range(days)]
+    keys = [
+        _stats_key(day, scope, tier, outcome)
+        for day in day_list
+        for scope in settings.THROTTLE_RATES
+        for tier in tiers
+        for outcome in OUTCOMES
+    ]
+    counts = cache.get_many(keys)
+
+    summary = []
+    for day in day_list:
+        scopes = {}
+        for scope in settings.THROTTLE_RATES:
+            for tier in tiers:
+                values = {outcome: counts.get(_stats_key(day, scope, tier, outcome), 0) for outcome in OUTCOMES}
+                if any(values.values()):
+                    scopes.setdefault(scope, {})[tier] = values
+        summary.append({'date': day.isoformat(), 'scopes': scopes})
+    return summary
@@ -1,12 +1,17 @@
 import api from './axios';
-import { AISearchQuery, AIVenueResult } from '../types';
+import { AISearchQuery, AISearchQuerySummary, AIVenueResult } from '../types';
 
 export const discoverVenues = async (state: string, city: string, radius: number): Promise<AISearchQuery> => {
   const response = await api.post('/ai/discover/', { state, city, radius });
   return response.data;
 };
 
-export const getSearchHistory = async (): Promise<AISearchQuery[]> => {
+export const discoverVenuesTiled = async (state: string, city: string, radius: number): Promise<AISearchQuery> => {
+  const response = await api.post('/ai/discover/tiled/', { state, city, radius });
+  return response.data;
+};
+
+export const getSearchHistory = async (): Promise<AISearchQuerySummary[]> => {
   const response = await api.get('/ai/searches/');
   return response.data;
 };
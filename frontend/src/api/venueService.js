@@ -46,12 +46,13 @@ const venueService = {
   },
   
   // Get venues
-  getVenues: async (stateId = null) => {
+  getVenues: async (stateId = null, params = {}) => {
     try {
       // Use the correct path format based on the venue_urls.py configuration
       const url = stateId ? `/venues/states/${stateId}/venues/` : '/venues/';
-      const response = await apiClient.get(url);
-      return response.data;
+      const response = await apiClient.get(url, { params });
+      // Search, `near` and filter parameters return one page: { count, next, previous, results }
+      return Array.isArray(response.data) ? response.data : response.data.results;
     } catch (error) {
       console.error('Error fetching venues:', error);
       throw error;
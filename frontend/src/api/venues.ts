@@ -1,10 +1,11 @@
 import api from './axios';
-import { Venue } from '../types';
+import { Paginated, Venue } from '../types';
 
-export const getVenues = async (stateId?: number): Promise<Venue[]> => {
+// Any `q`, `near` or filter parameter makes the list paginated; callers then get the requested `page`
+export const getVenues = async (stateId?: number, params?: Record<string, unknown>): Promise<Venue[]> => {
   const url = stateId ? `/states/${stateId}/venues/` : '/venues/';
-  const response = await api.get(url);
-  return response.data;
+  const response = await api.get<Venue[] | Paginated<Venue>>(url, { params });
+  return Array.isArray(response.data) ? response.data : response.data.results;
 };
 
 export const getVenue = async (id: number): Promise<Venue> => {
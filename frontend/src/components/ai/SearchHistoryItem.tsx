@@ -1,8 +1,8 @@
 import React from 'react';
-import { AISearchQuery } from '../../types';
+import { AISearchQuerySummary } from '../../types';
 
 interface SearchHistoryItemProps {
-  searchQuery: AISearchQuery;
+  searchQuery: AISearchQuerySummary;
   onClick: () => void;
 }
 
@@ -32,8 +32,8 @@ const SearchHistoryItem: React.FC<SearchHistoryItemProps> = ({
         </div>
         <div className="text-xs text-gray-600">
           {searchQuery.radius} mile radius • 
-          {searchQuery.results && searchQuery.results.length 
-            ? ` ${searchQuery.results.length} venues found` 
+          {searchQuery.result_count
+            ? ` ${searchQuery.result_count} venues found` 
             : ' No results'
           }
         </div>
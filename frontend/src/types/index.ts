@@ -32,10 +32,22 @@ export interface Venue {
   open_time: string | null;
   close_time: string | null;
   notes: string;
+  latitude: number | null;
+  longitude: number | null;
+  // Set by radius queries
+  distance_miles?: number;
   created_at: string;
   updated_at: string;
 }
 
+// One page of a paginated list
+export interface Paginated<T> {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 // Contact History types
 export interface ContactHistory {
   id: number;
@@ -86,6 +98,9 @@ export interface AIVenueResult {
   website?: string;
   capacity?: number;
   genres?: string;
+  distance_miles?: number | null;
+  tile?: string;
+  relevance?: number;
 }
 
 export interface AISearchQuery {
@@ -94,10 +109,15 @@ export interface AISearchQuery {
   city: string;
   radius: number;
   results: AIVenueResult[];
+  result_count: number;
+  top_names: string[];
   created_at: string;
   user_id: number;
 }
 
+// Search history rows leave out the full results
+export type AISearchQuerySummary = Omit<AISearchQuery, 'results'>;
+
 // Auth-related types
 export interface AuthTokens {
   access: string;